@@ -0,0 +1,712 @@
+"""
+Validação e cadastro de fãs em lote, fora do Streamlit (importações de parceiros).
+
+Cada submissão (uma linha de JSONL ou um arquivo .json) traz os campos do wizard e o documento:
+
+  {"id": "p-001", "name": "...", "birthdate": "DD/MM/AAAA", "address": "...", "cpf": "...",
+   "interests": ["FURIA", "CS:GO"], "activities": "...", "purchases": "...",
+   "esports_link": "https://...", "twitter_handle": "...", "fav_player": "...", "fan_years": 3,
+   "document": "docs/p-001.png"}     # caminho relativo ao arquivo, ou "document_b64"
+
+Pela API HTTP só entram submissões inline com "document_b64": caminhos de arquivo do
+servidor (manifesto ou documento) são recusados, e as rotas exigem KNOWYOURFAN_API_TOKEN.
+
+As mesmas regras do wizard, em três estágios com concorrência própria: OCR do documento
+no pool de processos (OCRExecutor), checagem do link no loop do WizardIO e cadastro pelo
+FanWriter, depois da checagem de duplicados. O resultado de cada item fica em batch_items:
+rodar o mesmo lote de novo retoma de onde parou (textos do OCR e vereditos dos links já
+estão nos caches do SQLite, então o que faltou gravar sai barato).
+
+  python batch_service.py run parceiro.jsonl --batch parceiro-05 --ocr-workers 4 --link-concurrency 32
+  python batch_service.py run pasta/ --no-signup    # só valida (*.jsonl e *.json da pasta)
+  python batch_service.py status parceiro-05
+  python batch_service.py serve --port 8000         # API HTTP (precisa de fastapi e uvicorn)
+"""
+import argparse
+import base64
+import hashlib
+import hmac
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, wait
+from datetime import datetime, timezone
+
+import fan_dedup
+import fan_stats
+import metrics
+import storage
+from seed_db import fan_row
+
+# Concorrência padrão: OCR é CPU (um worker por núcleo), links são I/O (jobs no loop)
+DEFAULT_OCR_WORKERS = min(4, os.cpu_count() or 1)
+DEFAULT_LINK_CONCURRENCY = 16
+# Resultados acumulados antes de gravar o checkpoint (uma transação por vez). Itens
+# cadastrados não esperam: vão para o checkpoint no mesmo commit do fã, senão uma queda
+# antes do checkpoint faria a retomada recusá-los como CPF "duplicado" deles mesmos
+CHECKPOINT_EVERY = 100
+CHECKPOINT_SQL = ("INSERT OR REPLACE INTO batch_items (batch_id, item_key, status, reason, fan_id, updated_at) "
+                  "VALUES (?,?,?,?,?,?)")
+# Intervalo entre as linhas de progresso do CLI
+PROGRESS_INTERVAL = 5.0
+# Campos obrigatórios, como nos passos 1, 2 e 4 do wizard
+REQUIRED_FIELDS = ("name", "birthdate", "address", "cpf", "interests", "activities", "purchases",
+                   "esports_link")
+# Itens com estes status não são reprocessados ao retomar o lote ('error' é);
+# 'valid' (rodada só de validação) só vale para outra rodada sem cadastro
+FINAL_STATUSES = ("saved", "rejected", "duplicate")
+DRY_RUN_FINAL_STATUSES = FINAL_STATUSES + ("valid",)
+STAGES = ("ocr", "link", "signup")
+SOCIAL_PLATFORMS = ("Twitter", "Instagram", "Facebook", "TikTok")
+# Token (Authorization: Bearer ...) exigido pela API HTTP
+API_TOKEN_ENV = "KNOWYOURFAN_API_TOKEN"
+
+
+class Rejected(Exception):
+    """Submissão recusada pelas regras do cadastro (campo, documento, link ou duplicidade)."""
+
+    def __init__(self, reason, status="rejected", fan_id=None):
+        super().__init__(reason)
+        self.status = status
+        self.fan_id = fan_id
+
+
+def ocr_document(img_bytes):
+    """Roda no pool de processos: texto normalizado do OCR + pHash do documento."""
+    from enhancements import extract_document_text
+    return extract_document_text(img_bytes), fan_dedup.document_phash(img_bytes)
+
+
+def _index_signups(conn):
+    """Hook do FanWriter: agregados do dashboard e índices de duplicidade do lote."""
+    fan_stats.apply_new_fans(conn)
+    fan_dedup.index_new_fans(conn, limit=fan_dedup.WRITER_INDEX_LIMIT)
+
+
+def item_key(record):
+    """Identificador do item no checkpoint: o id do parceiro ou o hash da submissão."""
+    if record.get("id") not in (None, ""):
+        return str(record["id"])
+    return hashlib.sha256(json.dumps(record, sort_keys=True, ensure_ascii=False).encode()).hexdigest()
+
+
+def read_submissions(path):
+    """
+    Lê as submissões em streaming.
+    :param path: arquivo .jsonl ("-" = entrada padrão), .json ou pasta com esses arquivos
+    :return: gerador de (chave, submissão, pasta base dos documentos)
+    """
+    if os.path.isdir(path):
+        for name in sorted(os.listdir(path)):
+            if name.endswith((".jsonl", ".json")):
+                yield from read_submissions(os.path.join(path, name))
+        return
+    base_dir = os.path.dirname(os.path.abspath(path))
+    if path.endswith(".json"):
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        for record in data if isinstance(data, list) else [data]:
+            yield item_key(record), record, base_dir
+        return
+    f = sys.stdin if path == "-" else open(path, encoding="utf-8")
+    with f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                yield item_key(record), record, base_dir
+
+
+def inline_submissions(records):
+    """
+    Submissões recebidas pela API: sem pasta base, então "document" (caminho de arquivo
+    no servidor) é recusado e só "document_b64" vale.
+    :return: lista de (chave, submissão, None), como read_submissions
+    """
+    return [(item_key(record), record, None) for record in records]
+
+
+def load_document(record, base_dir="."):
+    """
+    :param base_dir: pasta dos caminhos em "document"; None (submissões da API) só aceita document_b64
+    :return: bytes da imagem do documento (document_b64 ou document, relativo a base_dir)
+    """
+    if record.get("document_b64"):
+        return base64.b64decode(record["document_b64"])
+    if record.get("document"):
+        if base_dir is None:
+            raise Rejected("envie o documento em document_b64 (caminhos de arquivo não são aceitos)")
+        with open(os.path.join(base_dir, record["document"]), "rb") as f:
+            return f.read()
+    raise Rejected("documento obrigatório")
+
+
+def interests_of(record):
+    interests = record.get("interests") or []
+    if isinstance(interests, str):
+        return sorted(storage.split_interests(interests))
+    return list(interests)
+
+
+def profile_summary(record):
+    # o mesmo resumo que o wizard manda na checagem do link (e na chave do veredito em cache)
+    return f"{record['name']}, interesses: {', '.join(interests_of(record))}"
+
+
+def social_profiles(record):
+    if record.get("social_profiles"):
+        return record["social_profiles"]
+    handles = dict(record, twitter=record.get("twitter") or record.get("twitter_handle"))
+    return ';'.join(f"{p}:{handles[p.lower()]}" for p in SOCIAL_PLATFORMS if handles.get(p.lower()))
+
+
+def signup_row(record, doc_phash, now=None):
+    """Submissão -> tupla de storage.INSERT_SIGNUP (as mesmas colunas do passo final do wizard)."""
+    row = fan_row(dict(record, interests=interests_of(record), esports_profiles=record["esports_link"],
+                       social_profiles=social_profiles(record), created_at=None),
+                  now or datetime.now(timezone.utc).isoformat())
+    return row + (fan_dedup.cpf_hash(record["cpf"]), doc_phash)
+
+
+class BatchService:
+    """
+    Componentes do wizard sem o Streamlit, compartilhados pelo CLI e pela API:
+    pool de OCR, loop de I/O dos links, checagem de duplicados e fila de gravação.
+    """
+
+    def __init__(self, ocr_workers=DEFAULT_OCR_WORKERS, link_concurrency=DEFAULT_LINK_CONCURRENCY,
+                 api_key=None, ocr_fn=ocr_document):
+        """
+        :param link_concurrency: checagens de link em andamento ao mesmo tempo (por lote)
+        :param api_key: chave da OpenAI (padrão: OPENAI_KEY, como no app)
+        :param ocr_fn: função do pool de OCR, img_bytes -> (texto, pHash)
+        """
+        from link_cache import LinkCache
+        from link_rules import LinkPreClassifier
+        from ocr_cache import OCRCache
+        from ocr_executor import OCRExecutor
+        from wizard_io import WizardIO
+        from fan_writer import FanWriter
+
+        self.link_concurrency = link_concurrency
+        self.api_key = api_key or os.getenv("OPENAI_KEY")
+        self.ocr = OCRExecutor(max_workers=ocr_workers, fn=ocr_fn)
+        self.ocr_cache = OCRCache()
+        self.io = WizardIO(link_cache=LinkCache(), pre_classifier=LinkPreClassifier(),
+                           max_connections=max(link_concurrency, 1))
+        self.checker = fan_dedup.DuplicateChecker()
+        self.writer = FanWriter(sql=storage.INSERT_SIGNUP, after_write=_index_signups)
+        self._runs = {}
+        self._lock = threading.Lock()
+
+    # --- estágios (cada um devolve um Future ou o resultado já pronto) ---
+
+    def start_ocr(self, img_bytes):
+        """
+        :return: (texto, pHash) do cache de OCR, ou o Future do job no pool
+        :raises OCRQueueFull: se o pool já tem jobs demais na fila
+        """
+        from ocr_cache import ocr_cache_key
+
+        key = ocr_cache_key(img_bytes)
+        text = self.ocr_cache.get(key)
+        if text is not None:
+            metrics.inc("cache_requests_total", cache="ocr", result="hit")
+            return text, fan_dedup.document_phash(img_bytes)
+        metrics.inc("cache_requests_total", cache="ocr", result="miss")
+        fut = self.ocr.submit(key, img_bytes)
+        fut.cache_key = key
+        return fut
+
+    def finish_ocr(self, fut):
+        """:return: (texto, pHash) de um job concluído, já guardado no cache"""
+        self.ocr.forget(fut.cache_key)
+        text, phash = fut.result()
+        self.ocr_cache.put(fut.cache_key, text)
+        return text, phash
+
+    def start_link(self, record):
+        from wizard_io import DEADLINES
+
+        summary = profile_summary(record)
+        key = ("link", record["esports_link"], summary)
+        fut = self.io.submit(key, self.io.check_link, self.api_key, record["esports_link"], summary,
+                             deadline=DEADLINES["link"])
+        fut.job_key = key
+        return fut
+
+    def finish_link(self, fut):
+        self.io.forget(fut.job_key)
+        return fut.result()
+
+    def check_fields(self, record):
+        """Regras do passo 1: campos obrigatórios, CPF válido e ainda não cadastrado."""
+        for field in REQUIRED_FIELDS:
+            if not record.get(field):
+                raise Rejected(f"campo obrigatório: {field}")
+        if fan_dedup.normalize_cpf(record["cpf"]) is None:
+            raise Rejected("CPF inválido")
+        fan_id = self.checker.cpf_fan_id(record["cpf"])
+        if fan_id is not None:
+            raise Rejected("já existe um cadastro com este CPF", "duplicate", fan_id)
+
+    def start_signup(self, record, doc_phash, on_insert=None):
+        """
+        Regras do passo final (CPF e documento já usados) e envio para a fila de gravação.
+        :param on_insert: hook do FanWriter, (conexão, fan_id) na transação do cadastro
+        """
+        dup = self.checker.check(record["cpf"], record["name"], record["address"], doc_phash)
+        if dup.cpf_fan_id is not None:
+            raise Rejected("já existe um cadastro com este CPF", "duplicate", dup.cpf_fan_id)
+        if dup.doc_matches:
+            raise Rejected("documento já usado em outro cadastro", "duplicate", dup.doc_matches[0][0])
+        # sem timeout: num lote, esperar a fila andar é o backpressure certo
+        return self.writer.submit(signup_row(record, doc_phash), timeout=None, on_insert=on_insert)
+
+    # --- chamadas avulsas (API) ---
+
+    def validate_document(self, img_bytes, name, birthdate):
+        """:return: (MatchResult, pHash), bloqueando até o OCR terminar"""
+        from enhancements import match_document_text
+        from ocr_executor import OCRQueueFull
+
+        while True:
+            try:
+                started = self.start_ocr(img_bytes)
+                break
+            except OCRQueueFull:
+                time.sleep(0.05)
+        text, phash = started if isinstance(started, tuple) else self.finish_ocr(_result(started))
+        return match_document_text(text, name, birthdate), phash
+
+    def validate_link(self, url, name, interests):
+        """:return: True se o link é relevante para o perfil"""
+        return self.finish_link(_result(self.start_link(
+            {"esports_link": url, "name": name, "interests": interests})))
+
+    # --- lote ---
+
+    def finished_keys(self, batch_id, signup=True):
+        """:return: chaves dos itens do lote que a rodada pode pular"""
+        statuses = FINAL_STATUSES if signup else DRY_RUN_FINAL_STATUSES
+        rows = storage.query(
+            f"SELECT item_key FROM batch_items WHERE batch_id = ? AND status IN ({','.join('?' * len(statuses))})",
+            (batch_id, *statuses))
+        return {key for key, in rows}
+
+    def run(self, submissions, batch_id=None, signup=True, progress=None):
+        """
+        Processa as submissões em pipeline: enquanto uns itens estão no OCR, outros já
+        estão na checagem do link ou na fila de gravação.
+        :param submissions: iterável de (chave, submissão, pasta base), ex.: read_submissions
+        :param batch_id: identificador do lote no checkpoint (None: sem checkpoint)
+        :param signup: False só valida (status 'valid'), sem gravar
+        :param progress: função chamada com o relatório parcial a cada PROGRESS_INTERVAL
+        :return: relatório {items, skipped, status, seconds, items_per_s, stages, results}
+        """
+        from ocr_executor import OCRQueueFull
+
+        run = BatchRun(batch_id)
+        if batch_id is not None:
+            with self._lock:
+                self._runs[batch_id] = run
+        done_keys = self.finished_keys(batch_id, signup) if batch_id is not None else set()
+        source = iter(submissions)
+        exhausted = False
+        ocr_jobs, link_jobs, tickets = {}, {}, []
+        # documentos recusados pelo pool cheio (ele também atende a API) e itens prontos para o link
+        refused, ready = deque(), deque()
+        last_progress = time.perf_counter()
+
+        def after_ocr(item, text, phash):
+            from enhancements import match_document_text
+
+            run.stage_done(item, "ocr")
+            item["phash"] = phash
+            result = match_document_text(text, item["record"]["name"], item["record"]["birthdate"])
+            if not result:
+                raise Rejected("documento não confere com nome e data de nascimento")
+            item["confidence"] = result.confidence
+            ready.append(item)
+
+        def start_ocr(item, img_bytes):
+            try:
+                started = self.start_ocr(img_bytes)
+            except OCRQueueFull:
+                refused.append((item, img_bytes))
+                return
+            if isinstance(started, tuple):
+                after_ocr(item, *started)
+            else:
+                # documentos repetidos no lote dividem o mesmo job do pool
+                ocr_jobs.setdefault(started, []).append(item)
+
+        while True:
+            for _ in range(len(refused)):
+                item, img_bytes = refused.popleft()
+                try:
+                    start_ocr(item, img_bytes)
+                except Exception as e:
+                    run.finish(item, e)
+            # lê à frente só o que cabe no pool de OCR e na fila dos links (memória das imagens)
+            while (not exhausted and not refused and len(ocr_jobs) < self.ocr.max_pending
+                   and len(ready) < self.link_concurrency):
+                try:
+                    key, record, base_dir = next(source)
+                except StopIteration:
+                    exhausted = True
+                    break
+                if key in done_keys:
+                    run.skipped += 1
+                    continue
+                item = run.start(key, record)
+                try:
+                    self.check_fields(record)
+                    start_ocr(item, load_document(record, base_dir))
+                except Exception as e:
+                    run.finish(item, e)
+            while ready and len(link_jobs) < self.link_concurrency:
+                item = ready.popleft()
+                link_jobs.setdefault(self.start_link(item["record"]), []).append(item)
+            for ticket, item in tickets:
+                if not ticket.done:
+                    continue
+                run.stage_done(item, "signup")
+                if isinstance(ticket.error, sqlite3.IntegrityError):
+                    # outro item do lote com o mesmo CPF entrou antes
+                    run.finish(item, Rejected("já existe um cadastro com este CPF", "duplicate"))
+                else:
+                    run.finish(item, ticket.error, fan_id=ticket.fan_id)
+            tickets = [t for t in tickets if not t[0].done]
+            if batch_id is not None and len(run.pending_checkpoint) >= CHECKPOINT_EVERY:
+                run.checkpoint()
+            if progress and time.perf_counter() - last_progress >= PROGRESS_INTERVAL:
+                last_progress = time.perf_counter()
+                progress(run.report())
+            if exhausted and not (refused or ocr_jobs or link_jobs or ready or tickets):
+                break
+
+            jobs = list(ocr_jobs) + list(link_jobs)
+            if jobs:
+                done, _ = wait(jobs, timeout=0.05 if tickets else PROGRESS_INTERVAL, return_when=FIRST_COMPLETED)
+            else:
+                if tickets:
+                    tickets[0][0].wait(0.05)
+                else:
+                    time.sleep(0.05)
+                done = ()
+            for fut in done:
+                if fut in ocr_jobs:
+                    for item in ocr_jobs.pop(fut):
+                        try:
+                            after_ocr(item, *self.finish_ocr(fut))
+                        except Exception as e:
+                            run.finish(item, e)
+                    continue
+                for item in link_jobs.pop(fut):
+                    try:
+                        relevant = self.finish_link(fut)
+                        run.stage_done(item, "link")
+                        if not relevant:
+                            raise Rejected("link não corresponde ao perfil")
+                        if signup:
+                            on_insert = run.checkpoint_saved(item) if batch_id is not None else None
+                            tickets.append((self.start_signup(item["record"], item["phash"], on_insert), item))
+                        else:
+                            run.finish(item, None)
+                    except Exception as e:
+                        run.finish(item, e)
+
+        if batch_id is not None:
+            run.checkpoint()
+        run.finished = True
+        return run.report(results=True)
+
+    def status(self, batch_id):
+        """:return: {status: n} gravados no checkpoint + o relatório, se o lote roda neste processo"""
+        counts = checkpoint_counts(batch_id)
+        with self._lock:
+            run = self._runs.get(batch_id)
+        return {"batch_id": batch_id, "checkpoint": counts,
+                "running": run is not None and not run.finished,
+                "report": run.report() if run is not None else None}
+
+    def close(self):
+        self.writer.close()
+        self.io.close()
+        self.ocr.shutdown()
+
+
+def checkpoint_counts(batch_id):
+    """:return: {status: itens} do lote no checkpoint"""
+    return dict(storage.query(
+        "SELECT status, COUNT(*) FROM batch_items WHERE batch_id = ? GROUP BY status", (batch_id,)))
+
+
+def _result(fut):
+    exc = fut.exception()
+    if exc is not None:
+        raise exc
+    return fut
+
+
+class BatchRun:
+    """Estado e contadores de uma execução de lote (vazão por estágio e checkpoint)."""
+
+    def __init__(self, batch_id):
+        self.batch_id = batch_id
+        self.started = time.perf_counter()
+        self.items = 0
+        self.skipped = 0
+        self.finished = False
+        self.statuses = {}
+        self.results = []
+        self.pending_checkpoint = []
+        # por estágio: [itens, primeiro início, último fim, soma das latências]
+        self._stages = {stage: [0, None, None, 0.0] for stage in STAGES}
+        self._lock = threading.Lock()
+
+    def start(self, key, record):
+        self.items += 1
+        return {"key": key, "record": record, "since": time.perf_counter()}
+
+    def stage_done(self, item, stage):
+        now = time.perf_counter()
+        elapsed = now - item["since"]
+        metrics.observe("operation_seconds", elapsed, op=f"batch_{stage}")
+        with self._lock:
+            s = self._stages[stage]
+            s[0] += 1
+            s[1] = item["since"] if s[1] is None else min(s[1], item["since"])
+            s[2] = now
+            s[3] += elapsed
+        item["since"] = now
+
+    def finish(self, item, error, fan_id=None):
+        """Resultado final do item: gravado (ou válido), recusado ou erro."""
+        if error is None:
+            status, reason = ("saved" if fan_id is not None else "valid"), None
+        elif isinstance(error, Rejected):
+            status, reason, fan_id = error.status, str(error), error.fan_id
+        else:
+            status, reason = "error", f"{type(error).__name__}: {error}"
+        metrics.inc("batch_items_total", status=status)
+        result = {"key": item["key"], "status": status, "reason": reason, "fan_id": fan_id}
+        with self._lock:
+            self.statuses[status] = self.statuses.get(status, 0) + 1
+            self.results.append(result)
+            if status != "saved":
+                # 'saved' já entrou no checkpoint junto com o fã (checkpoint_saved)
+                self.pending_checkpoint.append((self.batch_id, item["key"], status, reason, fan_id, int(time.time())))
+
+    def checkpoint_saved(self, item):
+        """:return: hook do FanWriter que marca o item como 'saved' no mesmo commit do fã"""
+        def on_insert(conn, fan_id):
+            conn.execute(CHECKPOINT_SQL, (self.batch_id, item["key"], "saved", None, fan_id, int(time.time())))
+        return on_insert
+
+    def checkpoint(self):
+        with self._lock:
+            rows, self.pending_checkpoint = self.pending_checkpoint, []
+        if rows:
+            storage.executemany(CHECKPOINT_SQL, rows)
+
+    def report(self, results=False):
+        elapsed = time.perf_counter() - self.started
+        with self._lock:
+            statuses = dict(self.statuses)
+            done = sum(statuses.values())
+            stages = {}
+            for stage, (n, first, last, total) in self._stages.items():
+                span = (last - first) if n else 0.0
+                stages[stage] = {"n": n, "items_per_s": round(n / span, 2) if span > 0 else 0.0,
+                                 "ms_avg": round(total / n * 1000, 1) if n else 0.0}
+            report = {"batch_id": self.batch_id, "items": self.items, "done": done, "skipped": self.skipped,
+                      "status": statuses, "seconds": round(elapsed, 3),
+                      "items_per_s": round(done / elapsed, 2) if elapsed > 0 else 0.0, "stages": stages}
+            if results:
+                report["results"] = list(self.results)
+        return report
+
+
+def _print_report(report):
+    print(f"✅ lote {report['batch_id']}: {report['done']} itens em {report['seconds']:.1f} s "
+          f"({report['items_per_s']:,.1f} itens/s); {report['skipped']} já processados; {report['status']}")
+    for stage, s in report["stages"].items():
+        print(f"  {stage:<7} {s['n']:>7} itens  {s['items_per_s']:>9,.1f} itens/s  {s['ms_avg']:>9,.1f} ms/item")
+
+
+# --- API HTTP (opcional) ---
+
+def create_app(service, api_token):
+    """
+    API HTTP sobre o BatchService. As rotas são síncronas: o FastAPI as roda no seu pool de
+    threads e o trabalho pesado fica no pool de OCR e no loop do WizardIO.
+    :param api_token: token que toda requisição manda em Authorization: Bearer
+    :raises ImportError: sem fastapi instalado
+    :raises ValueError: sem token
+    """
+    if not api_token:
+        raise ValueError(f"a API precisa de um token: defina {API_TOKEN_ENV}")
+    try:
+        from fastapi import Depends, FastAPI, Header, HTTPException
+        from fastapi.responses import PlainTextResponse
+        from pydantic import BaseModel
+    except ImportError as e:
+        raise ImportError("a API precisa de fastapi e uvicorn: pip install fastapi uvicorn") from e
+
+    class DocumentIn(BaseModel):
+        name: str
+        birthdate: str
+        document_b64: str
+
+    class LinkIn(BaseModel):
+        url: str
+        name: str
+        interests: list[str] = []
+
+    class BatchIn(BaseModel):
+        batch_id: str | None = None
+        items: list[dict] = []
+        signup: bool = True
+
+    def authorize(authorization: str = Header("")):
+        if not hmac.compare_digest(authorization.encode(), f"Bearer {api_token}".encode()):
+            raise HTTPException(401, "token inválido", headers={"WWW-Authenticate": "Bearer"})
+
+    app = FastAPI(title="KnowYourFan - validação em lote", dependencies=[Depends(authorize)])
+
+    def document_result(doc):
+        try:
+            result, _ = service.validate_document(base64.b64decode(doc.document_b64), doc.name, doc.birthdate)
+        except Exception as e:
+            return {"valid": False, "error": str(e)}
+        return {"valid": bool(result), "confidence": result.confidence, "name_score": result.name_score,
+                "birth_found": result.birth_found}
+
+    def link_result(link):
+        try:
+            return {"url": link.url, "relevant": service.validate_link(link.url, link.name, link.interests)}
+        except Exception as e:
+            return {"url": link.url, "relevant": False, "error": str(e)}
+
+    @app.post("/v1/ocr/validate")
+    def validate_ocr(doc: DocumentIn):
+        return document_result(doc)
+
+    @app.post("/v1/ocr/validate/batch")
+    def validate_ocr_batch(docs: list[DocumentIn]):
+        # sem checkpoint nem cadastro: o lote só passa pelos estágios de validação
+        return _parallel(document_result, docs)
+
+    @app.post("/v1/links/validate")
+    def validate_links(link: LinkIn):
+        return link_result(link)
+
+    @app.post("/v1/links/validate/batch")
+    def validate_links_batch(links: list[LinkIn]):
+        return _parallel(link_result, links, service.link_concurrency)
+
+    @app.post("/v1/signups")
+    def signup(record: dict):
+        report = service.run(inline_submissions([record]))
+        return report["results"][0]
+
+    @app.post("/v1/batches", status_code=202)
+    def start_batch(batch: BatchIn):
+        submissions = inline_submissions(batch.items)
+        batch_id = batch.batch_id or datetime.now(timezone.utc).strftime("api-%Y%m%d%H%M%S%f")
+        if service.status(batch_id)["running"]:
+            raise HTTPException(409, f"lote {batch_id} já está rodando")
+        threading.Thread(target=service.run, args=(submissions, batch_id, batch.signup),
+                         name=f"batch-{batch_id}", daemon=True).start()
+        return {"batch_id": batch_id}
+
+    @app.get("/v1/batches/{batch_id}")
+    def batch_status(batch_id: str):
+        status = service.status(batch_id)
+        if not status["checkpoint"] and status["report"] is None:
+            raise HTTPException(404, f"lote {batch_id} não encontrado")
+        return status
+
+    @app.get("/metrics", response_class=PlainTextResponse)
+    def prometheus():
+        return metrics.render()
+
+    return app
+
+
+def _parallel(fn, items, max_workers=DEFAULT_OCR_WORKERS * 4):
+    # as rotas de lote só esperam: quem limita a concorrência real é o pool de OCR/loop do WizardIO
+    from concurrent.futures import ThreadPoolExecutor
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(items)))) as pool:
+        return list(pool.map(fn, items))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", help="caminho do banco (padrão: KNOWYOURFAN_DB ou knowyourfan.db)")
+    parser.add_argument("--ocr-workers", type=int, default=DEFAULT_OCR_WORKERS, help="processos do pool de OCR")
+    parser.add_argument("--link-concurrency", type=int, default=DEFAULT_LINK_CONCURRENCY,
+                        help="checagens de link ao mesmo tempo")
+    sub = parser.add_subparsers(dest="command", required=True)
+    run = sub.add_parser("run", help="processa um arquivo JSONL/JSON ou uma pasta de submissões")
+    run.add_argument("path", help='arquivo .jsonl/.json, pasta ou "-" para a entrada padrão')
+    run.add_argument("--batch", help="id do lote no checkpoint (padrão: nome do arquivo)")
+    run.add_argument("--no-signup", action="store_true", help="só valida, sem gravar os fãs")
+    run.add_argument("--json", action="store_true", help="imprime o relatório completo em JSON")
+    status = sub.add_parser("status", help="situação de um lote no checkpoint")
+    status.add_argument("batch_id")
+    serve = sub.add_parser("serve", help="sobe a API HTTP (fastapi + uvicorn)")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+
+    if args.db:
+        storage.DB_PATH = args.db
+    if args.command == "status":
+        print(json.dumps({"batch_id": args.batch_id, "checkpoint": checkpoint_counts(args.batch_id)},
+                         ensure_ascii=False))
+        return
+    try:
+        fan_dedup.cpf_hash_key()
+    except RuntimeError as e:
+        sys.exit(str(e))
+
+    service = BatchService(ocr_workers=args.ocr_workers, link_concurrency=args.link_concurrency)
+    try:
+        if args.command == "serve":
+            try:
+                import uvicorn
+            except ImportError:
+                sys.exit("a API precisa de fastapi e uvicorn: pip install fastapi uvicorn")
+            api_token = os.getenv(API_TOKEN_ENV)
+            if not api_token:
+                sys.exit(f"a API precisa de um token: defina {API_TOKEN_ENV}")
+            metrics.add_collector("fan_writer", service.writer.metrics)
+            metrics.add_collector("link_cache", service.io.link_cache.stats)
+            uvicorn.run(create_app(service, api_token), host=args.host, port=args.port)
+            return
+        batch_id = args.batch or os.path.splitext(os.path.basename(os.path.normpath(args.path)))[0]
+
+        def progress(report):
+            print(f"  {report['done']} itens ({report['items_per_s']:,.1f}/s) {report['status']}",
+                  file=sys.stderr, flush=True)
+
+        report = service.run(read_submissions(args.path), batch_id, signup=not args.no_signup, progress=progress)
+    finally:
+        service.close()
+        storage.close_connection()
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    else:
+        report.pop("results")
+        _print_report(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Pico de memória e tempo da exportação: caminho antigo (SELECT * no pandas +
+df.to_csv em uma string) contra fan_export, que lê o SQLite em blocos.
+
+Uso: python -m benchmarks.bench_export [--fans 200000]
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+
+def measure(fn):
+    tracemalloc.start()
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 2**20
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--fans", type=int, default=200000)
+    args = parser.parse_args()
+
+    import storage
+    import fan_export
+    from benchmarks.bench_segments import populate
+
+    tmp = tempfile.mkdtemp()
+    storage.DB_PATH = os.path.join(tmp, "export.db")
+    populate(storage, args.fans)
+    print(f"{args.fans} fãs")
+
+    try:
+        import pandas as pd
+
+        def legacy():
+            pd.read_sql_query("SELECT * FROM fans", storage.get_connection()).to_csv(index=False)
+
+        t, peak = measure(legacy)
+        print(f"  df.to_csv           {t:6.2f} s  pico {peak:8.1f} MiB")
+    except ImportError:
+        print("  pandas não instalado: caminho antigo não medido")
+
+    for fmt in fan_export.FORMATS:
+        try:
+            t, peak = measure(lambda: fan_export.export_to_file(fmt, directory=tmp))
+        except RuntimeError as e:
+            print(f"  fan_export {fmt:<9} {e}")
+            continue
+        print(f"  fan_export {fmt:<9}{t:6.2f} s  pico {peak:8.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Avalia o LinkPreClassifier no conjunto rotulado benchmarks/data/link_labels.jsonl
+(url, título da página, resumo do perfil, relevante?) para vários limiares:
+quantos casos as regras decidem sozinhas, quantos acertam e quantos sobem para o LLM.
+
+Uso: python -m benchmarks.bench_link_rules [--labels arquivo.jsonl] [--repeat 2000]
+"""
+import argparse
+import json
+import os
+import time
+
+from link_rules import ACCEPT_THRESHOLD, LinkPreClassifier
+
+DEFAULT_LABELS = os.path.join(os.path.dirname(__file__), "data", "link_labels.jsonl")
+THRESHOLDS = (0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 1.0)
+
+
+def load(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def classify(rules, case):
+    # mesma ordem de validate_esports_link: URL, depois título
+    url_decision = rules.by_url(case["url"], case["summary"])
+    if url_decision.verdict is False:
+        return url_decision
+    decision = rules.by_title(case["title"], case["summary"], url_decision)
+    if decision.verdict is None:
+        rules.escalated()
+    return decision
+
+
+def evaluate(cases, threshold, verbose=False):
+    rules = LinkPreClassifier(accept_threshold=threshold)
+    decided = correct = 0
+    for case in cases:
+        decision = classify(rules, case)
+        if decision.verdict is None:
+            continue
+        decided += 1
+        if decision.verdict == case["relevant"]:
+            correct += 1
+        elif verbose:
+            print(f"  erro: {case['url']} -> {decision}")
+    stats = rules.stats()
+    precision = correct / decided if decided else 0.0
+    print(f"limiar {threshold:.1f}  decididos {decided:3d}/{len(cases)}  acertos {precision:6.1%}"
+          f"  escalonados {stats['escalation_rate']:6.1%}")
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--labels", default=DEFAULT_LABELS)
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    cases = load(args.labels)
+    for threshold in THRESHOLDS:
+        evaluate(cases, threshold, verbose=threshold == ACCEPT_THRESHOLD)
+
+    rules = LinkPreClassifier()
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        for case in cases:
+            classify(rules, case)
+    elapsed = time.perf_counter() - start
+    print(f"\n{elapsed / (args.repeat * len(cases)) * 1e6:.1f} µs por decisão (limiar {ACCEPT_THRESHOLD})")
+    print(rules.stats()["reasons"])
+
+
+if __name__ == "__main__":
+    main()
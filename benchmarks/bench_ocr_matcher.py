@@ -0,0 +1,85 @@
+"""
+Micro-benchmark da conferência de nome + nascimento sobre o texto do OCR:
+implementação antiga (5 re.sub + busca no texto inteiro) contra o
+DocumentMatcher (tabela de tradução + janela de palavras por linha/fuzzy com parada antecipada).
+Também conta as rejeições em textos com erros típicos do Tesseract e os aceites
+indevidos de documentos de outra pessoa (nome informado = nomes dos pais).
+
+Uso: python -m benchmarks.bench_ocr_matcher [--runs 2000]
+"""
+import argparse
+import random
+import re
+import timeit
+
+from ocr_matcher import iter_tokens, match_tokens
+from benchmarks.synthetic_docs import random_identity
+
+
+def legacy_match(text, expected_name, expected_birth):
+    # cópia do validate_document_ocr original, sem o OCR
+    def normalize(s):
+        s = s.upper()
+        s = re.sub(r"[ÃÁÀÂÄ]", "A", s)
+        s = re.sub(r"[ÉÈÊË]", "E", s)
+        s = re.sub(r"[ÍÌÎÏ]", "I", s)
+        s = re.sub(r"[ÓÒÔÖÕ]", "O", s)
+        s = re.sub(r"[ÚÙÛÜ]", "U", s)
+        return s
+    text_norm = normalize(text)
+    name_norm = normalize(expected_name)
+    birth_norm = expected_birth.replace("/", "").strip()
+    has_name = name_norm in text_norm
+    birth_match = re.search(r"\b" + re.escape(birth_norm) + r"\b", re.sub(r"/", "", text))
+    return has_name and bool(birth_match)
+
+
+def new_match(text, expected_name, expected_birth):
+    return match_tokens(iter_tokens(text), expected_name, expected_birth)
+
+
+def page(name, birth, rng, noise=False):
+    """Texto de uma página de RG como sairia do OCR, com rodapé longo."""
+    if noise:
+        # erros comuns: O→0 no nome, palavras grudadas, data com espaços
+        name = name.replace("O", "0", 1).replace(" ", "", 1) if rng.random() < 0.5 else name[:-1] + "I"
+        birth = birth.replace("/", " ")
+    footer = " ".join(rng.choice(["VALIDA", "EM", "TODO", "TERRITORIO", "NACIONAL", "LEI", "7116"]) for _ in range(300))
+    return f"REPUBLICA FEDERATIVA DO BRASIL\nNOME\n{name}\nDATA DE NASCIMENTO\n{birth}\n{footer}"
+
+
+def parents_page(rng):
+    """
+    Documento de outra pessoa em que o "nome" informado é montado com os primeiros nomes
+    dos pais (linhas da filiação): :return: (texto, nome informado, nascimento)
+    """
+    name, birth = random_identity(rng)
+    father, _ = random_identity(rng)
+    mother, _ = random_identity(rng)
+    text = (f"REPUBLICA FEDERATIVA DO BRASIL\nNOME\n{name}\nFILIACAO\n{father}\n{mother}\n"
+            f"DATA DE NASCIMENTO\n{birth}")
+    return text, f"{father.split()[0]} {mother.split()[0]}", birth
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    clean = [(page(n, b, rng), n, b) for n, b in (random_identity(rng) for _ in range(50))]
+    noisy = [(page(n, b, rng, noise=True), n, b) for n, b in (random_identity(rng) for _ in range(50))]
+    impostors = [parents_page(rng) for _ in range(50)]
+
+    for label, fn in (("antigo", legacy_match), ("novo", new_match)):
+        elapsed = timeit.timeit(lambda: [fn(*case) for case in clean], number=max(1, args.runs // 50))
+        per_call = elapsed / (max(1, args.runs // 50) * len(clean)) * 1e6
+        ok_clean = sum(bool(fn(*case)) for case in clean)
+        ok_noisy = sum(bool(fn(*case)) for case in noisy)
+        wrong = sum(bool(fn(*case)) for case in impostors)
+        print(f"{label:<8}{per_call:8.1f} µs/doc  aceitos: limpos {ok_clean}/{len(clean)}, com ruído {ok_noisy}/{len(noisy)}, "
+              f"nome dos pais {wrong}/{len(impostors)} (deve ser 0)")
+
+
+if __name__ == "__main__":
+    main()
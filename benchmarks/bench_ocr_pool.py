@@ -0,0 +1,44 @@
+"""
+Mede quantas sessões por segundo o pool de OCR consegue validar
+com 1, 4 e N workers (N = núcleos da máquina).
+
+Uso: python -m benchmarks.bench_ocr_pool [--sessions 32]
+"""
+import argparse
+import os
+import time
+
+from enhancements import match_document_text
+from ocr_executor import OCRExecutor
+from benchmarks.synthetic_docs import corpus
+
+
+def run(workers, docs):
+    executor = OCRExecutor(max_workers=workers, max_pending=len(docs))
+    try:
+        # aquece os workers antes de medir
+        executor.submit("warmup", docs[0][0]).result()
+        executor.forget("warmup")
+        start = time.perf_counter()
+        futures = [executor.submit(i, img) for i, (img, _, _) in enumerate(docs)]
+        matched = sum(1 for f, (_, name, birth) in zip(futures, docs)
+                      if match_document_text(f.result(), name, birth))
+        elapsed = time.perf_counter() - start
+    finally:
+        executor.shutdown()
+    return len(docs) / elapsed, matched
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sessions", type=int, default=32)
+    args = parser.parse_args()
+
+    docs = list(corpus(args.sessions))
+    for workers in sorted({1, 4, os.cpu_count() or 1}):
+        rate, matched = run(workers, docs)
+        print(f"{workers:>3} workers: {rate:6.2f} sessões/s ({matched}/{len(docs)} validadas)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Compara a extração do título dos links: caminho antigo (requests.get + resp.text +
+BeautifulSoup html.parser) x leitura em blocos com page_extract (para no título ou no
+limite de bytes). As páginas são servidas por um servidor HTTP local; por padrão são
+geradas imitando a Liquipedia (head com título/OpenGraph e corpo de vários MB), ou
+use --pages com um diretório de páginas salvas (*.html).
+
+Uso: python -m benchmarks.bench_page_extract [--size-mb 3] [--pages dir] [--repeat 5]
+"""
+import argparse
+import glob
+import os
+import statistics
+import threading
+import time
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+from bs4 import BeautifulSoup
+
+from page_extract import CHUNK_BYTES, charset, extract_from_chunks
+
+
+def liquipedia_like(name, size_mb):
+    head = (
+        "<!DOCTYPE html><html lang='en'><head><meta charset='utf-8'>"
+        f"<title>{name} - Liquipedia Counter-Strike Wiki</title>"
+        + "<link rel='stylesheet' href='/style.css'>" * 40
+        + f"<meta property='og:title' content='{name}'>"
+        "<meta property='og:description' content='Jogador brasileiro de Counter-Strike.'>"
+        "<meta property='og:site_name' content='Liquipedia Counter-Strike Wiki'>"
+        + "<script>var config = {};</script>" * 50
+        + "</head><body>"
+    )
+    row = "<tr><td>2025-01-01</td><td>FURIA</td><td>vs</td><td>NAVI</td><td>2:1</td></tr>\n"
+    body = [f"<h1 class='firstHeading'>{name}</h1><table>"]
+    size = len(head)
+    while size < size_mb * 1024 * 1024:
+        body.append(row)
+        size += len(row)
+    body.append("</table></body></html>")
+    return (head + "".join(body)).encode()
+
+
+def serve(pages):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            data = pages[self.path.lstrip("/")]
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            try:
+                self.wfile.write(data)
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # o extrator fechou a conexão depois de achar o título
+
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    httpd.daemon_threads = True
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    return httpd
+
+
+def old_path(url):
+    resp = requests.get(url, timeout=30)
+    resp.raise_for_status()
+    soup = BeautifulSoup(resp.text, "html.parser")
+    title = soup.find(["h1", "h2", "title"])
+    return title.get_text(strip=True) if title else "", len(resp.content)
+
+
+def new_path(url):
+    with requests.get(url, timeout=30, stream=True) as resp:
+        resp.raise_for_status()
+        extractor = extract_from_chunks(resp.iter_content(CHUNK_BYTES), charset(resp.headers.get("Content-Type")))
+    return extractor.content(), extractor.bytes_read
+
+
+def measure(label, fn, url, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(url)
+        times.append(time.perf_counter() - start)
+    tracemalloc.start()
+    content, read = fn(url)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print(f"  {label:<22} {statistics.median(times) * 1000:8.1f} ms  pico {peak / 2**20:7.1f} MiB"
+          f"  lidos {read / 1024:8.0f} KiB  -> {content!r}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size-mb", type=float, default=3)
+    parser.add_argument("--pages", help="diretório com páginas salvas (*.html)")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.pages:
+        pages = {}
+        for path in sorted(glob.glob(os.path.join(args.pages, "*.html"))):
+            with open(path, "rb") as f:
+                pages[os.path.basename(path)] = f.read()
+    else:
+        pages = {"KSCERATO.html": liquipedia_like("KSCERATO", args.size_mb),
+                 "FURIA_Esports.html": liquipedia_like("FURIA Esports", args.size_mb / 3)}
+    httpd = serve(pages)
+    base = f"http://127.0.0.1:{httpd.server_address[1]}/"
+    for name, data in pages.items():
+        print(f"{name} ({len(data) / 2**20:.1f} MiB)")
+        measure("BeautifulSoup", old_path, base + name, args.repeat)
+        measure("page_extract", new_path, base + name, args.repeat)
+    httpd.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Simula várias sessões abrindo o modo Fã ao mesmo tempo, com um cliente do
+Twitter falso (benchmarks.stubs): compara as chamadas à API e a latência de
+renderização da sidebar sem e com o TimelinePrefetcher.
+
+Uso: python -m benchmarks.bench_prefetcher [--sessions 50] [--latency 0.2]
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import threading
+import time
+
+from benchmarks.stubs import StubTwitterClient
+
+
+def run_sessions(n, render):
+    latencies = []
+    lock = threading.Lock()
+    barrier = threading.Barrier(n)
+
+    def session():
+        barrier.wait()
+        start = time.perf_counter()
+        render()
+        with lock:
+            latencies.append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=session) for _ in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return latencies
+
+
+def report(label, client, latencies):
+    calls = sum(client.calls.values())
+    print(f"{label:<28} chamadas à API {calls:4d}  render p50 {statistics.median(latencies) * 1000:7.1f} ms"
+          f"  max {max(latencies) * 1000:7.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sessions", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.2)
+    args = parser.parse_args()
+
+    import storage
+    from tweet_cache import TimelineCache
+    from tweet_prefetcher import TimelinePrefetcher
+
+    # cache frio/expirado: todas as sessões chegam juntas
+    storage.DB_PATH = os.path.join(tempfile.mkdtemp(), "inline.db")
+    client = StubTwitterClient(latency=args.latency)
+    cache = TimelineCache(client)
+    report("inline (cache frio)", client, run_sessions(args.sessions, lambda: cache.get_timeline("FURIA", 5)))
+
+    storage.DB_PATH = os.path.join(tempfile.mkdtemp(), "prefetch.db")
+    client = StubTwitterClient(latency=args.latency)
+    prefetcher = TimelinePrefetcher(TimelineCache(client))
+    report("prefetcher (cache frio)", client, run_sessions(args.sessions, lambda: prefetcher.get("FURIA", 5)))
+    prefetcher.revalidate("FURIA").result()
+
+    # cache vencido: sessões recebem o que há e um único refresh roda em segundo plano
+    prefetcher.cache.ttl = -1
+    before = sum(client.calls.values())
+    latencies = run_sessions(args.sessions, lambda: prefetcher.get("FURIA", 5))
+    time.sleep(args.latency * 3)
+    print(f"{'prefetcher (cache vencido)':<28} chamadas à API {sum(client.calls.values()) - before:4d}  "
+          f"render p50 {statistics.median(latencies) * 1000:7.1f} ms  max {max(latencies) * 1000:7.1f} ms")
+    print(prefetcher.stats())
+    prefetcher.stop()
+
+
+if __name__ == "__main__":
+    main()
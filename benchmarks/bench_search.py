@@ -0,0 +1,72 @@
+"""
+Busca textual em atividades/compras: índice FTS5 (fan_search) contra o caminho
+antigo, carregar fans no pandas e filtrar com str.contains. Os fãs vêm do gerador
+sintético do seed_db, carregados num banco temporário.
+
+Uso: python -m benchmarks.bench_search [--sizes 100000 1000000] [--queries "watch party" ...]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+QUERIES = ["camiseta", "watch party", "campeonato amador", "major", "camis*", "xyzzy"]
+
+
+def timed(fn, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100000, 1000000])
+    parser.add_argument("--queries", nargs="+", default=QUERIES)
+    parser.add_argument("--top", type=int, default=20)
+    args = parser.parse_args()
+
+    import storage
+    import fan_search
+    import seed_db
+    try:
+        import pandas as pd
+    except ImportError:
+        pd = None
+
+    for n in args.sizes:
+        storage.DB_PATH = os.path.join(tempfile.mkdtemp(), f"search_{n}.db")
+        report = seed_db.bulk_load(seed_db.synthetic_fans(n), aggregates=False)
+        print(f"\n{n} fãs (carga {report['insert_s']:.1f} s, índice FTS5 {report['search_index_s']:.1f} s)")
+
+        df = None
+        if pd is not None:
+            load, df = timed(lambda: pd.read_sql_query(
+                "SELECT id, name, activities, purchases, interests FROM fans", storage.get_connection()), repeat=1)
+            text = (df["activities"].fillna("") + " " + df["purchases"].fillna("") + " "
+                    + df["interests"].fillna(""))
+            print(f"  pandas: read_sql de fans {load * 1000:9.1f} ms ({df.memory_usage(deep=True).sum() / 2**20:.0f} MiB)")
+        else:
+            print("  pandas não instalado: caminho antigo não medido")
+
+        for query in args.queries:
+            t, (_, rows) = timed(lambda: fan_search.search(query, page_size=args.top))
+            tc, count = timed(lambda: fan_search.search_count(query))
+            line = f"  {query!r:<22} FTS5 top-{args.top} {t * 1000:8.1f} ms  contagem {tc * 1000:7.1f} ms ({count} fãs)"
+            if df is not None:
+                def legacy():
+                    mask = None
+                    for word, _ in fan_search.parse_terms(query):
+                        hit = text.str.contains(word, case=False, regex=False)
+                        mask = hit if mask is None else mask & hit
+                    return df[mask].head(args.top), int(mask.sum())
+                tl, (_, legacy_count) = timed(legacy, repeat=1)
+                line += f"  | str.contains {tl * 1000:8.1f} ms ({legacy_count} fãs)"
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Consultas de segmento ("fãs que curtem VALORANT e CS:GO") com fan_interests
+indexada contra o caminho antigo: SELECT * + str.get_dummies(sep=',') no pandas.
+
+Uso: python -m benchmarks.bench_segments [--sizes 10000 1000000]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+INTERESTS = ["FURIA", "CS:GO", "LoL", "VALORANT", "R6 Siege", "Outro"]
+SEGMENT = ["VALORANT", "CS:GO"]
+
+
+def populate(storage, n, seed=1):
+    """Insere n fãs sintéticos em lotes, numa transação só."""
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    rows = (
+        (f"Fã {i}", "Rua Teste, 1", f"{i:011d}", ",".join(rng.sample(INTERESTS, rng.randint(1, 4))),
+         "Watch party", "Camiseta", "", "", rng.randint(0, 10), None,
+         (start + timedelta(minutes=i)).isoformat())
+        for i in range(n)
+    )
+    with storage.transaction() as conn:
+        conn.executemany(storage.INSERT_FAN, rows)
+
+
+def timed(fn, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 1000000])
+    args = parser.parse_args()
+
+    import storage
+    import fan_stats
+    try:
+        import pandas as pd
+    except ImportError:
+        pd = None
+
+    for n in args.sizes:
+        storage.DB_PATH = os.path.join(tempfile.mkdtemp(), f"segments_{n}.db")
+        populate(storage, n)
+        load, _ = timed(fan_stats.refresh_aggregates, repeat=1)
+        print(f"\n{n} fãs (agregação + fan_interests: {load:.2f} s)")
+
+        t, count = timed(lambda: fan_stats.segment_count(SEGMENT, 'all'))
+        print(f"  fan_interests  E  {t * 1000:9.2f} ms  ({count} fãs)")
+        t, count = timed(lambda: fan_stats.segment_count(SEGMENT, 'any'))
+        print(f"  fan_interests  OU {t * 1000:9.2f} ms  ({count} fãs)")
+        t, _ = timed(lambda: fan_stats.segment_members(SEGMENT, 'all', limit=50))
+        print(f"  fan_interests  página de membros {t * 1000:9.2f} ms")
+
+        if pd is None:
+            print("  pandas não instalado: caminho antigo não medido")
+            continue
+
+        def legacy(match):
+            df = pd.read_sql_query("SELECT * FROM fans", storage.get_connection())
+            dummies = df['interests'].str.get_dummies(sep=',')
+            mask = dummies[SEGMENT].all(axis=1) if match == 'all' else dummies[SEGMENT].any(axis=1)
+            return int(mask.sum())
+
+        t, count = timed(lambda: legacy('all'), repeat=1)
+        print(f"  get_dummies    E  {t * 1000:9.2f} ms  ({count} fãs)")
+        t, count = timed(lambda: legacy('any'), repeat=1)
+        print(f"  get_dummies    OU {t * 1000:9.2f} ms  ({count} fãs)")
+
+
+if __name__ == "__main__":
+    main()
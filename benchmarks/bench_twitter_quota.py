@@ -0,0 +1,61 @@
+"""
+Dispara buscas de timeline contra o servidor falso do Twitter (benchmarks.fake_twitter)
+até passar da cota: compara o tweepy.Client direto (um por chamada, como antes) com
+o TwitterClientManager, que reaproveita a sessão e recusa localmente perto do limite.
+
+Uso: python -m benchmarks.bench_twitter_quota [--calls 40] [--limit 15] [--latency 0.02]
+"""
+import argparse
+import statistics
+import time
+
+import tweepy
+
+from benchmarks.fake_twitter import FakeTwitterServer, redirect_session
+from twitter_clients import RateLimited, TwitterClientManager
+
+
+def run(label, server, calls, make_client):
+    ok = limited = 0
+    latencies = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        try:
+            make_client().get_users_tweets(123, max_results=5)
+            ok += 1
+        except (RateLimited, tweepy.TooManyRequests):
+            limited += 1
+        latencies.append(time.perf_counter() - start)
+    route = "/2/users/:id/tweets"
+    print(f"{label:<22} ok {ok:3d}  limitadas {limited:3d}  no servidor {server.hits[route]:3d}"
+          f"  429 recebidos {server.rejected[route]:3d}  p50 {statistics.median(latencies) * 1000:6.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--calls", type=int, default=40)
+    parser.add_argument("--limit", type=int, default=15)
+    parser.add_argument("--latency", type=float, default=0.02)
+    args = parser.parse_args()
+
+    server = FakeTwitterServer(limit=args.limit, latency=args.latency).start()
+    hook = redirect_session(server.url)
+
+    def bare_client():
+        client = tweepy.Client(bearer_token="fake")
+        hook(client.session)
+        return client
+
+    run("tweepy.Client direto", server, args.calls, bare_client)
+    server.stop()
+
+    server = FakeTwitterServer(limit=args.limit, latency=args.latency).start()
+    manager = TwitterClientManager(session_hook=redirect_session(server.url))
+    run("TwitterClientManager", server, args.calls, lambda: manager.client_v2("fake"))
+    server.stop()
+    for endpoint, stats in manager.metrics().items():
+        print(endpoint, stats)
+
+
+if __name__ == "__main__":
+    main()
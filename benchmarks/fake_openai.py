@@ -0,0 +1,94 @@
+"""
+Servidor HTTP local que imita o endpoint /v1/chat/completions da OpenAI usado na
+checagem de links, com latência configurável e contagem de chamadas.
+
+O SDK da OpenAI lê a URL base de OPENAI_BASE_URL: use_fake_openai(server) aponta
+os clientes criados depois dela (síncronos e AsyncOpenAI) para cá.
+"""
+import json
+import os
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_PROFILE = re.compile(r"O perfil do usuário: (.*?)\.Conteúdo extraído: (.*?)\.Responda", re.S)
+
+
+def answer(prompt):
+    """
+    'SIM' se alguma palavra do nome no perfil aparece no conteúdo da página, senão 'NÃO'
+    (determinístico, para os benchmarks repetirem as mesmas decisões).
+    """
+    match = _PROFILE.search(prompt)
+    if not match:
+        return "NÃO"
+    name = match.group(1).split(",")[0]
+    content = match.group(2).upper()
+    return "SIM" if any(len(w) > 2 and w.upper() in content for w in name.split()) else "NÃO"
+
+
+class FakeOpenAIServer:
+    """
+    :param latency: atraso artificial por resposta (o GPT-4 real leva segundos)
+    """
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.calls = 0
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._httpd.daemon_threads = True
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address
+        return f"http://{host}:{port}/v1"
+
+    def start(self):
+        threading.Thread(target=self._httpd.serve_forever, name="fake-openai", daemon=True).start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                if not self.path.endswith("/chat/completions"):
+                    self.send_error(404)
+                    return
+                request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                with server._lock:
+                    server.calls += 1
+                if server.latency:
+                    time.sleep(server.latency)
+                prompt = " ".join(m.get("content", "") for m in request.get("messages", []))
+                body = {
+                    "id": "chatcmpl-fake", "object": "chat.completion", "created": int(time.time()),
+                    "model": request.get("model", "gpt-4"),
+                    "choices": [{"index": 0, "finish_reason": "stop",
+                                 "message": {"role": "assistant", "content": answer(prompt)}}],
+                    "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": 1,
+                              "total_tokens": len(prompt) // 4 + 1},
+                }
+                data = json.dumps(body).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        return Handler
+
+
+def use_fake_openai(server):
+    """Aponta os clientes da OpenAI criados a partir de agora para o servidor falso."""
+    os.environ["OPENAI_BASE_URL"] = server.url
+    os.environ.setdefault("OPENAI_API_KEY", "fake")
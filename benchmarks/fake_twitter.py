@@ -0,0 +1,182 @@
+"""
+Servidor HTTP local que imita os endpoints da API do Twitter usados pelo app,
+com cabeçalhos x-rate-limit-* e 429 quando a cota da janela acaba.
+
+Os clientes do tweepy têm o host fixo (api.twitter.com); redirect_session monta
+na sessão deles um adapter que reescreve as URLs para o servidor falso.
+"""
+import itertools
+import json
+import re
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from requests.adapters import HTTPAdapter
+
+TWITTER_HOST = "https://api.twitter.com"
+
+_ROUTES = [
+    ("/2/users/by/username/:username", re.compile(r"^/2/users/by/username/([^/]+)$")),
+    ("/2/users/:id/tweets", re.compile(r"^/2/users/(\d+)/tweets$")),
+    ("/1.1/statuses/user_timeline.json", re.compile(r"^/1\.1/statuses/user_timeline\.json$")),
+]
+
+
+class _Window:
+    """Cota fixa por janela, como a API do Twitter (limite por 15 min)."""
+
+    def __init__(self, limit, window):
+        self.limit = limit
+        self.window = window
+        self.remaining = limit
+        self.reset_at = time.time() + window
+
+    def take(self):
+        now = time.time()
+        if now >= self.reset_at:
+            self.remaining = self.limit
+            self.reset_at = now + self.window
+        if self.remaining <= 0:
+            return False
+        self.remaining -= 1
+        return True
+
+
+class FakeTwitterServer:
+    """
+    :param limit: requisições por janela em cada endpoint
+    :param window: duração da janela em segundos
+    :param latency: atraso artificial por resposta
+    """
+
+    def __init__(self, limit=15, window=900, latency=0.0):
+        self.limit = limit
+        self.window = window
+        self.latency = latency
+        self.hits = {name: 0 for name, _ in _ROUTES}
+        self.rejected = {name: 0 for name, _ in _ROUTES}
+        self._windows = {name: _Window(limit, window) for name, _ in _ROUTES}
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1000)
+        # id -> username já resolvido, para o includes.users da timeline ser da conta certa
+        self._usernames = {}
+        self._start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="fake-twitter", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def _user(self, username):
+        uid = str(abs(hash(username.lower())) % 10**9)
+        self._usernames[uid] = username
+        return {"id": uid, "username": username,
+                "name": username.upper(), "profile_image_url": f"https://example.invalid/{username}.png"}
+
+    def _tweets(self, n):
+        with self._lock:
+            ids = [next(self._ids) for _ in range(n)]
+        return [(i, self._start + timedelta(minutes=i)) for i in ids]
+
+    def _payload(self, route, match, query):
+        if route == "/2/users/by/username/:username":
+            return {"data": self._user(match.group(1))}
+        if route == "/2/users/:id/tweets":
+            username = self._usernames.get(match.group(1), "FURIA")
+            user = {"id": match.group(1), "username": username, "name": username.upper(),
+                    "profile_image_url": f"https://example.invalid/{username}.png"}
+            n = 1 if "since_id" in query else int(query.get("max_results", ["5"])[0])
+            data = [{"id": str(i), "author_id": match.group(1), "text": f"Tweet {i} #DIADEFURIA",
+                     "edit_history_tweet_ids": [str(i)],
+                     "created_at": created.strftime("%Y-%m-%dT%H:%M:%S.000Z")}
+                    for i, created in self._tweets(n)]
+            return {"data": data, "includes": {"users": [user]}, "meta": {"result_count": n}}
+        # v1.1: lista de status, metade mencionando a FURIA
+        screen_name = query.get("screen_name", ["fan"])[0]
+        n = int(query.get("count", ["20"])[0])
+        user = self._user(screen_name)
+        user.update(id_str=user["id"], screen_name=screen_name)
+        return [{"id": i, "id_str": str(i), "user": user,
+                 "full_text": f"Vamos @FURIA {i}" if i % 2 else f"Tweet {i}",
+                 "created_at": created.strftime("%a %b %d %H:%M:%S +0000 %Y")}
+                for i, created in self._tweets(n)]
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                for route, pattern in _ROUTES:
+                    match = pattern.match(parsed.path)
+                    if match:
+                        break
+                else:
+                    self.send_error(404)
+                    return
+                if server.latency:
+                    time.sleep(server.latency)
+                with server._lock:
+                    window = server._windows[route]
+                    allowed = window.take()
+                    server.hits[route] += 1
+                    if not allowed:
+                        server.rejected[route] += 1
+                    headers = {"x-rate-limit-limit": str(window.limit),
+                               "x-rate-limit-remaining": str(window.remaining),
+                               "x-rate-limit-reset": str(int(window.reset_at))}
+                if allowed:
+                    status, body = 200, server._payload(route, match, parse_qs(parsed.query))
+                else:
+                    status, body = 429, {"title": "Too Many Requests", "detail": "Too Many Requests",
+                                         "errors": [{"message": "Rate limit exceeded", "code": 88}]}
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+        return Handler
+
+
+class _RedirectAdapter(HTTPAdapter):
+    def __init__(self, base_url, **kwargs):
+        self.base_url = base_url
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        request.url = self.base_url + request.url[len(TWITTER_HOST):]
+        # o servidor falso é local: nada de proxy do ambiente (ex.: o de fixtures da suíte)
+        kwargs["proxies"] = {}
+        return super().send(request, **kwargs)
+
+
+def redirect_session(base_url):
+    """
+    :return: session_hook para o TwitterClientManager que manda as requisições
+        de api.twitter.com para base_url
+    """
+    def hook(session):
+        session.mount(TWITTER_HOST, _RedirectAdapter(base_url))
+    return hook
@@ -0,0 +1,134 @@
+"""
+Servidor HTTP local com páginas estáticas (fixtures) no lugar de HLTV/Liquipedia/
+vlr.gg e da CDN do logo, com ETag e 304 para o GET condicional do LinkCache.
+
+Também atende como proxy HTTP: com HTTP_PROXY apontando para ele (use_as_proxy),
+os links continuam com os domínios reais (http://www.hltv.org/player/...), então
+o pré-classificador de links decide como em produção, mas nada sai da máquina.
+"""
+import hashlib
+import io
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+LOGO_PATH = "/assets/furia-logo.png"
+
+
+def player_page(site, name, filler_kb=64):
+    """Página de jogador no formato dos sites de e-sports (título cedo, corpo grande)."""
+    head = (
+        "<!DOCTYPE html><html><head><meta charset='utf-8'>"
+        f"<title>{name} - {site}</title>"
+        + "<link rel='stylesheet' href='/style.css'>" * 20
+        + f"<meta property='og:title' content='{name}'>"
+        "</head><body>"
+    )
+    row = "<tr><td>2025-01-01</td><td>FURIA</td><td>vs</td><td>NAVI</td><td>2:1</td></tr>\n"
+    body = f"<h1 class='firstHeading'>{name}</h1><table>" + row * (filler_kb * 1024 // len(row)) + "</table>"
+    return (head + body + "</body></html>").encode()
+
+
+def logo_png(size=256):
+    from PIL import Image, ImageDraw
+
+    img = Image.new("RGBA", (size, size), (0, 0, 0, 0))
+    ImageDraw.Draw(img).ellipse((8, 8, size - 8, size - 8), fill=(20, 20, 20, 255))
+    buf = io.BytesIO()
+    img.save(buf, "PNG")
+    return buf.getvalue()
+
+
+class FixtureServer:
+    """
+    :param pages: {url ou caminho: bytes}; URLs completas casam pelo host + caminho
+    :param latency: atraso artificial por resposta
+    """
+
+    def __init__(self, pages=None, latency=0.0):
+        self.pages = {}
+        for key, data in (pages or {}).items():
+            self.add(key, data)
+        self.latency = latency
+        self.hits = 0
+        self.not_modified = 0
+        self.bytes_sent = 0
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._httpd.daemon_threads = True
+
+    @staticmethod
+    def _key(url):
+        parts = urlsplit(url)
+        host = (parts.hostname or "").lower()
+        return host[4:] if host.startswith("www.") else host, parts.path or "/"
+
+    def add(self, url, data, content_type="text/html; charset=utf-8"):
+        etag = '"' + hashlib.sha1(data).hexdigest()[:16] + '"'
+        self.pages[self._key(url)] = (data, content_type, etag)
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address
+        return f"http://{host}:{port}"
+
+    def start(self):
+        threading.Thread(target=self._httpd.serve_forever, name="fixture-server", daemon=True).start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                # como proxy o caminho vem absoluto; direto, vale o Host do servidor local
+                url = self.path if "://" in self.path else "http://127.0.0.1" + self.path
+                page = server.pages.get(server._key(url))
+                if page is None:
+                    page = server.pages.get(("", urlsplit(url).path))
+                if page is None:
+                    self.send_error(404)
+                    return
+                data, content_type, etag = page
+                if server.latency:
+                    time.sleep(server.latency)
+                with server._lock:
+                    server.hits += 1
+                if self.headers.get("If-None-Match") == etag:
+                    with server._lock:
+                        server.not_modified += 1
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                self.send_header("ETag", etag)
+                self.end_headers()
+                try:
+                    self.wfile.write(data)
+                    with server._lock:
+                        server.bytes_sent += len(data)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # o extrator fechou a conexão depois de achar o título
+
+        return Handler
+
+
+def use_as_proxy(server):
+    """
+    Manda as requisições http:// de requests/httpx criados a partir de agora para o
+    servidor de fixtures (localhost fica de fora, para os outros servidores falsos).
+    """
+    os.environ["HTTP_PROXY"] = os.environ["http_proxy"] = server.url
+    os.environ["NO_PROXY"] = os.environ["no_proxy"] = "127.0.0.1,localhost"
@@ -0,0 +1,104 @@
+"""
+Teste de carga da camada de dados: várias threads fazendo cadastros
+(INSERT em fans) enquanto outras leem o dashboard (contagem + últimos fãs),
+como várias sessões do Streamlit ao mesmo tempo.
+
+Com --batched os cadastros passam pelo FanWriter (group commit em lotes).
+
+Uso: python -m benchmarks.load_storage [--writers 8] [--readers 8] [--seconds 5] [--batched]
+"""
+import argparse
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+
+
+def _signup_row(i):
+    return (
+        f"Fã {i}", "Rua Teste, 1", f"{i:011d}", "FURIA,CS:GO", "Watch party", "Camiseta",
+        "Twitter:https://twitter.com/fa", "https://www.hltv.org/player/1/fa", i % 11, None,
+        datetime.now(timezone.utc).isoformat(),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--writers", type=int, default=8)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--batched", action="store_true", help="grava pelo FanWriter")
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), "load.db")
+    import storage
+    storage.DB_PATH = path
+    storage.get_connection()
+    fan_writer = None
+    if args.batched:
+        from fan_writer import FanWriter
+        fan_writer = FanWriter()
+
+    stop = threading.Event()
+    counts = {"signups": 0, "reads": 0, "errors": 0}
+    latencies = {"signups": [], "reads": []}
+    lock = threading.Lock()
+
+    def writer(wid):
+        i = 0
+        while not stop.is_set():
+            start = time.perf_counter()
+            try:
+                if fan_writer:
+                    ticket = fan_writer.submit(_signup_row(wid * 10**6 + i))
+                    ticket.wait()
+                    if ticket.error:
+                        raise ticket.error
+                else:
+                    storage.execute(storage.INSERT_FAN, _signup_row(wid * 10**6 + i))
+                kind = "signups"
+            except sqlite3.OperationalError:
+                kind = "errors"
+            with lock:
+                counts[kind] += 1
+                if kind != "errors":
+                    latencies[kind].append(time.perf_counter() - start)
+            i += 1
+
+    def reader():
+        while not stop.is_set():
+            start = time.perf_counter()
+            try:
+                storage.query_one("SELECT COUNT(*) FROM fans")
+                storage.query("SELECT * FROM fans ORDER BY id DESC LIMIT 50")
+                kind = "reads"
+            except sqlite3.OperationalError:
+                kind = "errors"
+            with lock:
+                counts[kind] += 1
+                if kind != "errors":
+                    latencies[kind].append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=writer, args=(w,)) for w in range(args.writers)]
+    threads += [threading.Thread(target=reader) for _ in range(args.readers)]
+    for t in threads:
+        t.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+    if fan_writer:
+        fan_writer.close()
+        print(f"writer  {fan_writer.metrics()}")
+
+    for kind in ("signups", "reads"):
+        lat = sorted(latencies[kind]) or [0]
+        p50, p99 = lat[len(lat) // 2], lat[int(len(lat) * 0.99)]
+        print(f"{kind:<8}{counts[kind] / args.seconds:10.0f}/s  p50 {p50 * 1000:6.2f} ms  p99 {p99 * 1000:6.2f} ms")
+    print(f"erros   {counts['errors']}")
+
+
+if __name__ == "__main__":
+    main()
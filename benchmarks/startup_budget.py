@@ -0,0 +1,123 @@
+"""
+Orçamento de inicialização do app, para rodar no CI (sai com código 1 se estourar):
+
+1. importa, num processo novo com `python -X importtime`, os módulos que o main.py
+   importa no topo (lidos do próprio arquivo) e soma o tempo acumulado;
+2. confere que nenhum módulo pesado (pandas, OCR, tweepy, openai...) entra nesse import;
+3. se o Streamlit estiver instalado, mede o primeiro run e um rerun do main.py com
+   streamlit.testing (AppTest).
+
+Uso: python -m benchmarks.startup_budget [--import-budget-ms 150] [--rerun-budget-ms 300]
+"""
+import argparse
+import ast
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MAIN = os.path.join(ROOT, "main.py")
+
+# Não podem ser carregados só por abrir o app (ficam para o modo/passo que usa)
+HEAVY_MODULES = ("pandas", "numpy", "PIL", "pytesseract", "tweepy", "snscrape", "openai",
+                 "bs4", "httpx", "pyarrow", "requests")
+# Custo do próprio framework, fora do nosso controle
+FRAMEWORK_MODULES = ("streamlit", "dotenv")
+
+
+def top_level_imports(path=MAIN):
+    """Módulos importados no nível do módulo (fora de funções e blocos)."""
+    with open(path, encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    modules = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            modules.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module:
+            modules.append(node.module)
+    return list(dict.fromkeys(modules))
+
+
+def importtime(modules):
+    """
+    :return: (ms acumulados dos imports de topo, {módulo: ms}, nomes de todos os módulos carregados)
+    """
+    code = "; ".join(f"import {m}" for m in modules) or "pass"
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                            cwd=ROOT, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    baseline = subprocess.run([sys.executable, "-X", "importtime", "-c", "pass"],
+                              capture_output=True, text=True).stderr
+    already = {line.rsplit("|", 1)[-1].strip() for line in baseline.splitlines() if "|" in line}
+    top, loaded = {}, set()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if not cumulative.strip().isdigit():
+            continue  # cabeçalho
+        loaded.add(name.strip())
+        # sem recuo = import de topo desse processo
+        if not name.startswith("  ") and name.strip() not in already:
+            top[name.strip()] = int(cumulative) / 1000
+    return sum(top.values()), top, loaded
+
+
+def rerun_times():
+    """:return: (ms do primeiro run, ms do rerun) ou None sem Streamlit"""
+    try:
+        from streamlit.testing.v1 import AppTest
+    except ImportError:
+        return None
+    os.environ.setdefault("KNOWYOURFAN_DB", os.path.join(tempfile.mkdtemp(), "startup.db"))
+    # banco descartável: qualquer chave serve (sem ela o app para na configuração)
+    os.environ.setdefault("KNOWYOURFAN_CPF_KEY", "startup-budget")
+    app = AppTest.from_file(MAIN, default_timeout=60)
+    start = time.perf_counter()
+    app.run()
+    first = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    app.run()
+    return first, (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--import-budget-ms", type=float, default=150)
+    parser.add_argument("--rerun-budget-ms", type=float, default=300)
+    parser.add_argument("--include-framework", action="store_true",
+                        help="conta streamlit/dotenv no orçamento de import")
+    args = parser.parse_args()
+
+    failures = []
+    modules = [m for m in top_level_imports()
+               if args.include_framework or m.split(".")[0] not in FRAMEWORK_MODULES]
+    total, top, loaded = importtime(modules)
+    print(f"imports de topo do main.py: {total:.1f} ms (orçamento {args.import_budget_ms:.0f} ms)")
+    for name, ms in sorted(top.items(), key=lambda item: -item[1])[:10]:
+        print(f"  {ms:8.1f} ms  {name}")
+    if total > args.import_budget_ms:
+        failures.append(f"import de topo levou {total:.1f} ms")
+    heavy = sorted({m.split(".")[0] for m in loaded if m.split(".")[0] in HEAVY_MODULES})
+    if heavy:
+        failures.append(f"módulos pesados no import de topo: {', '.join(heavy)}")
+
+    times = rerun_times()
+    if times is None:
+        print("streamlit não instalado: medição de run/rerun pulada")
+    else:
+        first, rerun = times
+        print(f"primeiro run {first:.0f} ms, rerun {rerun:.0f} ms (orçamento {args.rerun_budget_ms:.0f} ms)")
+        if rerun > args.rerun_budget_ms:
+            failures.append(f"rerun levou {rerun:.0f} ms")
+
+    for failure in failures:
+        print("FALHOU:", failure)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Serviços falsos locais para rodar os caminhos quentes sem rede.
+"""
+import itertools
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+
+class StubTooManyRequests(Exception):
+    """Substitui tweepy.TooManyRequests quando o tweepy não está instalado."""
+
+
+class StubTwitterClient:
+    """
+    Imita a parte do tweepy.Client usada pelo app (get_user, get_users_tweets),
+    com latência configurável e contagem de chamadas.
+    """
+
+    def __init__(self, latency=0.05, fail_with=None):
+        self.latency = latency
+        self.fail_with = fail_with
+        self.calls = {"get_user": 0, "get_users_tweets": 0}
+        self._ids = itertools.count(1000)
+        self._lock = threading.Lock()
+        self._start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+    def _user(self, username):
+        uid = abs(hash(username.lower())) % 10**9
+        return SimpleNamespace(id=uid, username=username, name=username.upper(),
+                               profile_image_url=f"https://example.invalid/{username}.png")
+
+    def _call(self, name):
+        with self._lock:
+            self.calls[name] += 1
+        time.sleep(self.latency)
+        if self.fail_with is not None:
+            raise self.fail_with
+
+    def get_user(self, username, **kwargs):
+        self._call("get_user")
+        return SimpleNamespace(data=self._user(username))
+
+    def get_users_tweets(self, id, max_results=5, since_id=None, **kwargs):
+        self._call("get_users_tweets")
+        n = 1 if since_id else max_results
+        with self._lock:
+            ids = [next(self._ids) for _ in range(n)]
+        tweets = [
+            SimpleNamespace(id=i, author_id=id, text=f"Tweet {i} #DIADEFURIA",
+                            created_at=self._start + timedelta(minutes=i))
+            for i in ids
+        ]
+        user = SimpleNamespace(id=id, username="FURIA", name="FURIA",
+                               profile_image_url="https://example.invalid/furia.png")
+        return SimpleNamespace(data=tweets, includes={"users": [user]})
@@ -0,0 +1,426 @@
+"""
+Suíte offline dos caminhos quentes, com tudo que é rede trocado por servidores locais
+(benchmarks.fake_twitter, fake_openai, fixture_server) e documentos sintéticos
+(benchmarks.synthetic_docs):
+
+* wizard: latência de cada passo com os componentes do app (checagem de CPF,
+  OCR + pHash, timeline, checagem do link, gravação pelo FanWriter);
+* dashboard: consultas do modo Admin por tamanho da base (seed sintético);
+* caches: acerto dos caches de timeline, links e cards e chamadas que chegam aos serviços.
+
+O resultado de cada rodada vai para benchmarks/results/<commit>-<data>.json; --compare
+mostra a variação contra outra rodada (um commit, um arquivo ou "last").
+
+Uso: python -m benchmarks.suite [--only wizard dashboard caches] [--fans 20] [--sizes 10000 100000]
+                                [--compare last] [--no-save]
+"""
+import argparse
+import glob
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+# Latências dos serviços falsos, na ordem de grandeza dos reais vistos do Brasil
+TWITTER_LATENCY = 0.08
+OPENAI_LATENCY = 0.6
+PAGE_LATENCY = 0.15
+# Variação (fração) a partir da qual --compare marca a métrica
+REGRESSION_THRESHOLD = 0.10
+# ...e só se a diferença absoluta passar disso (abaixo de 1 ms é ruído da máquina)
+MIN_DELTA_MS = 1.0
+SITES = {"hltv.org": "HLTV.org", "liquipedia.net": "Liquipedia", "vlr.gg": "VLR.gg", "gosu.gg": "GOSU.gg"}
+
+
+def percentiles(values, prefix):
+    """{prefix_p50_ms, prefix_p95_ms} de uma lista de segundos."""
+    if not values:
+        return {}
+    ordered = sorted(values)
+    p95 = ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))]
+    return {f"{prefix}_p50_ms": statistics.median(ordered) * 1000, f"{prefix}_p95_ms": p95 * 1000}
+
+
+def wait_job(io, key, timeout=30):
+    """Espera um job do WizardIO como o rerun do wizard faria, sem o sleep de 0,5 s entre polls."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        status, result = io.poll(key)
+        if status in ("done", "error"):
+            io.forget(key)
+            if status == "error":
+                raise result
+            return result
+        time.sleep(0.001)
+    raise TimeoutError(key)
+
+
+def fresh_db(label):
+    import storage
+
+    storage.close_connection()
+    storage.DB_PATH = os.path.join(tempfile.mkdtemp(prefix="kyf-bench-"), f"{label}.db")
+    return storage.DB_PATH
+
+
+def drop_db(path):
+    import storage
+
+    storage.close_connection(path)
+    shutil.rmtree(os.path.dirname(path), ignore_errors=True)
+
+
+class Services:
+    """Sobe os servidores falsos e aponta Twitter, OpenAI e HTTP do processo para eles."""
+
+    def __init__(self, latency_scale=1.0):
+        from benchmarks.fake_openai import FakeOpenAIServer, use_fake_openai
+        from benchmarks.fake_twitter import FakeTwitterServer, redirect_session
+        from benchmarks.fixture_server import LOGO_PATH, FixtureServer, logo_png, use_as_proxy
+        from twitter_clients import get_manager
+
+        self.twitter = FakeTwitterServer(limit=10 ** 6, latency=TWITTER_LATENCY * latency_scale).start()
+        self.openai = FakeOpenAIServer(latency=OPENAI_LATENCY * latency_scale).start()
+        self.pages = FixtureServer(latency=PAGE_LATENCY * latency_scale).start()
+        self.pages.add(LOGO_PATH, logo_png(), "image/png")
+        self.logo_url = self.pages.url + LOGO_PATH
+        use_fake_openai(self.openai)
+        use_as_proxy(self.pages)
+        # o manager do processo é o que enhancements.fetch_user_furia_interactions usa
+        get_manager().session_hook = redirect_session(self.twitter.url)
+
+    def add_player(self, url, name):
+        from benchmarks.fixture_server import player_page
+
+        host = url.split("/")[2].removeprefix("www.")
+        self.pages.add(url, player_page(SITES.get(host, host), name))
+
+    def upstream(self):
+        return {"twitter_requests": sum(self.twitter.hits.values()), "openai_calls": self.openai.calls,
+                "page_requests": self.pages.hits, "page_304": self.pages.not_modified}
+
+    def stop(self):
+        for server in (self.twitter, self.openai, self.pages):
+            server.stop()
+
+
+def wizard_fans(n, seed):
+    """Cadastros do wizard: linha de fans + handle + link http:// (passa pelo proxy de fixtures)."""
+    import seed_db
+
+    rng = random.Random(seed)
+    for row in seed_db.synthetic_fans(n, seed=seed):
+        name = row[0]
+        handle = name.split()[0].lower() + str(rng.randint(1, 9999))
+        link = row[7].replace("https://", "http://")
+        # metade dos links leva o nome do fã no título (as regras decidem), metade não (vai ao LLM)
+        title = name if rng.random() < 0.5 else f"Player {rng.randint(1, 99999)}"
+        yield row, handle, link, title
+
+
+def bench_wizard(args, services):
+    """Latência de cada passo do wizard, fã a fã, com os mesmos componentes do main.py."""
+    from benchmarks.synthetic_docs import make_phone_photo
+    import fan_dedup
+    import fan_stats
+    import seed_db
+    import storage
+    from enhancements import match_document_text
+    from fan_writer import FanWriter
+    from link_cache import LinkCache
+    from link_rules import LinkPreClassifier
+    from ocr_cache import OCRCache, ocr_cache_key
+    from wizard_io import WizardIO
+    from wizard_sessions import WizardSessionStore
+
+    path = fresh_db("wizard")
+    # base já indexada para duplicados (regime normal, sem atraso de índice para o FanWriter drenar)
+    seed_db.bulk_load(seed_db.synthetic_fans(args.wizard_base, seed=args.seed + 1))
+    fan_dedup.rescan()
+
+    sessions = WizardSessionStore()
+    checker = fan_dedup.DuplicateChecker()
+    ocr_cache = OCRCache()
+    io = WizardIO(link_cache=LinkCache(), pre_classifier=LinkPreClassifier())
+
+    def after_write(conn):
+        fan_stats.apply_new_fans(conn)
+        fan_dedup.index_new_fans(conn, limit=fan_dedup.WRITER_INDEX_LIMIT)
+
+    writer = FanWriter(sql=storage.INSERT_SIGNUP, after_write=after_write)
+    ocr = None
+    if shutil.which("tesseract"):
+        from ocr_executor import OCRExecutor
+        ocr = OCRExecutor()
+    # step2 sem Tesseract vira step2_no_ocr (pré-processamento, pHash e checkpoint, sem o OCR)
+    step2 = "step2" if ocr is not None else "step2_no_ocr"
+    steps = {s: [] for s in ("step1", step2, "step2_cached", "step3", "step4", "step6", "logo")}
+    credentials = ("fake", "fake", "fake", "fake")
+
+    start = time.perf_counter()
+    wait_job(io, io.start_logo(services.logo_url))
+    steps["logo"].append(time.perf_counter() - start)
+    # o primeiro link que chega ao LLM importa o SDK da OpenAI (~0,5 s, uma vez por processo;
+    # o custo de import é do startup_budget): fora da conta dos passos
+    warmup = "http://www.hltv.org/player/1/warmup"
+    services.add_player(warmup, "Warmup")
+    wait_job(io, io.start_link_check("fake", warmup, "Ninguém, interesses: FURIA"))
+
+    for i, (row, handle, link, title) in enumerate(wizard_fans(args.fans, args.seed)):
+        name, address, cpf = row[0], row[1], row[2]
+        birth = f"{1 + i % 28:02d}/{1 + i % 12:02d}/{1980 + i % 25}"
+        token = sessions.create()
+        services.add_player(link, title)
+
+        start = time.perf_counter()
+        checker.cpf_fan_id(cpf)
+        # como o main.py: dados pessoais não vão para o checkpoint
+        sessions.checkpoint(token, 2, {"interests": row[3].split(","), "activities": row[4], "purchases": row[5]})
+        steps["step1"].append(time.perf_counter() - start)
+
+        img = make_phone_photo(name, birth, size=(2000, 1500), seed=args.seed + i)
+        start = time.perf_counter()
+        key = ocr_cache_key(img)
+        text = ocr_cache.get(key)
+        if text is None and ocr is not None:
+            ocr.submit(key, img)
+            while ocr.poll(key)[0] == "pending":
+                time.sleep(0.005)
+            status, text = ocr.poll(key)
+            ocr.forget(key)
+            if status == "error":
+                raise text
+        elif text is None:
+            text = f"NOME\n{name.upper()}\nDATA DE NASCIMENTO\n{birth}"
+        ocr_cache.put(key, text)
+        match_document_text(text, name, birth)
+        phash = fan_dedup.document_phash(img)
+        sessions.checkpoint(token, 3, {"doc_check": {"sha256": key, "phash": phash}})
+        steps[step2].append(time.perf_counter() - start)
+        # mesmo documento de novo (rerun/retomada): cache de OCR
+        start = time.perf_counter()
+        match_document_text(ocr_cache.get(ocr_cache_key(img)), name, birth)
+        steps["step2_cached"].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        wait_job(io, io.start_timeline(credentials, handle, 50))
+        sessions.checkpoint(token, 4, {"twitter_handle": handle})
+        steps["step3"].append(time.perf_counter() - start)
+
+        summary = f"{name}, interesses: {row[3].replace(',', ', ')}"
+        start = time.perf_counter()
+        wait_job(io, io.start_link_check("fake", link, summary))
+        sessions.checkpoint(token, 5, {"esports_link": link})
+        steps["step4"].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        dup = checker.check(cpf, name, address, phash)
+        if dup.cpf_fan_id is None and not dup.doc_matches:
+            ticket = writer.submit(row + (fan_dedup.cpf_hash(cpf), phash))
+            ticket.wait(10)
+        sessions.finish(token)
+        steps["step6"].append(time.perf_counter() - start)
+
+    writer.close()
+    io.close()
+    if ocr is not None:
+        ocr.shutdown()
+    results = {"fans": args.fans, "ocr": "tesseract" if ocr else "cache"}
+    for step, values in steps.items():
+        results.update(percentiles(values, step))
+    drop_db(path)
+    return results
+
+
+def bench_dashboard(args, services):
+    """Consultas que o modo Admin faz a cada abertura, por tamanho da base."""
+    import fan_search
+    import fan_stats
+    import seed_db
+
+    queries = {
+        "aggregates": lambda: (fan_stats.refresh_aggregates(), fan_stats.total_fans(), fan_stats.interest_counts(),
+                               fan_stats.fan_years_histogram(), fan_stats.daily_signups()),
+        "fans_page": lambda: fan_stats.fetch_fans_page(None, limit=50),
+        "segment": lambda: (fan_stats.segment_count(["FURIA", "VALORANT"], "all"),
+                            fan_stats.segment_members(["FURIA", "VALORANT"], "all", limit=50)),
+        "search": lambda: (fan_search.search("watch party"), fan_search.search_count("watch party")),
+    }
+    results = {}
+    for n in args.sizes:
+        path = fresh_db(f"dashboard_{n}")
+        started = time.perf_counter()
+        seed_db.bulk_load(seed_db.synthetic_fans(n, seed=args.seed))
+        results[f"n{n}_seed_s"] = time.perf_counter() - started
+        total = 0.0
+        for name, fn in queries.items():
+            best = float("inf")
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                fn()
+                best = min(best, time.perf_counter() - start)
+            results[f"n{n}_{name}_ms"] = best * 1000
+            total += best
+        results[f"n{n}_render_ms"] = total * 1000
+        drop_db(path)
+    return results
+
+
+def bench_caches(args, services):
+    """
+    Sessões repetindo contas e links com popularidade de cauda longa (poucos muito
+    acessados): taxa de acerto dos caches e quantas chamadas chegam aos serviços.
+    """
+    from link_cache import LinkCache
+    from link_rules import LinkPreClassifier
+    from tweet_cache import TimelineCache
+    from tweet_cards import TweetCardRenderer
+    from twitter_clients import get_manager
+    from wizard_io import WizardIO
+
+    path = fresh_db("caches")
+    rng = random.Random(args.seed)
+    fans = list(wizard_fans(args.cache_keys, args.seed))
+    for _, _, link, title in fans:
+        services.add_player(link, title)
+    weights = [1 / (rank + 1) for rank in range(len(fans))]
+    before = services.upstream()
+
+    timelines = TimelineCache(get_manager().client_v2("fake"))
+    cards = TweetCardRenderer()
+    io = WizardIO(link_cache=LinkCache(), pre_classifier=LinkPreClassifier())
+    started = time.perf_counter()
+    for _ in range(args.sessions):
+        row, handle, link, _ = rng.choices(fans, weights)[0]
+        tweets, users = timelines.get_timeline(handle, 5)
+        cards.render(tweets, users)
+        wait_job(io, io.start_link_check("fake", link, f"{row[0]}, interesses: {row[3]}"))
+    elapsed = time.perf_counter() - started
+    io.close()
+
+    after = services.upstream()
+    results = {"sessions": args.sessions, "distinct_keys": args.cache_keys,
+               "session_avg_ms": elapsed / args.sessions * 1000}
+    results.update({k: after[k] - before[k] for k in after})
+    for prefix, stats in (("timeline", timelines.stats()), ("links", io.link_cache.stats()),
+                          ("rules", io.pre_classifier.stats()), ("cards", cards.stats())):
+        for key, value in stats.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                results[f"{prefix}_{key}"] = value
+    drop_db(path)
+    return results
+
+
+CASES = {"wizard": bench_wizard, "dashboard": bench_dashboard, "caches": bench_caches}
+
+
+def git_commit():
+    """:return: (hash curto, há mudanças não commitadas?)"""
+    try:
+        sha = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                             text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT,
+                                    capture_output=True, text=True).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown", True
+    return sha, dirty
+
+
+def save(run):
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    stamp = run["date"].replace(":", "").replace("-", "")[:15]
+    name = run["commit"] + ("-dirty" if run["dirty"] else "") + f"-{stamp}"
+    path = os.path.join(RESULTS_DIR, f"{name}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(run, f, indent=2, ensure_ascii=False)
+    return path
+
+
+def load_baseline(ref, current_path=None):
+    """:param ref: 'last' (rodada salva mais recente), um hash de commit ou um caminho"""
+    if os.path.isfile(ref):
+        path = ref
+    else:
+        files = sorted(glob.glob(os.path.join(RESULTS_DIR, "*.json")), key=os.path.getmtime, reverse=True)
+        files = [f for f in files if f != current_path]
+        if ref != "last":
+            files = [f for f in files if os.path.basename(f).startswith(ref)]
+        if not files:
+            raise SystemExit(f"nenhuma rodada salva para {ref!r} em {RESULTS_DIR}")
+        path = files[0]
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def compare(baseline, run):
+    """Imprime as métricas de tempo (_ms/_s) que mudaram mais que REGRESSION_THRESHOLD e MIN_DELTA_MS."""
+    print(f"\nComparação com {baseline['commit']} ({baseline['date']}):")
+    changed = 0
+    for case, metrics in run["results"].items():
+        old = baseline["results"].get(case, {})
+        for key, value in metrics.items():
+            before = old.get(key)
+            if not isinstance(value, (int, float)) or not isinstance(before, (int, float)) or not before:
+                continue
+            if not key.endswith(("_ms", "_s")):
+                continue
+            delta = (value - before) / before
+            delta_ms = abs(value - before) * (1 if key.endswith("_ms") else 1000)
+            if abs(delta) >= REGRESSION_THRESHOLD and delta_ms >= MIN_DELTA_MS:
+                changed += 1
+                mark = "🔺 mais lento" if delta > 0 else "🟢 mais rápido"
+                print(f"  {case}.{key:<32} {before:10.2f} -> {value:10.2f}  {delta:+7.1%}  {mark}")
+    if not changed:
+        print(f"  nenhuma métrica de tempo variou {REGRESSION_THRESHOLD:.0%} ou mais")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", nargs="+", choices=list(CASES), default=list(CASES))
+    parser.add_argument("--fans", type=int, default=20, help="cadastros do caso wizard")
+    parser.add_argument("--wizard-base", type=int, default=50000, help="fãs já na base no caso wizard")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000], help="tamanhos do caso dashboard")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--sessions", type=int, default=200, help="sessões do caso caches")
+    parser.add_argument("--cache-keys", type=int, default=40, help="contas/links distintos no caso caches")
+    parser.add_argument("--latency-scale", type=float, default=1.0,
+                        help="multiplica a latência dos serviços falsos (0 = só o custo local)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--compare", metavar="REF", help='"last", hash de commit ou arquivo de resultado')
+    parser.add_argument("--no-save", action="store_true")
+    args = parser.parse_args()
+    # os bancos da suíte são temporários: qualquer chave do HMAC do CPF serve
+    os.environ.setdefault("KNOWYOURFAN_CPF_KEY", "kyf-bench")
+
+    commit, dirty = git_commit()
+    run = {"commit": commit, "dirty": dirty, "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+           "python": platform.python_version(), "machine": f"{platform.system()} {platform.machine()}",
+           "args": vars(args), "results": {}}
+    services = Services(args.latency_scale)
+    try:
+        for case in args.only:
+            started = time.perf_counter()
+            run["results"][case] = CASES[case](args, services)
+            print(f"\n== {case} ({time.perf_counter() - started:.1f} s)")
+            for key, value in run["results"][case].items():
+                print(f"  {key:<36} {value:10.2f}" if isinstance(value, float) else f"  {key:<36} {value}")
+    finally:
+        services.stop()
+    path = None
+    if not args.no_save:
+        path = save(run)
+        print(f"\nResultado salvo em {os.path.relpath(path, ROOT)}")
+    if args.compare:
+        compare(load_baseline(args.compare, path), run)
+
+
+if __name__ == "__main__":
+    main()
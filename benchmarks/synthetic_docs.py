@@ -0,0 +1,110 @@
+"""
+Gera imagens sintéticas de documentos (RG/CNH) localmente com PIL,
+para os benchmarks de OCR não dependerem de documentos reais.
+"""
+import random
+from io import BytesIO
+
+from PIL import Image, ImageDraw, ImageFont
+
+FIRST_NAMES = ["MARIANA", "FELIPE", "CARLA", "RAFAEL", "SOFIA", "JOÃO", "LUÍSA", "GABRIEL"]
+LAST_NAMES = ["ROCHA", "SANTOS", "MENEZES", "LIMA", "ALMEIDA", "CONCEIÇÃO", "ARAÚJO"]
+
+
+def _font(size):
+    for path in ("DejaVuSans-Bold.ttf", "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", "arial.ttf"):
+        try:
+            return ImageFont.truetype(path, size)
+        except OSError:
+            continue
+    return ImageFont.load_default()
+
+
+def random_identity(rng):
+    name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+    birth = f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/{rng.randint(1970, 2008)}"
+    return name, birth
+
+
+def make_document(name, birth, size=(1600, 1000), fmt="PNG"):
+    """
+    Desenha um documento simples com nome e data de nascimento.
+    :return: bytes da imagem no formato pedido
+    """
+    w, h = size
+    img = Image.new("RGB", size, (235, 240, 230))
+    draw = ImageDraw.Draw(img)
+    big, small = _font(h // 18), _font(h // 30)
+    draw.text((w * 0.05, h * 0.05), "REPÚBLICA FEDERATIVA DO BRASIL", fill=(20, 20, 20), font=small)
+    draw.text((w * 0.05, h * 0.30), "NOME", fill=(60, 60, 60), font=small)
+    draw.text((w * 0.05, h * 0.36), name, fill=(0, 0, 0), font=big)
+    draw.text((w * 0.05, h * 0.55), "DATA DE NASCIMENTO", fill=(60, 60, 60), font=small)
+    draw.text((w * 0.05, h * 0.61), birth, fill=(0, 0, 0), font=big)
+    buf = BytesIO()
+    img.save(buf, format=fmt)
+    return buf.getvalue()
+
+
+def _draw_card(kind, name, birth, rng, width=1200):
+    """Desenha um RG ou uma CNH com foto, campos e ruído de fundo."""
+    height = int(width * (0.667 if kind == "RG" else 0.706))
+    card = Image.new("RGB", (width, height), (222, 232, 214) if kind == "RG" else (214, 228, 236))
+    draw = ImageDraw.Draw(card)
+    label, value = _font(height // 32), _font(height // 20)
+    title = "CARTEIRA DE IDENTIDADE" if kind == "RG" else "CARTEIRA NACIONAL DE HABILITAÇÃO"
+    draw.text((width * 0.05, height * 0.04), title, fill=(30, 60, 30), font=label)
+    # foto 3x4 à esquerda
+    draw.rectangle((width * 0.05, height * 0.2, width * 0.3, height * 0.75), fill=(120, 110, 100))
+    x = width * 0.36
+    fields = [("NOME", name), ("DATA DE NASCIMENTO", birth),
+              ("NATURALIDADE", "SÃO PAULO - SP"), ("REGISTRO", f"{rng.randint(10**7, 10**8 - 1)}")]
+    if kind == "CNH":
+        fields.insert(2, ("CATEGORIA", rng.choice(["A", "B", "AB"])))
+    y = height * 0.18
+    for lab, val in fields:
+        draw.text((x, y), lab, fill=(70, 70, 70), font=label)
+        draw.text((x, y + height * 0.045), val, fill=(10, 10, 10), font=value)
+        y += height * 0.15
+    return card
+
+
+def make_phone_photo(name, birth, kind="RG", size=(4000, 3000), orientation=1, seed=0):
+    """
+    Simula a foto de celular de um documento: cartão sobre uma mesa escura,
+    em alta resolução, salvo em JPEG com a tag EXIF de orientação.
+    :param orientation: valor EXIF de orientação (1 = normal, 6 = girado 90°, 3 = 180°)
+    :return: bytes JPEG
+    """
+    rng = random.Random(seed)
+    card = _draw_card(kind, name, birth, rng)
+    w, h = size
+    scale = rng.uniform(0.55, 0.75) * w / card.width
+    card = card.resize((int(card.width * scale), int(card.height * scale)))
+    photo = Image.new("RGB", size, (48, 40, 35))
+    photo.paste(card, ((w - card.width) // 2 + rng.randint(-50, 50), (h - card.height) // 2 + rng.randint(-50, 50)))
+    # grava a imagem "crua" do sensor: o leitor precisa aplicar o EXIF para endireitar
+    raw = {1: photo, 3: photo.rotate(180, expand=True), 6: photo.rotate(90, expand=True),
+           8: photo.rotate(-90, expand=True)}[orientation]
+    exif = Image.Exif()
+    exif[0x0112] = orientation
+    buf = BytesIO()
+    raw.save(buf, format="JPEG", quality=90, exif=exif)
+    return buf.getvalue()
+
+
+def corpus(n, seed=42, **kwargs):
+    """Gera n tuplas (bytes, nome, nascimento) reprodutíveis."""
+    rng = random.Random(seed)
+    for _ in range(n):
+        name, birth = random_identity(rng)
+        yield make_document(name, birth, **kwargs), name, birth
+
+
+def phone_corpus(n, seed=42, **kwargs):
+    """Gera n fotos de RG/CNH reprodutíveis: tuplas (bytes, nome, nascimento, tipo)."""
+    rng = random.Random(seed)
+    for i in range(n):
+        name, birth = random_identity(rng)
+        kind = rng.choice(["RG", "CNH"])
+        orientation = rng.choice([1, 1, 6, 3])
+        yield make_phone_photo(name, birth, kind, orientation=orientation, seed=seed + i, **kwargs), name, birth, kind
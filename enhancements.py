@@ -1,91 +1,170 @@
-import re
-import requests
-from PIL import Image
-import pytesseract
-from io import BytesIO
-import tweepy
-from bs4 import BeautifulSoup
-import openai
+# pytesseract, numpy/PIL (ocr_preprocess), requests e openai são importados só nas
+# funções que usam: o app importa este módulo em todo rerun
+import metrics
+from ocr_matcher import fold, iter_tokens, match_tokens
+from twitter_clients import get_manager
+from link_cache import conditional_headers, content_hash, verdict_key
+from page_extract import CHUNK_BYTES, charset, extract_from_chunks
 
+# Idioma do Tesseract e versão do pré-processamento: ambos fazem parte da
+# chave do cache de OCR, mudar qualquer um invalida os textos já salvos
+OCR_LANG = 'por'
+PREPROCESS_VERSION = 3
+# Modelo que confere a relevância dos links de e-sports
+LINK_MODEL = 'gpt-4'
+
+
+def normalize_text(s):
+    """Normaliza para maiúsculas sem acentos."""
+    return fold(s)
+
+
+def extract_document_text(img_bytes, lang=OCR_LANG, config=None):
+    """
+    Roda o OCR no documento e devolve o texto normalizado.
+    :param img_bytes: bytes da imagem enviada
+    :param lang: idioma do Tesseract
+    :param config: PreprocessConfig usado antes do OCR (padrão: ocr_preprocess.DEFAULT_CONFIG)
+    :return: texto em maiúsculas sem acentos, uma linha do documento por linha
+    """
+    import pytesseract
+    from ocr_preprocess import DEFAULT_CONFIG, preprocess
+
+    # Corrige rotação, reduz e recorta só as faixas de texto do documento
+    img = preprocess(img_bytes, config or DEFAULT_CONFIG).image
+    # OCR por palavra (caixas), já remontando as linhas na ordem de leitura
+    data = pytesseract.image_to_data(img, lang=lang, output_type=pytesseract.Output.DICT)
+    lines = {}
+    for word, conf, block, par, line in zip(
+        data['text'], data['conf'], data['block_num'], data['par_num'], data['line_num']
+    ):
+        if word.strip() and float(conf) >= 0:
+            lines.setdefault((block, par, line), []).append(word.strip())
+    return normalize_text('\n'.join(' '.join(words) for words in lines.values()))
+
+
+def match_document_text(text_norm, expected_name, expected_birth):
+    """
+    Confere nome e data de nascimento num texto já extraído e normalizado,
+    palavra por palavra, parando assim que os dois forem encontrados.
+    :param text_norm: saída de extract_document_text
+    :param expected_name: nome informado pelo usuário
+    :param expected_birth: data de nascimento DD/MM/AAAA
+    :return: MatchResult (verdadeiro se os dados conferirem, com nota de confiança)
+    """
+    return match_tokens(iter_tokens(text_norm), expected_name, expected_birth)
+
+
+@metrics.timed("operation_seconds", op="validate_document_ocr")
 def validate_document_ocr(img_bytes, expected_name, expected_birth):
     """
     Extrai texto do documento e valida nome e data de nascimento.
     :param img_bytes: bytes da imagem enviada
     :param expected_name: nome informado pelo usuário
     :param expected_birth: data de nascimento DD/MM/AAAA
-    :return: True se os dados conferirem
+    :return: MatchResult (verdadeiro se os dados conferirem)
     """
-    # Carrega imagem e converte para tons de cinza
-    img = Image.open(BytesIO(img_bytes)).convert("L")
-    # OCR
-    text = pytesseract.image_to_string(img, lang='por')
-    # Normaliza para maiúsculas sem acentos
-    def normalize(s):
-        s = s.upper()
-        s = re.sub(r"[ÃÁÀÂÄ]", "A", s)
-        s = re.sub(r"[ÉÈÊË]", "E", s)
-        s = re.sub(r"[ÍÌÎÏ]", "I", s)
-        s = re.sub(r"[ÓÒÔÖÕ]", "O", s)
-        s = re.sub(r"[ÚÙÛÜ]", "U", s)
-        return s
-    text_norm = normalize(text)
-    name_norm = normalize(expected_name)
-    birth_norm = expected_birth.replace("/", "").strip()
-
-    # Verifica presença de nome e ano de nascimento
-    has_name = name_norm in text_norm
-    # Buscamos a data no formato DDMMYYYY
-    birth_match = re.search(r"\b" + re.escape(birth_norm) + r"\b", re.sub(r"/", "", text))
-    return has_name and bool(birth_match)
+    text_norm = extract_document_text(img_bytes)
+    return match_document_text(text_norm, expected_name, expected_birth)
 
 
+@metrics.timed("operation_seconds", op="fetch_user_furia_interactions")
 def fetch_user_furia_interactions(twitter_api_key, twitter_api_secret, twitter_token, twitter_token_secret, username, max_tweets=50):
     """
     Autentica no Twitter e retorna tweets do usuário que mencionam 'FURIA' ou interações com @FURIA.
+    O cliente é reaproveitado entre chamadas e a cota é controlada pelo TwitterClientManager.
     :return: lista de objetos Status do Tweepy
+    :raises RateLimited: se a cota do endpoint acabou (use o fallback com snscrape)
     """
-    auth = tweepy.OAuth1UserHandler(
+    api = get_manager().api_v1(
         twitter_api_key, twitter_api_secret,
         twitter_token, twitter_token_secret
     )
-    api = tweepy.API(auth, wait_on_rate_limit=True)
     tweets = api.user_timeline(screen_name=username, count=max_tweets, tweet_mode='extended')
     # Filtra menções
     furia_tweets = [t for t in tweets if 'FURIA' in t.full_text.upper() or '@FURIA' in t.full_text.upper()]
     return furia_tweets
 
 
-def validate_esports_link(openai_api_key, url, user_profile_summary):
-    """
-    Scrape do link de e-sports e valida com GPT-4 se o conteúdo é relevante ao perfil.
-    :param openai_api_key: chave da OpenAI
-    :param url: link de Liquipedia, HLTV ou gosu.gg
-    :param user_profile_summary: resumo de dados básicos do usuário
-    :return: True se GPT-4 considerar relevante
-    """
-    # Pega conteúdo da página
-    resp = requests.get(url, timeout=5)
-    resp.raise_for_status()
-    soup = BeautifulSoup(resp.text, 'html.parser')
-    # Extrai primeiro parágrafo ou título
-    title = soup.find(['h1', 'h2', 'title'])
-    content = title.get_text(strip=True) if title else ''
-
-    openai.api_key = openai_api_key
+def extract_page_title(html):
+    """Primeiro h1/h2/title da página (o que vai para o prompt de relevância)."""
+    return extract_from_chunks([html.encode()]).content()
+
+
+def link_relevance_messages(content, user_profile_summary):
+    """Mensagens do chat que pergunta ao modelo se o link combina com o perfil."""
     prompt = (
         f"Você é um modelo que verifica se um link de e-sports é relevante ao perfil do fã."
         f"O perfil do usuário: {user_profile_summary}."
         f"Conteúdo extraído: {content}."
         f"Responda apenas 'SIM' ou 'NÃO' se for relevante."
     )
-    completion = openai.ChatCompletion.create(
-        model="gpt-4",
-        messages=[{"role": "user", "content": prompt}],
-        temperature=0
-    )
+    return [{"role": "user", "content": prompt}]
+
+
+def is_relevant_answer(completion):
     answer = completion.choices[0].message.content.strip().upper()
     return answer.startswith('SIM')
 
+
+@metrics.timed("operation_seconds", op="validate_esports_link")
+def validate_esports_link(openai_api_key, url, user_profile_summary, cache=None, rules=None):
+    """
+    Scrape do link de e-sports e valida com GPT-4 se o conteúdo é relevante ao perfil.
+    (versão síncrona; o wizard usa a versão assíncrona de wizard_io)
+    :param openai_api_key: chave da OpenAI
+    :param url: link de Liquipedia, HLTV ou gosu.gg
+    :param user_profile_summary: resumo de dados básicos do usuário
+    :param cache: LinkCache opcional (página com GET condicional + veredito)
+    :param rules: LinkPreClassifier opcional; casos claros nem chegam ao GPT-4
+    :return: True se GPT-4 (ou as regras) considerar relevante
+    """
+    import openai
+    import requests
+
+    if rules:
+        url_decision = rules.by_url(url, user_profile_summary)
+        if url_decision.verdict is False:
+            return False
+
+    # Pega conteúdo da página (ou revalida a que está em cache)
+    page = cache.get_page(url) if cache else None
+    content = page.title if page else None
+    if page is None or not page.fresh:
+        # lê a resposta em blocos e para assim que acha o título (ou no limite de bytes)
+        with metrics.timed("http_request_seconds", service="link_page"), \
+                requests.get(url, timeout=5, headers=conditional_headers(page), stream=True) as resp:
+            if resp.status_code == 304 and page is not None:
+                cache.revalidated(page)
+            else:
+                resp.raise_for_status()
+                content = extract_from_chunks(
+                    resp.iter_content(CHUNK_BYTES), charset(resp.headers.get('Content-Type'))
+                ).content()
+                if cache:
+                    cache.put_page(url, content, resp.headers.get('ETag'), resp.headers.get('Last-Modified'))
+
+    if rules:
+        decision = rules.by_title(content, user_profile_summary, url_decision)
+        if decision.verdict is not None:
+            return decision.verdict
+        rules.escalated()
+    if cache:
+        key = verdict_key(url, content_hash(content), user_profile_summary, LINK_MODEL)
+        relevant = cache.get_verdict(key)
+        if relevant is not None:
+            return relevant
+    with metrics.timed("http_request_seconds", service="openai"):
+        completion = openai.OpenAI(api_key=openai_api_key).chat.completions.create(
+            model=LINK_MODEL,
+            messages=link_relevance_messages(content, user_profile_summary),
+            temperature=0
+        )
+    relevant = is_relevant_answer(completion)
+    if cache:
+        cache.put_verdict(key, url, relevant)
+    return relevant
+
 # Exemplos de uso:
 # 1) validate_document_ocr(uploaded.read(), st.session_state.name, st.session_state.birthdate)
 # 2) fetch_user_furia_interactions(os.getenv('TW_API_KEY'), ... , st.session_state.twitter_handle)
@@ -0,0 +1,429 @@
+"""
+Detecção de cadastros duplicados e de fraude:
+
+* CPF: HMAC-SHA256 dos dígitos (chave em KNOWYOURFAN_CPF_KEY) com índice único em fans.cpf_hash;
+* documento: pHash (DCT 8x8) da foto, indexado em faixas de 16 bits para achar
+  fotos parecidas (outra foto do mesmo RG) por distância de Hamming, confirmadas pelo nome;
+* nome + endereço: MinHash com LSH, para quase-duplicados ("R. Pixel 404" x "Rua Pixel, 404").
+
+check() responde no cadastro por índice; index_new_fans() indexa o que foi gravado
+(hook do FanWriter) e rescan() refaz tudo em lote para os dados antigos.
+
+Uso: python fan_dedup.py [--full]
+"""
+import argparse
+import hashlib
+import hmac
+import os
+import re
+import threading
+import time
+import unicodedata
+import zlib
+from collections import namedtuple
+
+import storage
+
+# Variável com a chave do HMAC do CPF. Não há padrão: são só ~10^9 CPFs, então com uma
+# chave pública (no código) quem tiver o banco reverte os hashes por força bruta
+CPF_KEY_ENV = "KNOWYOURFAN_CPF_KEY"
+
+# Distância de Hamming máxima entre pHashes para considerar a mesma foto de documento
+MAX_DOC_DISTANCE = 6
+# Em 32x32 todo RG do mesmo modelo fica parecido: o pHash só traz candidatos, e a
+# suspeita exige também o mesmo nome (o OCR do passo 2 já conferiu o nome no documento)
+DOC_NAME_THRESHOLD = 0.8
+MAX_DOC_CANDIDATES = 200
+# 4 faixas de 16 bits, cada uma consultada com o valor exato e os 16 vizinhos de 1 bit:
+# pelo princípio da casa dos pombos acha tudo até distância 7 (> MAX_DOC_DISTANCE)
+DOC_BANDS = 4
+DOC_BAND_BITS = 16
+
+# MinHash: 32 permutações em 8 faixas de 4 linhas -> limiar do LSH perto de Jaccard 0,6
+MINHASH_PERMUTATIONS = 32
+LSH_BANDS = 8
+SHINGLE_SIZE = 3
+# Jaccard mínimo (exato, nos shingles) para marcar nome + endereço como quase-duplicado
+IDENTITY_THRESHOLD = 0.7
+# Candidatos do LSH conferidos por consulta
+MAX_CANDIDATES = 50
+
+# Quantos fãs cada passada de index_new_fans processa
+INDEX_BATCH = 10000
+# Teto por lote do FanWriter: depois de uma carga em massa sem --dedup, o atraso é
+# drenado aos poucos sem segurar o commit dos cadastros (ou de uma vez com rescan())
+WRITER_INDEX_LIMIT = 500
+HIGH_WATER_KEY = "dedup_fans_id"
+
+# Abreviações comuns em endereços
+ABBREVIATIONS = {"r": "rua", "av": "avenida", "trav": "travessa", "tv": "travessa", "pca": "praca",
+                 "al": "alameda", "rod": "rodovia", "n": "", "no": ""}
+
+_PRIME = 4294967311  # primo > 2^32 para as permutações (a * h + b) % p cabe em uint64
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+_NUMBER = re.compile(r"\d+")
+
+DedupCheck = namedtuple("DedupCheck", "cpf_fan_id doc_matches similar")
+
+
+# --- CPF ---
+
+def cpf_check_digits(base):
+    """Os 2 dígitos verificadores ('12') dos 9 primeiros dígitos do CPF (texto)."""
+    digits = [int(d) for d in base]
+    for size in (9, 10):
+        total = sum(d * w for d, w in zip(digits, range(size + 1, 1, -1)))
+        digits.append(total * 10 % 11 % 10)
+    return f"{digits[9]}{digits[10]}"
+
+
+def normalize_cpf(cpf):
+    """
+    Só os dígitos ('111.222.333-96' -> '11122233396').
+    :return: None se não forem 11 dígitos com os verificadores certos (ou todos iguais)
+    """
+    digits = re.sub(r"\D", "", cpf or "")
+    if len(digits) != 11 or len(set(digits)) == 1 or cpf_check_digits(digits[:9]) != digits[9:]:
+        return None
+    return digits
+
+
+def cpf_hash_key():
+    """
+    Chave do HMAC do CPF, lida do ambiente a cada chamada (o app carrega o .env depois dos imports).
+    :raises RuntimeError: sem KNOWYOURFAN_CPF_KEY
+    """
+    key = os.getenv(CPF_KEY_ENV)
+    if not key:
+        raise RuntimeError(f"defina {CPF_KEY_ENV}: a chave do HMAC com que o CPF é guardado em fans.cpf_hash")
+    return key.encode()
+
+
+def cpf_hash(cpf):
+    """:return: HMAC-SHA256 dos dígitos do CPF, ou None se o CPF é inválido"""
+    digits = normalize_cpf(cpf)
+    if digits is None:
+        return None
+    return hmac.new(cpf_hash_key(), digits.encode(), hashlib.sha256).hexdigest()
+
+
+# --- documento (pHash) ---
+
+def _dct_matrix(n=32):
+    import numpy as np
+    k = np.arange(n)
+    m = np.cos(np.pi * (2 * k[None, :] + 1) * k[:, None] / (2 * n)) * np.sqrt(2 / n)
+    m[0] /= np.sqrt(2)
+    return m
+
+
+_dct = None
+
+
+def document_phash(img_bytes):
+    """
+    pHash de 64 bits da foto do documento: recorta o documento (mesma detecção do OCR),
+    reduz para 32x32, DCT e compara as 64 frequências baixas com a mediana.
+    :return: inteiro com sinal (cabe no INTEGER do SQLite)
+    """
+    global _dct
+    import numpy as np
+    from PIL import Image
+    from ocr_preprocess import PreprocessConfig, detect_document, load_image
+
+    gray = np.asarray(load_image(img_bytes, PreprocessConfig(max_side=512)))
+    top, bottom, left, right = detect_document(gray)
+    small = Image.fromarray(gray[top:bottom, left:right]).resize((32, 32), Image.Resampling.LANCZOS)
+    if _dct is None:
+        _dct = _dct_matrix()
+    coeffs = (_dct @ np.asarray(small, dtype=np.float64) @ _dct.T)[:8, :8].ravel()
+    bits = coeffs > np.median(coeffs[1:])
+    value = int("".join("1" if b else "0" for b in bits), 2)
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def hamming(a, b):
+    return bin((a ^ b) & 0xFFFFFFFFFFFFFFFF).count("1")
+
+
+def doc_bands(phash):
+    """:return: [(faixa, valor de 16 bits)]"""
+    value = phash & 0xFFFFFFFFFFFFFFFF
+    mask = (1 << DOC_BAND_BITS) - 1
+    return [(band, (value >> (band * DOC_BAND_BITS)) & mask) for band in range(DOC_BANDS)]
+
+
+def _doc_matches(conn, phash, name, exclude=None):
+    """
+    :return: [(fan_id, distância)] com distância <= MAX_DOC_DISTANCE e nome parecido
+    """
+    where, params = [], []
+    for band, value in doc_bands(phash):
+        probes = [value] + [value ^ (1 << bit) for bit in range(DOC_BAND_BITS)]
+        where.append(f"(band = ? AND value IN ({','.join('?' * len(probes))}))")
+        params += [band] + probes
+    candidates = [row[0] for row in conn.execute(
+        f"SELECT DISTINCT fan_id FROM fan_doc_bands WHERE {' OR '.join(where)} LIMIT ?",
+        params + [MAX_DOC_CANDIDATES + 1]
+    )]
+    candidates = [c for c in candidates if c != exclude][:MAX_DOC_CANDIDATES]
+    if not candidates:
+        return []
+    name_shingles = shingles(name, "")
+    matches = []
+    for fan_id, other, other_name in conn.execute(
+        f"SELECT id, doc_phash, name FROM fans WHERE id IN ({','.join('?' * len(candidates))})", candidates
+    ):
+        distance = hamming(phash, other)
+        if distance <= MAX_DOC_DISTANCE and jaccard(name_shingles, shingles(other_name, "")) >= DOC_NAME_THRESHOLD:
+            matches.append((fan_id, distance))
+    return sorted(matches, key=lambda m: m[1])
+
+
+# --- nome + endereço (MinHash/LSH) ---
+
+def _fold(text):
+    return "".join(c for c in unicodedata.normalize("NFKD", (text or "").lower()) if not unicodedata.combining(c))
+
+
+def normalize_identity(name, address):
+    """Nome + endereço sem acento, pontuação nem abreviações ('R.' -> 'rua')."""
+    words = _NON_ALNUM.sub(" ", _fold(f"{name} {address}")).split()
+    return " ".join(w for w in (ABBREVIATIONS.get(w, w) for w in words) if w)
+
+
+def shingles(name, address):
+    text = normalize_identity(name, address)
+    if len(text) < SHINGLE_SIZE:
+        return {text} if text else set()
+    return {text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)}
+
+
+_permutations = None
+
+
+def minhash(shingle_set):
+    """Assinatura MinHash (MINHASH_PERMUTATIONS valores) calculada com numpy."""
+    global _permutations
+    import numpy as np
+    if _permutations is None:
+        rng = np.random.RandomState(20240501)
+        _permutations = (rng.randint(1, 1 << 32, MINHASH_PERMUTATIONS, dtype=np.uint64),
+                         rng.randint(0, 1 << 32, MINHASH_PERMUTATIONS, dtype=np.uint64))
+    a, b = _permutations
+    hashes = np.fromiter((zlib.crc32(s.encode()) for s in shingle_set), dtype=np.uint64, count=len(shingle_set))
+    return ((np.outer(a, hashes) + b[:, None]) % _PRIME).min(axis=1)
+
+
+def lsh_buckets(signature, numbers=()):
+    """
+    :param numbers: address_numbers() do endereço; entram na chave do bucket, então só
+        colidem endereços com os mesmos números (vizinhos da mesma rua não lotam o bucket)
+    :return: [(faixa, bucket)] — um bucket de 64 bits por faixa de linhas da assinatura
+    """
+    rows = MINHASH_PERMUTATIONS // LSH_BANDS
+    suffix = "|".join(sorted(numbers)).encode()
+    return [
+        (band, int.from_bytes(hashlib.blake2b(signature[band * rows:(band + 1) * rows].tobytes() + suffix,
+                                              digest_size=8).digest(), "big", signed=True))
+        for band in range(LSH_BANDS)
+    ]
+
+
+def jaccard(a, b):
+    return len(a & b) / len(a | b) if a and b else 0.0
+
+
+def address_numbers(address):
+    """Números do endereço (casa, apto, CEP): vizinhos de rua diferem só neles, então precisam bater."""
+    return set(_NUMBER.findall(address or ""))
+
+
+def _similar(conn, shingle_set, buckets, numbers, exclude=None):
+    """
+    :param numbers: address_numbers() do endereço consultado
+    :return: [(fan_id, jaccard)] acima de IDENTITY_THRESHOLD, conferido nos shingles de verdade
+    """
+    if not shingle_set:
+        return []
+    candidates = [row[0] for row in conn.execute(
+        "SELECT DISTINCT fan_id FROM fan_identity_buckets WHERE "
+        + " OR ".join("(band = ? AND bucket = ?)" for _ in buckets) + " LIMIT ?",
+        [v for pair in buckets for v in pair] + [MAX_CANDIDATES + 1]
+    )]
+    candidates = [c for c in candidates if c != exclude][:MAX_CANDIDATES]
+    if not candidates:
+        return []
+    similar = []
+    for fan_id, name, address in conn.execute(
+        f"SELECT id, name, address FROM fans WHERE id IN ({','.join('?' * len(candidates))})", candidates
+    ):
+        if address_numbers(address) != numbers:
+            continue
+        score = jaccard(shingle_set, shingles(name, address))
+        if score >= IDENTITY_THRESHOLD:
+            similar.append((fan_id, round(score, 3)))
+    return sorted(similar, key=lambda s: -s[1])
+
+
+# --- consulta no cadastro ---
+
+class DuplicateChecker:
+    """
+    Consultas de duplicidade feitas pelo wizard antes de gravar (só leituras por índice).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {"checks": 0, "cpf_hits": 0, "doc_hits": 0, "identity_hits": 0, "seconds_total": 0.0}
+
+    def cpf_fan_id(self, cpf):
+        """:return: id do fã já cadastrado com esse CPF, ou None"""
+        h = cpf_hash(cpf)
+        if h is None:
+            return None
+        row = storage.query_one("SELECT id FROM fans WHERE cpf_hash = ?", (h,))
+        return row[0] if row else None
+
+    def check(self, cpf, name, address, doc_phash=None):
+        """
+        :return: DedupCheck(cpf_fan_id, doc_matches [(fan_id, distância)], similar [(fan_id, jaccard)])
+        """
+        start = time.perf_counter()
+        conn = storage.get_connection()
+        cpf_fan = self.cpf_fan_id(cpf)
+        doc = _doc_matches(conn, doc_phash, name) if doc_phash is not None else []
+        shingle_set = shingles(name, address)
+        numbers = address_numbers(address)
+        similar = (_similar(conn, shingle_set, lsh_buckets(minhash(shingle_set), numbers), numbers)
+                   if shingle_set else [])
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self._stats["checks"] += 1
+            self._stats["cpf_hits"] += cpf_fan is not None
+            self._stats["doc_hits"] += bool(doc)
+            self._stats["identity_hits"] += bool(similar)
+            self._stats["seconds_total"] += elapsed
+        return DedupCheck(cpf_fan, doc, similar)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats["ms_avg"] = stats["seconds_total"] / stats["checks"] * 1000 if stats["checks"] else 0.0
+        stats["flags"] = storage.query_one("SELECT COUNT(*) FROM fan_flags")[0]
+        return stats
+
+
+def recent_flags(limit=50):
+    """:return: (nomes das colunas, linhas) das suspeitas mais recentes, com os dois fãs"""
+    cur = storage.execute(
+        "SELECT f.kind, f.score, f.fan_id, a.name, f.other_fan_id, b.name AS other_name, f.created_at "
+        "FROM fan_flags f JOIN fans a ON a.id = f.fan_id LEFT JOIN fans b ON b.id = f.other_fan_id "
+        "ORDER BY f.created_at DESC LIMIT ?",
+        (limit,)
+    )
+    return [d[0] for d in cur.description], cur.fetchall()
+
+
+# --- indexação (contínua e em lote) ---
+
+def _high_water(conn):
+    row = conn.execute("SELECT value FROM agg_state WHERE name = ?", (HIGH_WATER_KEY,)).fetchone()
+    return row[0] if row else 0
+
+
+def _flag(conn, fan_id, other_fan_id, kind, score, now):
+    conn.execute(
+        "INSERT OR IGNORE INTO fan_flags (fan_id, other_fan_id, kind, score, created_at) VALUES (?,?,?,?,?)",
+        (fan_id, other_fan_id, kind, score, now)
+    )
+
+
+def index_new_fans(conn, limit=INDEX_BATCH):
+    """
+    Indexa (CPF, pHash, LSH) os fãs acima da marca d'água e registra em fan_flags os
+    duplicados que encontrar contra os já indexados. Deve rodar dentro de uma
+    transação (ex.: after_write do FanWriter).
+    :return: quantos fãs foram indexados
+    """
+    last = _high_water(conn)
+    rows = conn.execute(
+        "SELECT id, cpf, cpf_hash, name, address, doc_phash FROM fans WHERE id > ? ORDER BY id LIMIT ?",
+        (last, limit)
+    ).fetchall()
+    if not rows:
+        return 0
+    now = int(time.time())
+    for fan_id, cpf, stored_hash, name, address, phash in rows:
+        h = cpf_hash(cpf)
+        if h is not None and stored_hash != h:
+            # linha gravada sem o hash (seed, importação, dados antigos)
+            other = conn.execute("SELECT id FROM fans WHERE cpf_hash = ?", (h,)).fetchone()
+            if other is not None and other[0] != fan_id:
+                _flag(conn, fan_id, other[0], "cpf", 1.0, now)
+            else:
+                conn.execute("UPDATE fans SET cpf_hash = ? WHERE id = ?", (h, fan_id))
+        if phash is not None:
+            for other, distance in _doc_matches(conn, phash, name, exclude=fan_id):
+                _flag(conn, fan_id, other, "document", distance, now)
+            conn.executemany("INSERT OR IGNORE INTO fan_doc_bands (band, value, fan_id) VALUES (?,?,?)",
+                             [(band, value, fan_id) for band, value in doc_bands(phash)])
+        shingle_set = shingles(name, address)
+        if shingle_set:
+            numbers = address_numbers(address)
+            buckets = lsh_buckets(minhash(shingle_set), numbers)
+            for other, score in _similar(conn, shingle_set, buckets, numbers, exclude=fan_id):
+                _flag(conn, fan_id, other, "identity", score, now)
+            conn.executemany("INSERT OR IGNORE INTO fan_identity_buckets (band, bucket, fan_id) VALUES (?,?,?)",
+                             [(band, bucket, fan_id) for band, bucket in buckets])
+    conn.execute(
+        "INSERT INTO agg_state (name, value) VALUES (?, ?) ON CONFLICT(name) DO UPDATE SET value = excluded.value",
+        (HIGH_WATER_KEY, rows[-1][0])
+    )
+    return len(rows)
+
+
+def rescan(full=False, progress=None):
+    """
+    Indexa em lote o que ainda não foi indexado; com full=True recomeça do primeiro fã
+    (re-scan dos dados históricos). Cada lote é uma transação.
+    :return: quantos fãs foram processados
+    """
+    if full:
+        with storage.transaction() as conn:
+            conn.execute("DELETE FROM fan_doc_bands")
+            conn.execute("DELETE FROM fan_identity_buckets")
+            conn.execute("DELETE FROM fan_flags")
+            conn.execute("DELETE FROM agg_state WHERE name = ?", (HIGH_WATER_KEY,))
+    total = 0
+    while True:
+        with storage.transaction() as conn:
+            n = index_new_fans(conn)
+        total += n
+        if progress:
+            progress(total)
+        if n < INDEX_BATCH:
+            return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", help="caminho do banco (padrão: KNOWYOURFAN_DB ou knowyourfan.db)")
+    parser.add_argument("--full", action="store_true", help="refaz o índice e as suspeitas desde o primeiro fã")
+    args = parser.parse_args()
+    if args.db:
+        storage.DB_PATH = args.db
+    try:
+        cpf_hash_key()
+    except RuntimeError as e:
+        raise SystemExit(str(e))
+    started = time.perf_counter()
+    total = rescan(full=args.full, progress=lambda n: print(f"  {n} fãs...", end="\r", flush=True))
+    elapsed = time.perf_counter() - started
+    flags = dict(storage.query("SELECT kind, COUNT(*) FROM fan_flags GROUP BY kind"))
+    storage.close_connection()
+    print(f"\n✅ {total} fãs indexados em {elapsed:.1f} s ({total / max(elapsed, 1e-9):,.0f} fãs/s); suspeitas: {flags}")
+
+
+if __name__ == "__main__":
+    main()
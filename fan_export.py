@@ -0,0 +1,165 @@
+import csv
+import gzip
+import io
+import os
+import tempfile
+import time
+
+import storage
+from fan_stats import segment_sql
+
+# Linhas lidas do SQLite por vez: a memória usada não depende do tamanho da tabela
+CHUNK_ROWS = 5000
+FORMATS = {
+    'csv': ('text/csv', '.csv'),
+    'csv.gz': ('application/gzip', '.csv.gz'),
+    'parquet': ('application/vnd.apache.parquet', '.parquet'),
+}
+# Arquivos temporários da exportação: prefixo e idade a partir da qual são apagados
+# (sobras de sessões que caíram entre gerar e baixar)
+EXPORT_PREFIX = 'fura_fans_'
+EXPORT_TTL = 60 * 60
+
+
+def fan_columns():
+    """Colunas atuais da tabela fans, na ordem do banco."""
+    return [row[1] for row in storage.query("PRAGMA table_info(fans)")]
+
+
+def iter_chunks(columns=None, interests=None, match='all', created_from=None, created_to=None, chunk_rows=CHUNK_ROWS):
+    """
+    Lê os fãs do cursor do SQLite em blocos.
+    :param columns: colunas a exportar (padrão: todas)
+    :param interests: se informado, só fãs do segmento (ver fan_stats.segment_sql)
+    :param created_from: data ISO mínima de cadastro (inclusive)
+    :param created_to: data ISO máxima de cadastro (exclusive)
+    :return: (nomes das colunas, gerador de listas de linhas)
+    """
+    valid = fan_columns()
+    columns = list(columns or valid)
+    unknown = set(columns) - set(valid)
+    if unknown:
+        raise ValueError(f"colunas desconhecidas: {', '.join(sorted(unknown))}")
+    where, params = [], ()
+    if interests:
+        sql, seg_params = segment_sql(interests, match)
+        where.append(f"id IN ({sql})")
+        params += seg_params
+    if created_from:
+        where.append("created_at >= ?")
+        params += (created_from,)
+    if created_to:
+        where.append("created_at < ?")
+        params += (created_to,)
+    sql = f"SELECT {', '.join(columns)} FROM fans"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY id"
+
+    def chunks():
+        # conexão própria: o cursor fica aberto durante toda a exportação
+        conn = storage.connect()
+        try:
+            cur = conn.execute(sql, params)
+            while True:
+                rows = cur.fetchmany(chunk_rows)
+                if not rows:
+                    break
+                yield rows
+        finally:
+            conn.close()
+
+    return columns, chunks()
+
+
+def iter_csv(columns, chunks):
+    """Gera o CSV em pedaços de bytes (UTF-8), um por bloco de linhas."""
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(columns)
+    for rows in chunks:
+        writer.writerows(rows)
+        yield buf.getvalue().encode('utf-8')
+        buf.seek(0)
+        buf.truncate()
+    if buf.tell():
+        yield buf.getvalue().encode('utf-8')
+
+
+def write_export(fileobj, fmt='csv', **filters):
+    """
+    Escreve a exportação num arquivo binário aberto, bloco a bloco.
+    :param fmt: 'csv', 'csv.gz' ou 'parquet' (este exige pyarrow)
+    :param filters: repassados para iter_chunks (columns, interests, match, created_from, created_to)
+    :return: quantidade de linhas exportadas
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"formato inválido: {fmt}")
+    columns, chunks = iter_chunks(**filters)
+    count = 0
+
+    def counted():
+        nonlocal count
+        for rows in chunks:
+            count += len(rows)
+            yield rows
+
+    if fmt == 'parquet':
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("exportação Parquet requer pyarrow") from None
+        # tipos vêm do esquema do SQLite, não do primeiro bloco (que pode ter colunas só com NULL)
+        types = dict((row[1], row[2].upper()) for row in storage.query("PRAGMA table_info(fans)"))
+        schema = pa.schema([(c, pa.int64() if types.get(c) == 'INTEGER' else pa.string()) for c in columns])
+        with pq.ParquetWriter(fileobj, schema, compression='zstd') as writer:
+            for rows in counted():
+                writer.write_table(pa.Table.from_arrays(
+                    [pa.array(col, type=field.type) for col, field in zip(zip(*rows), schema)],
+                    schema=schema
+                ))
+        return count
+
+    out = gzip.GzipFile(fileobj=fileobj, mode='wb') if fmt == 'csv.gz' else fileobj
+    for piece in iter_csv(columns, counted()):
+        out.write(piece)
+    if out is not fileobj:
+        out.close()
+    return count
+
+
+def cleanup_exports(directory=None, ttl=EXPORT_TTL):
+    """
+    Apaga exportações temporárias mais velhas que ttl segundos.
+    :return: quantos arquivos foram apagados
+    """
+    directory = directory or tempfile.gettempdir()
+    cutoff = time.time() - ttl
+    removed = 0
+    for entry in os.scandir(directory):
+        if not entry.name.startswith(EXPORT_PREFIX) or not entry.is_file():
+            continue
+        try:
+            if entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+                removed += 1
+        except OSError:
+            pass  # outra sessão apagou antes
+    return removed
+
+
+def export_to_file(fmt='csv', directory=None, **filters):
+    """
+    Gera a exportação num arquivo temporário no disco (e apaga as sobras antigas).
+    :return: (caminho, quantidade de linhas)
+    """
+    cleanup_exports(directory)
+    fd, path = tempfile.mkstemp(suffix=FORMATS.get(fmt, ('', ''))[1], prefix=EXPORT_PREFIX, dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            count = write_export(f, fmt, **filters)
+    except BaseException:
+        os.remove(path)
+        raise
+    return path, count
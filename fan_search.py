@@ -0,0 +1,170 @@
+import re
+import unicodedata
+
+import storage
+
+# Colunas indexadas em fans_fts (migração 9), na ordem do índice
+SEARCH_COLUMNS = ("activities", "purchases", "interests")
+# Peso de cada coluna no bm25: interesses quase todo fã tem, pesam menos
+RANK_WEIGHTS = (2.0, 1.5, 0.5)
+DEFAULT_PAGE_SIZE = 20
+# O bm25 é calculado só para as N ocorrências mais recentes: termos comuns casam com
+# centenas de milhares de fãs e pontuar todos leva centenas de ms (None = todas).
+# Quem mostra os resultados avisa quando a janela cortou ocorrências (ranked_count)
+RANK_WINDOW = 5000
+# Palavras em volta do trecho encontrado
+SNIPPET_TOKENS = 12
+# Marcação do termo no trecho (markdown do Streamlit)
+HIGHLIGHT = ("**", "**")
+
+# Mesma noção de palavra do tokenizer unicode61 (letras e dígitos; '_' separa);
+# um '*' no fim pede busca por prefixo
+_TERM = re.compile(r"([^\W_]+)(\*?)")
+_WORD = re.compile(r"[^\W_]+")
+
+
+def _fold(word):
+    """Minúsculas e sem acento, como o unicode61 com remove_diacritics."""
+    return "".join(c for c in unicodedata.normalize("NFKD", word.lower()) if not unicodedata.combining(c))
+
+
+def parse_terms(text):
+    """'camis* furia' -> [('camis', True), ('furia', False)] (palavra, é prefixo?)"""
+    return [(word, bool(star)) for word, star in _TERM.findall(text or "")]
+
+
+def match_expression(text, columns=None):
+    """
+    Texto livre digitado no admin -> expressão MATCH do FTS5, sem deixar a sintaxe
+    do usuário (aspas, NEAR, OR...) chegar ao SQLite. Todas as palavras precisam
+    aparecer; "camis*" busca por prefixo (mais caro: o FTS5 junta o doclist de
+    cada termo que começa assim).
+    :param columns: restringe a busca a estas colunas de SEARCH_COLUMNS
+    :return: expressão ou None se não há palavra nenhuma
+    """
+    terms = parse_terms(text)
+    if not terms:
+        return None
+    expr = " ".join(f'"{word}"*' if prefix else f'"{word}"' for word, prefix in terms)
+    if columns:
+        unknown = set(columns) - set(SEARCH_COLUMNS)
+        if unknown:
+            raise ValueError(f"colunas fora do índice: {', '.join(sorted(unknown))}")
+        expr = "{" + " ".join(columns) + "}: (" + expr + ")"
+    return expr
+
+
+def highlight(text, terms, tokens=SNIPPET_TOKENS):
+    """
+    Trecho de até `tokens` palavras a partir da primeira ocorrência, com os termos marcados.
+    Feito aqui e não com snippet() do FTS5, que relê o doclist do termo para cada linha.
+    :param terms: saída de parse_terms
+    """
+    if not text:
+        return ""
+    exact = {_fold(word) for word, prefix in terms if not prefix}
+    prefixes = tuple(_fold(word) for word, prefix in terms if prefix)
+    found = list(_WORD.finditer(text))
+    if not found:
+        return text
+    hits = set()
+    for i, m in enumerate(found):
+        word = _fold(m.group())
+        if word in exact or (prefixes and word.startswith(prefixes)):
+            hits.add(i)
+    first = min(hits) if hits else 0
+    begin = max(0, min(first - tokens // 4, len(found) - tokens))
+    end = min(begin + tokens, len(found))
+    open_mark, close_mark = HIGHLIGHT
+    parts = ["…" if begin > 0 else text[:found[0].start()]]
+    pos = found[begin].start()
+    for i in range(begin, end):
+        m = found[i]
+        parts.append(text[pos:m.start()])
+        parts.append(f"{open_mark}{m.group()}{close_mark}" if i in hits else m.group())
+        pos = m.end()
+    parts.append(text[pos:] if end == len(found) else "…")
+    return "".join(parts)
+
+
+def _window_floor(expr, rank_window):
+    """Menor rowid entre as rank_window ocorrências mais recentes (percorre o índice de trás para frente)."""
+    if rank_window is None:
+        return 0
+    row = storage.query_one(
+        "SELECT rowid FROM fans_fts WHERE fans_fts MATCH ? ORDER BY rowid DESC LIMIT 1 OFFSET ?",
+        (expr, rank_window - 1)
+    )
+    return row[0] if row else 0
+
+
+def search(text, page=0, page_size=DEFAULT_PAGE_SIZE, columns=None, rank_window=RANK_WINDOW):
+    """
+    Fãs cujo texto casa com a busca, do mais relevante (bm25) para o menos, com um
+    trecho destacado de atividades e compras.
+    :param page: página (0 = primeira); as primeiras páginas são as que importam, então OFFSET basta
+    :param rank_window: quantas ocorrências (as mais recentes) entram no ranking
+    :return: (nomes das colunas, linhas) — id, name, activities, purchases, interests, score
+    """
+    names = ["id", "name", "activities", "purchases", "interests", "score"]
+    expr = match_expression(text, columns)
+    if expr is None:
+        return names, []
+    floor = _window_floor(expr, rank_window)
+    weights = ", ".join(map(str, RANK_WEIGHTS))
+    # top-k só pelo índice; fans é lido só para as linhas da página
+    top = storage.query(
+        f"SELECT rowid, bm25(fans_fts, {weights}) AS score FROM fans_fts "
+        "WHERE fans_fts MATCH ? AND rowid >= ? ORDER BY score LIMIT ? OFFSET ?",
+        (expr, floor, page_size, page * page_size)
+    )
+    if not top:
+        return names, []
+    ids = tuple(rowid for rowid, _ in top)
+    fans = {row[0]: row[1:] for row in storage.query(
+        f"SELECT id, name, activities, purchases, interests FROM fans WHERE id IN ({','.join('?' * len(ids))})", ids
+    )}
+    terms = parse_terms(text)
+    rows = []
+    for rowid, score in top:
+        if rowid in fans:
+            name, activities, purchases, interests = fans[rowid]
+            rows.append((rowid, name, highlight(activities, terms), highlight(purchases, terms), interests, score))
+    return names, rows
+
+
+def search_count(text, columns=None):
+    """Quantos fãs casam com a busca."""
+    expr = match_expression(text, columns)
+    if expr is None:
+        return 0
+    return storage.query_one("SELECT COUNT(*) FROM fans_fts WHERE fans_fts MATCH ?", (expr,))[0]
+
+
+def ranked_count(text, columns=None, rank_window=RANK_WINDOW):
+    """
+    Quantos fãs entram no ranking de search() com este rank_window, lendo no máximo
+    rank_window + 1 ocorrências do índice.
+    :return: (quantidade, limitado?) — limitado: há mais ocorrências, mais antigas, fora do ranking
+    """
+    if rank_window is None:
+        return search_count(text, columns), False
+    expr = match_expression(text, columns)
+    if expr is None:
+        return 0, False
+    n = storage.query_one(
+        "SELECT COUNT(*) FROM (SELECT rowid FROM fans_fts WHERE fans_fts MATCH ? LIMIT ?)", (expr, rank_window + 1)
+    )[0]
+    return min(n, rank_window), n > rank_window
+
+
+def index_fans_after(conn, fan_id):
+    """
+    Indexa os fãs com id > fan_id (para cargas em massa feitas com o trigger de
+    inserção desligado, ver seed_db). Deve rodar dentro da transação da carga.
+    """
+    conn.execute(
+        "INSERT INTO fans_fts (rowid, activities, purchases, interests) "
+        "SELECT id, activities, purchases, interests FROM fans WHERE id > ?",
+        (fan_id,)
+    )
@@ -0,0 +1,194 @@
+from collections import Counter
+from datetime import date
+
+import storage
+
+# Quantos fãs novos cada passada do refresher processa por vez
+REFRESH_BATCH = 10000
+# Chave da marca d'água (maior fans.id já agregado) em agg_state
+HIGH_WATER_KEY = 'fans_id'
+# Total de fãs agregados, em agg_state: fãs sem created_at (ou com data inválida, ex.:
+# importações antigas) não entram em nenhum dia, então a soma dos dias não serve de total
+TOTAL_KEY = 'fans_total'
+
+
+def _high_water(conn):
+    row = conn.execute("SELECT value FROM agg_state WHERE name = ?", (HIGH_WATER_KEY,)).fetchone()
+    return row[0] if row else 0
+
+
+def _signup_day(created_at):
+    """:return: 'AAAA-MM-DD' do cadastro, ou None se created_at não tem uma data válida"""
+    day = (created_at or "")[:10]
+    try:
+        date.fromisoformat(day)
+    except ValueError:
+        return None
+    return day
+
+
+def _upsert(conn, table, key_column, counts):
+    conn.executemany(
+        f"INSERT INTO {table} ({key_column}, fans) VALUES (?, ?) "
+        f"ON CONFLICT({key_column}) DO UPDATE SET fans = fans + excluded.fans",
+        counts.items()
+    )
+
+
+def apply_new_fans(conn, limit=REFRESH_BATCH):
+    """
+    Soma nos agregados (e em fan_interests) os fãs com id acima da marca d'água.
+    Deve rodar dentro de uma transação (ex.: a do lote do FanWriter).
+    :return: quantos fãs foram agregados
+    """
+    last = _high_water(conn)
+    rows = conn.execute(
+        "SELECT id, interests, fan_years, created_at FROM fans WHERE id > ? ORDER BY id LIMIT ?",
+        (last, limit)
+    ).fetchall()
+    if not rows:
+        return 0
+    interests, years, days = Counter(), Counter(), Counter()
+    links = []
+    for fan_id, fan_interests, fan_years, created_at in rows:
+        fan_set = storage.split_interests(fan_interests)
+        interests.update(fan_set)
+        links.extend((i, fan_id) for i in fan_set)
+        if fan_years is not None:
+            years[int(fan_years)] += 1
+        day = _signup_day(created_at)
+        if day is not None:
+            days[day] += 1
+    conn.executemany("INSERT OR IGNORE INTO fan_interests (interest, fan_id) VALUES (?, ?)", links)
+    _upsert(conn, "agg_interest_counts", "interest", interests)
+    _upsert(conn, "agg_fan_years", "fan_years", years)
+    _upsert(conn, "agg_daily_signups", "day", days)
+    conn.execute(
+        "INSERT INTO agg_state (name, value) VALUES (?, ?) "
+        "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+        (TOTAL_KEY, len(rows))
+    )
+    conn.execute(
+        "INSERT INTO agg_state (name, value) VALUES (?, ?) "
+        "ON CONFLICT(name) DO UPDATE SET value = excluded.value",
+        (HIGH_WATER_KEY, rows[-1][0])
+    )
+    return len(rows)
+
+
+def refresh_aggregates(conn=None):
+    """
+    Atualiza os agregados com tudo que entrou desde a última passada (ex.: seed_db, importações).
+    :param conn: conexão com uma transação já aberta (ex.: a da carga em massa); sem ela,
+        cada lote de REFRESH_BATCH fãs vai na sua transação
+    """
+    total = 0
+    while True:
+        if conn is None:
+            with storage.transaction() as tx:
+                n = apply_new_fans(tx)
+        else:
+            n = apply_new_fans(conn)
+        total += n
+        if n < REFRESH_BATCH:
+            return total
+
+
+def total_fans():
+    row = storage.query_one("SELECT value FROM agg_state WHERE name = ?", (TOTAL_KEY,))
+    return row[0] if row else 0
+
+
+def interest_counts():
+    """:return: lista de (interesse, fãs), do mais comum ao menos comum"""
+    return storage.query("SELECT interest, fans FROM agg_interest_counts ORDER BY fans DESC")
+
+
+def fan_years_histogram():
+    return storage.query("SELECT fan_years, fans FROM agg_fan_years ORDER BY fan_years")
+
+
+def daily_signups():
+    return storage.query("SELECT day, fans FROM agg_daily_signups ORDER BY day")
+
+
+def fetch_fans_page(before_id=None, limit=50, columns='*'):
+    """
+    Página de fãs do mais novo para o mais antigo, por keyset (id), sem OFFSET.
+    :param before_id: id do último fã da página anterior (None = primeira página)
+    :return: (nomes das colunas, linhas)
+    """
+    sql = f"SELECT {columns} FROM fans"
+    params = ()
+    if before_id is not None:
+        sql += " WHERE id < ?"
+        params = (before_id,)
+    cur = storage.execute(sql + " ORDER BY id DESC LIMIT ?", params + (limit,))
+    return [d[0] for d in cur.description], cur.fetchall()
+
+
+def _by_rarity(interests):
+    """Interesses sem repetição, do menos comum para o mais comum (pelos agregados)."""
+    interests = list(dict.fromkeys(interests))
+    if not interests:
+        raise ValueError("informe ao menos um interesse")
+    counts = dict(storage.query(
+        f"SELECT interest, fans FROM agg_interest_counts WHERE interest IN ({','.join('?' * len(interests))})",
+        tuple(interests)
+    ))
+    return sorted(interests, key=lambda i: counts.get(i, 0))
+
+
+def segment_sql(interests, match, before_id=None, limit=None):
+    """
+    SELECT fan_id do segmento, do mais novo para o mais antigo.
+    'all' (E) percorre o índice do interesse mais raro e confere os outros com EXISTS;
+    'any' (OU) junta as faixas de cada interesse. Com limit, cada faixa já para cedo.
+    """
+    if match not in ('all', 'any'):
+        raise ValueError("match deve ser 'all' ou 'any'")
+    interests = _by_rarity(interests)
+    bound = " AND fan_id < ?" if before_id is not None else ""
+    bound_params = (before_id,) if before_id is not None else ()
+    tail = " ORDER BY fan_id DESC" + (" LIMIT ?" if limit is not None else "")
+    tail_params = (limit,) if limit is not None else ()
+
+    if match == 'all':
+        sql = "SELECT fan_id FROM fan_interests a WHERE a.interest = ?" + bound
+        params = (interests[0],) + bound_params
+        for other in interests[1:]:
+            sql += " AND EXISTS (SELECT 1 FROM fan_interests b WHERE b.interest = ? AND b.fan_id = a.fan_id)"
+            params += (other,)
+        return sql + tail, params + tail_params
+
+    parts, params = [], ()
+    for interest in interests:
+        parts.append(f"SELECT * FROM (SELECT fan_id FROM fan_interests WHERE interest = ?{bound}{tail})")
+        params += (interest,) + bound_params + tail_params
+    return "SELECT fan_id FROM (" + " UNION ".join(parts) + ")" + tail, params + tail_params
+
+
+def segment_count(interests, match='all'):
+    """
+    Quantos fãs estão no segmento.
+    :param interests: lista de interesses, ex.: ['VALORANT', 'CS:GO']
+    :param match: 'all' (E) ou 'any' (OU)
+    """
+    if len(set(interests)) == 1:
+        row = storage.query_one("SELECT fans FROM agg_interest_counts WHERE interest = ?", (interests[0],))
+        return row[0] if row else 0
+    sql, params = segment_sql(interests, match)
+    return storage.query_one(f"SELECT COUNT(*) FROM ({sql})", params)[0]
+
+
+def segment_members(interests, match='all', before_id=None, limit=50, columns='*'):
+    """
+    Fãs do segmento, do mais novo para o mais antigo, paginados por keyset.
+    :return: (nomes das colunas, linhas)
+    """
+    sql, params = segment_sql(interests, match, before_id, limit)
+    cur = storage.execute(
+        f"SELECT {columns} FROM ({sql}) seg JOIN fans ON fans.id = seg.fan_id ORDER BY fans.id DESC",
+        params
+    )
+    return [d[0] for d in cur.description], cur.fetchall()
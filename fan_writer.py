@@ -0,0 +1,205 @@
+import atexit
+import queue
+import threading
+import time
+
+import storage
+
+# Padrões do group commit
+DEFAULT_MAX_QUEUE = 10000
+DEFAULT_BATCH_SIZE = 200
+# Quanto tempo o writer espera juntando cadastros antes de gravar o lote;
+# sob carga os lotes se formam sozinhos com o que chega durante o commit anterior
+DEFAULT_FLUSH_INTERVAL = 0.005
+# Quanto tempo submit() espera por espaço na fila antes de desistir
+DEFAULT_PUT_TIMEOUT = 2.0
+
+_STOP = object()
+
+
+class WriterBusy(Exception):
+    """Levantada quando a fila de gravação está cheia (backpressure)."""
+
+
+class SignupTicket:
+    """Comprovante de um cadastro enfileirado; fica pronto quando o lote é gravado."""
+
+    def __init__(self, on_insert=None):
+        self._event = threading.Event()
+        self.on_insert = on_insert
+        self.fan_id = None
+        self.error = None
+
+    @property
+    def done(self):
+        return self._event.is_set()
+
+    def wait(self, timeout=None):
+        """:return: True se o cadastro já foi gravado (com ou sem erro)"""
+        return self._event.wait(timeout)
+
+    def _resolve(self, fan_id=None, error=None):
+        self.fan_id = fan_id
+        self.error = error
+        self._event.set()
+
+
+class FanWriter:
+    """
+    Thread dedicada que drena uma fila limitada de cadastros e grava em lotes
+    (por tamanho ou janela de tempo) com executemany e um único commit.
+    """
+
+    def __init__(self, sql=storage.INSERT_FAN, max_queue=DEFAULT_MAX_QUEUE, batch_size=DEFAULT_BATCH_SIZE,
+                 flush_interval=DEFAULT_FLUSH_INTERVAL, path=None, after_write=None):
+        """
+        :param after_write: função chamada com a conexão dentro da transação de cada
+            lote, depois dos INSERTs (ex.: fan_stats.apply_new_fans)
+        """
+        self.sql = sql
+        self.after_write = after_write
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.path = path
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._stats_lock = threading.Lock()
+        self._stats = {"batches": 0, "rows": 0, "errors": 0,
+                       "commit_seconds_total": 0.0, "commit_seconds_max": 0.0, "last_batch_size": 0}
+        # cadastros aceitos e ainda não gravados (fila + lote em andamento)
+        self._inflight = 0
+        self._idle = threading.Condition()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="fan-writer", daemon=True)
+        self._thread.start()
+        # garante que nada fica na fila se o processo for encerrado
+        atexit.register(self.close)
+
+    def submit(self, row, timeout=DEFAULT_PUT_TIMEOUT, on_insert=None):
+        """
+        Enfileira um cadastro.
+        :param row: tupla de parâmetros para o INSERT
+        :param on_insert: função chamada com (conexão, fan_id) dentro da transação do lote,
+            para gravar algo junto com este cadastro (ex.: o checkpoint de uma importação)
+        :return: SignupTicket
+        :raises WriterBusy: se a fila continuar cheia após timeout
+        """
+        if self._closed:
+            raise RuntimeError("FanWriter já foi encerrado")
+        ticket = SignupTicket(on_insert)
+        with self._idle:
+            self._inflight += 1
+        try:
+            self._queue.put((row, ticket), timeout=timeout)
+        except queue.Full:
+            self._done(1)
+            raise WriterBusy("fila de gravação cheia") from None
+        return ticket
+
+    def _done(self, n):
+        with self._idle:
+            self._inflight -= n
+            if self._inflight == 0:
+                self._idle.notify_all()
+
+    def _collect(self, first):
+        batch = [first]
+        # primeiro pega tudo que já está na fila, sem esperar
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(item)
+        return batch
+
+    def _write(self, conn, batch):
+        start = time.perf_counter()
+        try:
+            with storage.transaction(conn):
+                cur = conn.executemany(self.sql, [row for row, _ in batch])
+                # dentro da mesma transação os ids do lote são consecutivos
+                last_id = conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+                first_id = last_id - cur.rowcount + 1
+                for offset, (_, ticket) in enumerate(batch):
+                    if ticket.on_insert:
+                        ticket.on_insert(conn, first_id + offset)
+                if self.after_write:
+                    self.after_write(conn)
+        except Exception as e:
+            if len(batch) > 1:
+                # uma linha ruim não derruba o lote: regrava uma a uma
+                for item in batch:
+                    self._write(conn, [item])
+                return
+            for _, ticket in batch:
+                ticket._resolve(error=e)
+            with self._stats_lock:
+                self._stats["errors"] += len(batch)
+            self._done(len(batch))
+            return
+        elapsed = time.perf_counter() - start
+        for offset, (_, ticket) in enumerate(batch):
+            ticket._resolve(fan_id=first_id + offset)
+        with self._stats_lock:
+            self._stats["batches"] += 1
+            self._stats["rows"] += len(batch)
+            self._stats["last_batch_size"] = len(batch)
+            self._stats["commit_seconds_total"] += elapsed
+            self._stats["commit_seconds_max"] = max(self._stats["commit_seconds_max"], elapsed)
+        self._done(len(batch))
+
+    def _run(self):
+        conn = storage.get_connection(self.path)
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            batch = self._collect(item)
+            if any(i is _STOP for i in batch):
+                batch = [i for i in batch if i is not _STOP]
+                stopping = True
+            if batch:
+                self._write(conn, batch)
+        # grava o que ainda estiver na fila antes de sair
+        leftover = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                leftover.append(item)
+        for i in range(0, len(leftover), self.batch_size):
+            self._write(conn, leftover[i:i + self.batch_size])
+        storage.close_connection(self.path)
+
+    def flush(self, timeout=None):
+        """Espera até todos os cadastros já enviados serem gravados."""
+        with self._idle:
+            return self._idle.wait_for(lambda: self._inflight == 0, timeout)
+
+    def close(self, timeout=10):
+        """Para o writer depois de gravar tudo que está na fila."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+
+    def metrics(self):
+        """Profundidade da fila e latência dos commits."""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["queue_depth"] = self._queue.qsize()
+        stats["commit_seconds_avg"] = stats["commit_seconds_total"] / stats["batches"] if stats["batches"] else 0.0
+        return stats
@@ -0,0 +1,179 @@
+import hashlib
+import threading
+import time
+from collections import namedtuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import storage
+
+# Página em cache dentro desse prazo é usada sem nem consultar o servidor;
+# depois dele vai um GET condicional (If-None-Match / If-Modified-Since)
+DEFAULT_PAGE_TTL = 24 * 60 * 60
+# Página guardada há mais tempo que isso é descartada (validadores velhos demais)
+DEFAULT_PAGE_MAX_AGE = 30 * 24 * 60 * 60
+# Veredito do LLM para (url, conteúdo, perfil, modelo)
+DEFAULT_VERDICT_TTL = 30 * 24 * 60 * 60
+DEFAULT_MAX_PAGES = 5000
+DEFAULT_MAX_VERDICTS = 20000
+# Só regrava last_access se o acesso anterior for mais velho que isso
+TOUCH_INTERVAL = 60
+
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+
+CachedPage = namedtuple("CachedPage", "url title content_hash etag last_modified fresh")
+
+
+def normalize_url(url):
+    """
+    Forma canônica do link: esquema e host em minúsculas, sem porta padrão,
+    sem fragmento, sem parâmetros utm_* e sem barra final.
+    """
+    parts = urlsplit(url.strip())
+    scheme = (parts.scheme or "https").lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and parts.port != _DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    path = parts.path.rstrip("/") or "/"
+    query = urlencode(sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+                             if not k.lower().startswith("utm_")))
+    return urlunsplit((scheme, host, path, query, ""))
+
+
+def content_hash(content):
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+def verdict_key(url, page_hash, user_profile_summary, model):
+    """Chave do veredito: URL normalizada + hash do conteúdo extraído + hash do perfil + modelo."""
+    summary_hash = hashlib.sha256(user_profile_summary.encode()).hexdigest()
+    return hashlib.sha256(f"{normalize_url(url)}\0{page_hash}\0{summary_hash}\0{model}".encode()).hexdigest()
+
+
+def conditional_headers(page):
+    """Cabeçalhos de revalidação para uma página já em cache (ou {} se não há)."""
+    headers = {}
+    if page is not None:
+        if page.etag:
+            headers["If-None-Match"] = page.etag
+        if page.last_modified:
+            headers["If-Modified-Since"] = page.last_modified
+    return headers
+
+
+class LinkCache:
+    """
+    Cache em dois níveis (SQLite) da validação de links de e-sports:
+    1. página: título extraído + ETag/Last-Modified, para GETs condicionais;
+    2. veredito: resposta do LLM para o mesmo conteúdo, perfil e modelo.
+    Despejo por TTL e, depois, por LRU quando passa do número de entradas.
+    """
+
+    def __init__(self, page_ttl=DEFAULT_PAGE_TTL, page_max_age=DEFAULT_PAGE_MAX_AGE,
+                 verdict_ttl=DEFAULT_VERDICT_TTL, max_pages=DEFAULT_MAX_PAGES, max_verdicts=DEFAULT_MAX_VERDICTS):
+        # as tabelas link_pages/link_verdicts são criadas pelas migrações do storage
+        self.page_ttl = page_ttl
+        self.page_max_age = page_max_age
+        self.verdict_ttl = verdict_ttl
+        self.max_pages = max_pages
+        self.max_verdicts = max_verdicts
+        self._lock = threading.Lock()
+        self._stats = {"page_hits": 0, "page_revalidated": 0, "page_misses": 0,
+                       "verdict_hits": 0, "verdict_misses": 0}
+
+    def _count(self, key):
+        with self._lock:
+            self._stats[key] += 1
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        pages = stats["page_hits"] + stats["page_revalidated"] + stats["page_misses"]
+        verdicts = stats["verdict_hits"] + stats["verdict_misses"]
+        # 304 também conta como acerto: não baixa nem parseia a página de novo
+        stats["page_hit_rate"] = (stats["page_hits"] + stats["page_revalidated"]) / pages if pages else 0.0
+        stats["verdict_hit_rate"] = stats["verdict_hits"] / verdicts if verdicts else 0.0
+        return stats
+
+    # --- páginas ---
+
+    def get_page(self, url):
+        """
+        :return: CachedPage (fresh=False quando precisa de GET condicional) ou None
+        """
+        url = normalize_url(url)
+        now = int(time.time())
+        row = storage.query_one(
+            "SELECT title, content_hash, etag, last_modified, fetched_at, last_access FROM link_pages "
+            "WHERE url = ? AND fetched_at > ?",
+            (url, now - self.page_max_age)
+        )
+        if row is None:
+            return None
+        title, page_hash, etag, last_modified, fetched_at, last_access = row
+        fresh = now - fetched_at < self.page_ttl
+        if fresh:
+            self._count("page_hits")
+        if now - last_access > TOUCH_INTERVAL:
+            storage.execute("UPDATE link_pages SET last_access = ? WHERE url = ?", (now, url))
+        return CachedPage(url, title, page_hash, etag, last_modified, fresh)
+
+    def revalidated(self, page):
+        """O servidor respondeu 304: a página em cache vale por mais um page_ttl."""
+        self._count("page_revalidated")
+        now = int(time.time())
+        storage.execute("UPDATE link_pages SET fetched_at = ?, last_access = ? WHERE url = ?", (now, now, page.url))
+        return page._replace(fresh=True)
+
+    def put_page(self, url, title, etag=None, last_modified=None):
+        self._count("page_misses")
+        url = normalize_url(url)
+        now = int(time.time())
+        page = CachedPage(url, title, content_hash(title), etag, last_modified, True)
+        with storage.transaction() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO link_pages (url, title, content_hash, etag, last_modified, fetched_at, last_access) "
+                "VALUES (?,?,?,?,?,?,?)",
+                (url, title, page.content_hash, etag, last_modified, now, now)
+            )
+            self._evict(conn, "link_pages", "url", "fetched_at", now - self.page_max_age, self.max_pages)
+        return page
+
+    # --- vereditos ---
+
+    def get_verdict(self, key):
+        """:return: True/False já decidido pelo LLM, ou None"""
+        now = int(time.time())
+        row = storage.query_one(
+            "SELECT relevant, last_access FROM link_verdicts WHERE cache_key = ? AND created_at > ?",
+            (key, now - self.verdict_ttl)
+        )
+        if row is None:
+            self._count("verdict_misses")
+            return None
+        self._count("verdict_hits")
+        relevant, last_access = row
+        if now - last_access > TOUCH_INTERVAL:
+            storage.execute("UPDATE link_verdicts SET last_access = ? WHERE cache_key = ?", (now, key))
+        return bool(relevant)
+
+    def put_verdict(self, key, url, relevant):
+        now = int(time.time())
+        with storage.transaction() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO link_verdicts (cache_key, url, relevant, created_at, last_access) "
+                "VALUES (?,?,?,?,?)",
+                (key, normalize_url(url), int(bool(relevant)), now, now)
+            )
+            self._evict(conn, "link_verdicts", "cache_key", "created_at", now - self.verdict_ttl, self.max_verdicts)
+
+    def _evict(self, conn, table, key_column, created_column, expired_before, max_entries):
+        conn.execute(f"DELETE FROM {table} WHERE {created_column} <= ?", (expired_before,))
+        count = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        if count <= max_entries:
+            return
+        # remove os menos usados recentemente até voltar para dentro do limite
+        conn.execute(
+            f"DELETE FROM {table} WHERE {key_column} IN "
+            f"(SELECT {key_column} FROM {table} ORDER BY last_access LIMIT ?)",
+            (count - max_entries,)
+        )
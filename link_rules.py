@@ -0,0 +1,139 @@
+import re
+import threading
+from collections import namedtuple
+from urllib.parse import unquote, urlsplit
+
+from ocr_matcher import fold
+
+# Fração mínima dos tokens do link/título explicada pelo perfil para aceitar sem o LLM
+ACCEPT_THRESHOLD = 0.6
+
+# Sites de e-sports e o formato das páginas de jogador/time (o nome vem no grupo "name")
+_ENTITY = r"(?:player|players|team|teams|profile)"
+ESPORTS_RULES = {
+    "hltv.org": [re.compile(r"^/(?:player|team)/\d+/(?P<name>[^/]+)$")],
+    "vlr.gg": [re.compile(r"^/(?:player|team)/\d+/(?P<name>[^/]+)$")],
+    "siege.gg": [re.compile(r"^/(?:players|teams)/\d+/(?P<name>[^/]+)$")],
+    "gosu.gg": [re.compile(rf"^/{_ENTITY}/(?:\d+/)?(?P<name>[^/]+)$")],
+    "fifa.gg": [re.compile(rf"^/{_ENTITY}/(?:\d+/)?(?P<name>[^/]+)$")],
+    # liquipedia.net/<jogo>/<Nome>; páginas de sistema têm ':' (Special:, Portal:...)
+    "liquipedia.net": [re.compile(r"^/[a-z0-9]+/(?P<name>(?!Main_Page$)[^/:]+)$")],
+}
+# Links que claramente não são páginas de e-sports (as redes sociais ficam no passo 3)
+NON_ESPORTS_DOMAINS = {
+    "google.com", "bing.com", "facebook.com", "instagram.com", "tiktok.com", "twitter.com", "x.com",
+    "linkedin.com", "wikipedia.org", "amazon.com", "mercadolivre.com.br", "bit.ly",
+}
+# Palavras dos títulos/resumos que não dizem nada sobre o fã
+STOPWORDS = {
+    "DE", "DA", "DO", "DAS", "DOS", "E", "THE", "OF", "INTERESSES", "OUTRO",
+    "LIQUIPEDIA", "WIKI", "HLTV", "ORG", "VLR", "GG", "SIEGE", "GOSU", "PLAYER", "PLAYERS",
+    "PROFILE", "TEAM", "STATS", "STATISTICS", "COUNTER", "STRIKE", "ESPORTS", "WWW", "COM", "NET",
+}
+# Nomes de jogos dizem de qual wiki é a página, não de quem ela é
+STOPWORDS |= {"CS", "GO", "CS2", "CSGO", "VALORANT", "LOL", "LEAGUE", "LEGENDS", "R6", "RAINBOW", "SIX", "FIFA"}
+# Títulos de página de erro: o link não serve, não precisa perguntar ao LLM
+_ERROR_TITLE = re.compile(r"\b(?:404|NOT FOUND|NAO ENCONTRADA|PAGE NOT FOUND|ERROR)\b")
+_TOKEN = re.compile(r"[A-Z0-9]+")
+
+# verdict: True/False decidido aqui, None = perguntar ao LLM;
+# name: nome do jogador/time tirado da URL (só nas decisões de by_url)
+Decision = namedtuple("Decision", "verdict score reason name", defaults=(None,))
+
+
+def tokens(text):
+    """Tokens significativos (maiúsculos, sem acento, sem stopwords, 2+ caracteres)."""
+    return {t for t in _TOKEN.findall(fold(unquote(text or ""))) if len(t) > 1 and t not in STOPWORDS}
+
+
+def overlap(candidate, profile):
+    """Fração dos tokens do candidato (slug ou título) que aparecem no perfil."""
+    return len(candidate & profile) / len(candidate) if candidate else 0.0
+
+
+def _domain(host):
+    host = (host or "").lower()
+    return host[4:] if host.startswith("www.") else host
+
+
+def _matches(domain, known):
+    return domain in known or any(domain.endswith("." + d) for d in known)
+
+
+class LinkPreClassifier:
+    """
+    Camada determinística antes do LLM na checagem de links:
+    1. pela URL (sem rede): recusa links que claramente não são de e-sports e
+       reconhece páginas de jogador/time cujo nome bate com o perfil;
+    2. pelo título da página: descarta páginas de erro, confirma o perfil da
+       camada 1 (o título tem que ser do nome da URL) ou mede a sobreposição de tokens com o resumo do perfil.
+    Os casos ambíguos sobem para o LLM; stats() mostra a taxa de escalonamento.
+    """
+
+    def __init__(self, accept_threshold=ACCEPT_THRESHOLD):
+        self.accept_threshold = accept_threshold
+        self._lock = threading.Lock()
+        self._reasons = {}
+        self._stats = {"checked": 0, "by_url": 0, "by_title": 0, "escalated": 0}
+
+    def _record(self, decision, tier):
+        with self._lock:
+            self._reasons[decision.reason] = self._reasons.get(decision.reason, 0) + 1
+            if decision.verdict is not None:
+                self._stats[tier] += 1
+        return decision
+
+    def by_url(self, url, user_profile_summary):
+        """
+        Primeira camada, só com a URL. Recusas são definitivas; um perfil que confere
+        (verdict True) ainda passa por by_title, para não aceitar página inexistente
+        nem de outra pessoa.
+        """
+        with self._lock:
+            self._stats["checked"] += 1
+        parts = urlsplit(url.strip())
+        if parts.scheme not in ("http", "https") or not parts.hostname:
+            return self._record(Decision(False, 0.0, "url_invalida"), "by_url")
+        domain = _domain(parts.hostname)
+        if _matches(domain, NON_ESPORTS_DOMAINS):
+            return self._record(Decision(False, 0.0, "dominio_fora_de_esports"), "by_url")
+        site = next((d for d in ESPORTS_RULES if _matches(domain, {d})), None)
+        if site is None:
+            return Decision(None, 0.0, "dominio_desconhecido")
+        path = parts.path.rstrip("/")
+        match = next((m for m in (r.match(path) for r in ESPORTS_RULES[site]) if m), None)
+        if match is None:
+            return Decision(None, 0.0, "pagina_nao_de_perfil")
+        score = overlap(tokens(match.group("name")), tokens(user_profile_summary))
+        if score >= self.accept_threshold:
+            return Decision(True, score, "perfil_confere_url", match.group("name"))
+        return Decision(None, score, "perfil_sem_nome_do_fa")
+
+    def by_title(self, title, user_profile_summary, url_decision=None):
+        """Segunda camada, com o título extraído da página (e a decisão de by_url)."""
+        if _ERROR_TITLE.search(fold(title or "")):
+            return self._record(Decision(False, 0.0, "pagina_de_erro"), "by_title")
+        if url_decision is not None and url_decision.verdict:
+            # HLTV/vlr.gg servem a página pelo id e ignoram o nome da URL: o título
+            # precisa ser do jogador da URL (ou do fã), senão quem decide é o LLM
+            expected = tokens(url_decision.name) | tokens(user_profile_summary)
+            score = overlap(tokens(title), expected)
+            if score >= self.accept_threshold:
+                return self._record(url_decision, "by_url")
+            return self._record(Decision(None, score, "titulo_diverge_da_url"), "by_title")
+        score = overlap(tokens(title), tokens(user_profile_summary))
+        if score >= self.accept_threshold:
+            return self._record(Decision(True, score, "titulo_confere"), "by_title")
+        return self._record(Decision(None, score, "ambiguo"), "by_title")
+
+    def escalated(self):
+        """Chamado quando o caso vai para o LLM."""
+        with self._lock:
+            self._stats["escalated"] += 1
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["reasons"] = dict(self._reasons)
+        stats["escalation_rate"] = stats["escalated"] / stats["checked"] if stats["checked"] else 0.0
+        return stats
@@ -1,18 +1,25 @@
 import os
 import streamlit as st
-import sqlite3
 from datetime import datetime
 import time
-from PIL import Image
-import requests
-import pandas as pd
+import hashlib
+import hmac
+import sqlite3
 from dotenv import load_dotenv
-from types import SimpleNamespace
-from enhancements import (
-    validate_document_ocr,
-    fetch_user_furia_interactions,
-    validate_esports_link
-)
+import storage
+from fan_writer import FanWriter, WriterBusy
+import fan_stats
+import fan_search
+import fan_dedup
+import metrics
+from tweet_cache import TimelineCache
+from tweet_prefetcher import TimelinePrefetcher
+from tweet_cards import TweetCardRenderer
+from wizard_sessions import WizardSessionStore
+from twitter_clients import RateLimited, get_manager
+# Módulos pesados (pandas, tweepy, snscrape, OCR, httpx/openai, exportação) são
+# importados só no modo/passo que os usa: este script roda de novo a cada rerun.
+# Orçamento de import conferido por benchmarks/startup_budget.py
 
 # Carrega variáveis de ambiente, sobrescrevendo as existentes
 load_dotenv(override=True)
@@ -24,47 +31,278 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Banco de Dados
-conn = sqlite3.connect('knowyourfan.db', check_same_thread=False)
-c = conn.cursor()
-c.execute("""
-CREATE TABLE IF NOT EXISTS tweets_cache (
-    tweet_id TEXT PRIMARY KEY,
-    author_id TEXT,
-    text TEXT,
-    created_at TEXT,
-    fetched_at INTEGER
-)
-""")
-
-# Tenta importar Tweepy e snscrape
+# Sem a chave do HMAC o CPF não pode ser guardado nem conferido: para antes do cadastro
 try:
-    import tweepy
-except ImportError:
-    tweepy = None
+    fan_dedup.cpf_hash_key()
+except RuntimeError as e:
+    st.error(f"⚙️ Configuração incompleta: {e}")
+    st.stop()
 
-try:
-    import snscrape.modules.twitter as sntwitter
-except ImportError:
-    sntwitter = None
+@st.cache_resource
+def init_storage():
+    # Banco de Dados: conexão por thread e migrações (uma vez por processo) no módulo storage
+    storage.get_connection()
+    return storage.DB_PATH
+
+
+init_storage()
+
+
+@st.cache_resource
+def get_metrics_server():
+    # /metrics (Prometheus) do processo; KNOWYOURFAN_METRICS_PORT vazio ou 0 desliga
+    if not metrics.DEFAULT_PORT:
+        return None
+    try:
+        return metrics.serve()
+    except OSError:
+        # porta ocupada (outro processo do app na mesma máquina): segue sem endpoint
+        return None
+
+
+get_metrics_server()
 
 # Funções Auxiliares
 
-def load_furia_logo():
+LOGO_URL = "https://cdn.furia.com.br/assets/furia-logo.png"
+# Asset local do logo (opcional): evita depender da CDN
+LOGO_PATH = os.getenv("FURIA_LOGO_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets", "furia-logo.png"))
+_IMAGE_SIGNATURES = (b"\x89PNG", b"\xff\xd8", b"GIF8", b"RIFF")
+
+
+@st.cache_resource
+def get_wizard_io():
+    # loop asyncio e pool httpx compartilhados por todas as sessões;
+    # páginas e vereditos da checagem de links ficam no SQLite e os casos
+    # claros são decididos pelas regras locais, sem chamar o LLM
+    from wizard_io import WizardIO
+    from link_cache import LinkCache
+    from link_rules import LinkPreClassifier
+    io = WizardIO(link_cache=LinkCache(), pre_classifier=LinkPreClassifier())
+    metrics.add_collector("link_cache", io.link_cache.stats)
+    metrics.add_collector("link_rules", io.pre_classifier.stats)
+    return io
+
+
+@st.cache_resource
+def load_local_logo():
     try:
-        url = "https://cdn.furia.com.br/assets/furia-logo.png"
-        return Image.open(requests.get(url, timeout=2, stream=True).raw)
-    except:
+        with open(LOGO_PATH, 'rb') as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def load_furia_logo():
+    """:return: bytes da imagem (st.image aceita direto) ou None enquanto não chega"""
+    logo = load_local_logo()
+    if logo is not None:
+        return logo
+    # sem asset local: baixa uma vez em segundo plano; enquanto não chega, a sidebar fica sem logo
+    io = get_wizard_io()
+    status, data = io.poll(io.start_logo(LOGO_URL))
+    if status == 'done' and data.startswith(_IMAGE_SIGNATURES):
+        return data
+    return None
+
+
+def await_io(state_key, inputs, start):
+    """
+    Resultado de um job do WizardIO para estes inputs, guardado na sessão depois de pronto.
+    Erros (timeout, 5xx) não ficam guardados: o job sai do registro e o próximo rerun
+    (ex.: o clique em "Continuar") tenta de novo.
+    :param start: função que inicia o job (idempotente) e devolve a chave
+    :return: ('pending', None), ('done', resultado) ou ('error', exceção)
+    """
+    cached = st.session_state.get(state_key)
+    if cached is not None and cached[0] == inputs:
+        return cached[1], cached[2]
+    io = get_wizard_io()
+    key = start()
+    status, result = io.poll(key)
+    if status in ('done', 'error'):
+        io.forget(key)
+    if status == 'done':
+        st.session_state[state_key] = (inputs, status, result)
+    return status, result
+
+
+def profile_summary():
+    # resumo básico do perfil usado na checagem do link
+    return f"{st.session_state.name}, interesses: {', '.join(st.session_state.interests)}"
+
+
+def start_timeline():
+    credentials = (os.getenv("TW_API_KEY"), os.getenv("TW_API_SECRET"),
+                   os.getenv("TW_TOKEN"), os.getenv("TW_TOKEN_SECRET"))
+    return get_wizard_io().start_timeline(credentials, st.session_state.twitter_handle, 50,
+                                          fallback=fetch_latest_tweets_snscrape)
+
+
+def start_link_check():
+    return get_wizard_io().start_link_check(os.getenv("OPENAI_KEY"), st.session_state.esports_link,
+                                            profile_summary())
+
+
+# Callbacks on_change: o trabalho de rede começa assim que o dado é digitado
+def prefetch_timeline():
+    if st.session_state.twitter_handle:
+        start_timeline()
+
+
+def prefetch_link_check():
+    if st.session_state.esports_link:
+        start_link_check()
+
+
+@st.cache_resource
+def get_ocr_executor():
+    # pool de processos compartilhado por todas as sessões
+    from ocr_executor import OCRExecutor
+    return OCRExecutor()
+
+
+def index_signups(conn):
+    """Hook do FanWriter: agregados do dashboard e índices de duplicidade do lote."""
+    fan_stats.apply_new_fans(conn)
+    fan_dedup.index_new_fans(conn, limit=fan_dedup.WRITER_INDEX_LIMIT)
+
+
+@st.cache_resource
+def get_fan_writer():
+    # uma thread de gravação por processo, compartilhada pelas sessões;
+    # cada lote já atualiza os agregados e os índices de duplicidade na mesma transação
+    writer = FanWriter(sql=storage.INSERT_SIGNUP, after_write=index_signups)
+    metrics.add_collector("fan_writer", writer.metrics)
+    return writer
+
+
+@st.cache_resource
+def get_duplicate_checker():
+    return fan_dedup.DuplicateChecker()
+
+
+@st.cache_resource
+def get_ocr_cache():
+    from ocr_cache import OCRCache
+    return OCRCache()
+
+
+@st.cache_resource
+def get_session_store():
+    # progresso do wizard no SQLite: retomável depois de queda/restart e em qualquer réplica
+    store = WizardSessionStore()
+    metrics.add_collector("wizard_sessions", store.stats)
+    return store
+
+
+# Campos do wizard salvos no servidor a cada passo (doc_check/link_check guardam os
+# resultados do OCR e do LLM para não refazê-los ao retomar). Nome, nascimento, endereço
+# e CPF ficam de fora: quem tem o link ?s= retoma a sessão, então esses dados são
+# digitados de novo e conferidos contra o hash guardado nos vereditos.
+WIZARD_FIELDS = ('interests', 'activities', 'purchases', 'twitter_handle', 'esports_link', 'fav_player',
+                 'fan_years', 'doc_check', 'link_check')
+# Estado interno da sessão que não aparece no resumo
+INTERNAL_KEYS = ('step', 'signup_ticket', 'timeline_result', 'link_result', 'doc', 'wizard_token',
+                 'doc_check', 'link_check', 'resumed_step')
+
+
+def resume_wizard():
+    """
+    Na primeira execução da sessão: retoma o cadastro do token em ?s= ou abre um novo.
+    """
+    if 'wizard_token' in st.session_state:
+        return
+    store = get_session_store()
+    token = st.query_params.get('s')
+    saved = store.load(token)
+    if saved is None:
+        token = store.create()
+        st.query_params['s'] = token
+        st.session_state.step = 1
+    else:
+        step, fields = saved
+        for key, value in fields.items():
+            if key in WIZARD_FIELDS:
+                st.session_state[key] = value
+        # os dados pessoais não ficam no servidor: o fã os confirma no passo 1 e
+        # depois segue para onde parou (vereditos que conferem não são refeitos)
+        st.session_state.step = 1
+        st.session_state.resumed_step = step
+    st.session_state.wizard_token = token
+
+
+def checkpoint():
+    """Grava no servidor o passo atual e os campos do wizard presentes na sessão."""
+    fields = {k: st.session_state[k] for k in WIZARD_FIELDS if k in st.session_state}
+    get_session_store().checkpoint(st.session_state.wizard_token, st.session_state.step, fields)
+
+
+def identity_digest(*values):
+    """
+    HMAC dos dados pessoais a que um veredito se refere (os dados em si não vão para o
+    checkpoint). Com a chave secreta do CPF, o hash não revela o nascimento por força bruta.
+    """
+    return hmac.new(fan_dedup.cpf_hash_key(), "\n".join(map(str, values)).encode(), hashlib.sha256).hexdigest()
+
+
+def current_doc_check():
+    """
+    doc_check da sessão, se foi feito com o nome e a data de nascimento atuais.
+    Validado para outros dados (o fã voltou ao passo 1 e mudou, ou sessão retomada
+    com um doc_check antigo), é descartado, como o link_result chaveado por (link, resumo).
+    """
+    doc_check = st.session_state.get('doc_check')
+    if doc_check is None:
         return None
+    if doc_check.get('identity') != identity_digest(st.session_state.get('name'),
+                                                    st.session_state.get('birthdate')):
+        del st.session_state['doc_check']
+        return None
+    return doc_check
+
+
+def current_link_check(link):
+    """link_check da sessão, se o veredito foi dado para este link e o resumo do perfil atual."""
+    link_check = st.session_state.get('link_check')
+    if link_check and (link_check.get('link'), link_check.get('summary')) == (
+            link, identity_digest(profile_summary())):
+        return link_check
+    return None
 
 
 def validate_document(img_bytes):
+    """
+    Valida o documento usando o cache de OCR ou, se ainda não visto, o pool de OCR sem bloquear o script.
+    :return: ('pending', None), ('done', MatchResult), ('busy', None) ou ('error', exceção)
+    """
+    from enhancements import match_document_text
+    from ocr_cache import ocr_cache_key
+    from ocr_executor import OCRQueueFull
+
     # usa OCR e confere nome + data de nascimento
-    return validate_document_ocr(
-        img_bytes,
-        st.session_state.name,
-        st.session_state.birthdate
-    )
+    key = ocr_cache_key(img_bytes)
+    cache = get_ocr_cache()
+    text = cache.get(key)
+    if text is None:
+        metrics.inc("cache_requests_total", cache="ocr", result="miss")
+        executor = get_ocr_executor()
+        status, result = executor.poll(key)
+        if status == 'missing':
+            try:
+                executor.submit(key, img_bytes)
+            except OCRQueueFull:
+                return 'busy', None
+            return 'pending', None
+        if status in ('done', 'error'):
+            executor.forget(key)
+        if status != 'done':
+            return status, result
+        text = result
+        cache.put(key, text)
+    else:
+        metrics.inc("cache_requests_total", cache="ocr", result="hit")
+    return 'done', match_document_text(text, st.session_state.name, st.session_state.birthdate)
 
 # CSS customizado para tweets
 st.markdown(
@@ -150,67 +388,57 @@ logo = load_furia_logo()
 if logo:
     st.sidebar.image(logo, use_column_width=True)
 
-# Configura cliente Tweepy
+# Configura cliente Tweepy: reaproveitado pelo manager, que controla a cota de cada endpoint
 BEARER = os.getenv("TWITTER_BEARER_TOKEN")
-client = tweepy.Client(bearer_token=BEARER) if BEARER and tweepy else None
-# quanto tempo (em segundos) o cache é válido
-CACHE_TTL = 10 * 60 
 
-# Cache para tweets via API (com expansões de usuário)
-@st.cache_data(ttl=60)
+
+@st.cache_resource
+def get_twitter_client():
+    if not BEARER:
+        return None
+    try:
+        return get_manager().client_v2(BEARER)
+    except ImportError:
+        return None
+
+
+client = get_twitter_client()
+
+@st.cache_resource
+def get_timeline_cache():
+    # contadores de hit/miss compartilhados por todas as sessões do processo
+    cache = TimelineCache(client)
+    metrics.add_collector("timeline_cache", cache.stats)
+    metrics.add_collector("twitter", get_manager().metrics)
+    return cache
+
+@st.cache_resource
+def get_tweet_prefetcher():
+    # uma thread por processo mantém a timeline da FURIA quente no tweets_cache
+    prefetcher = TimelinePrefetcher(get_timeline_cache(), accounts=["FURIA"], count=5).start()
+    metrics.add_collector("tweet_prefetcher", prefetcher.stats)
+    return prefetcher
+
+@st.cache_resource
+def get_card_renderer():
+    renderer = TweetCardRenderer()
+    metrics.add_collector("tweet_cards", renderer.stats)
+    return renderer
+
+# Tweets via cache (com autores); a rede fica por conta do prefetcher
 def fetch_latest_tweets(username: str, count: int = 5):
-    # 1) olha cache
-    cutoff = int(time.time()) - CACHE_TTL
-    # pega tweets já buscados recentemente
-    rows = c.execute(
-        "SELECT tweet_id, author_id, text, created_at FROM tweets_cache "
-        "WHERE fetched_at > ? "
-        "ORDER BY created_at DESC LIMIT ?",
-        (cutoff, count)
-    ).fetchall()
-    if len(rows) >= count:
-        # converte rows em objetos “fake” com atributos .data e includes
-        tweets = []
-        users = {}
-        for tid, aid, txt, c_at in rows:
-            t = SimpleNamespace(
-                id=tid,
-                author_id=aid,
-                text=txt,
-                created_at=datetime.fromisoformat(c_at)
-            )
-            tweets.append(t)
-        return tweets, users
-
-    # 2) se cache insuficiente, chama API
-    user_resp = client.get_user(username=username)
-    uid = user_resp.data.id
-    resp = client.get_users_tweets(
-        id=uid,
-        max_results=count,
-        tweet_fields=["created_at", "text", "author_id"],
-        expansions=["author_id"],
-        user_fields=["username", "name", "profile_image_url"]
-    )
-    tweets = resp.data or []
-    # 3) grava no cache
-    now = int(time.time())
-    for t in tweets:
-        c.execute(
-            "INSERT OR REPLACE INTO tweets_cache (tweet_id, author_id, text, created_at, fetched_at) "
-            "VALUES (?,?,?,?,?)",
-            (t.id, t.author_id, t.text, t.created_at.isoformat(), now)
-        )
-    conn.commit()
-    users = {}
-    if resp.includes and "users" in resp.includes:
-        users = {u.id: u for u in resp.includes["users"]}
+    prefetcher = get_tweet_prefetcher()
+    tweets, users = prefetcher.get(username, count)
+    if not tweets and prefetcher.last_error is not None:
+        raise prefetcher.last_error
     return tweets, users
 
 # Fallback snscrape
 
 def fetch_latest_tweets_snscrape(username: str, count: int = 5):
-    if not sntwitter:
+    try:
+        import snscrape.modules.twitter as sntwitter
+    except ImportError:
         return []
     tweets = []
     for i, tweet in enumerate(sntwitter.TwitterUserScraper(username).get_items()):
@@ -226,7 +454,7 @@ if mode.startswith('Fã'):
     if client:
         try:
             tweets, users = fetch_latest_tweets("FURIA", count=5)
-        except tweepy.TooManyRequests:
+        except RateLimited:
             st.sidebar.warning("🚧 Limite de requisições atingido. Fallback via snscrape.")
             tweets = fetch_latest_tweets_snscrape("FURIA", count=5)
             users = {}
@@ -242,46 +470,32 @@ if mode.startswith('Fã'):
     if not tweets:
         st.sidebar.info("⚠️ Nenhum tweet recente encontrado.")
     else:
-        for t in tweets:
-            # data e texto
-            ts = t.created_at.strftime("%d/%m/%Y %H:%M") if hasattr(t, 'created_at') else ''
-            text = t.text if hasattr(t, 'text') else getattr(t, 'content', '')
-            # obtém usuário a partir do map
-            user = users.get(t.author_id) if users else None
-
-            # monta HTML do card
-            text_html = text.replace("\n", "<br>")
-            avatar_url = user.profile_image_url if user and hasattr(user, 'profile_image_url') else None
-            name = user.name if user and hasattr(user, 'name') else ''
-            handle = '@' + user.username if user and hasattr(user, 'username') else ''
-
-            tweet_html = '<div class="tweet-card">'
-            tweet_html += '<div class="tweet-header">'
-            if avatar_url:
-                tweet_html += f'<img src="{avatar_url}" class="tweet-avatar"/>'
-            tweet_html += f'<span class="tweet-user">{name}</span>'
-            tweet_html += f'<span class="tweet-handle">{handle}</span>'
-            tweet_html += f'<span class="tweet-time">{ts}</span>'
-            tweet_html += '</div>'
-            tweet_html += f'<div class="tweet-text">{text_html}</div>'
-            tweet_html += '</div>'
-
-            st.sidebar.markdown(tweet_html, unsafe_allow_html=True)
-
-    # Wizard state e demais passos (mantidos do seu código original)
-    if 'step' not in st.session_state:
-        st.session_state.step = 1
+        # todos os cards num único st.markdown (HTML memoizado por tweet)
+        st.sidebar.markdown(get_card_renderer().render(tweets, users), unsafe_allow_html=True)
+
+    # Wizard state e demais passos (mantidos do seu código original); o progresso
+    # fica no servidor sob o token da URL
+    resume_wizard()
     steps = ["Dados Básicos 📋", "Documento 📑", "Redes Sociais 🔗", "Links eSports 🌐", "Extras 🎁", "Resumo 🎉"]
     st.sidebar.progress((st.session_state.step-1)/(len(steps)-1))
 
     def next_step(valid=True):
         if valid:
             st.session_state.step = min(st.session_state.step+1, len(steps))
+            checkpoint()
     def prev_step():
         st.session_state.step = max(st.session_state.step-1, 1)
+        checkpoint()
 
     st.title("🐆 Bem-vindo, FURIA Lover!")
     st.write("Preencha seu perfil e conquiste **badges** exclusivos! 🌟")
+    if st.session_state.get('resumed_step', 1) > 1:
+        st.info(f"🔁 Cadastro retomado do passo {st.session_state.resumed_step}. Confirme seus dados "
+                "pessoais (eles não ficam salvos no link); documento e link já validados não são refeitos.")
+
+    # tempo do script por passo; os reruns de espera (OCR/link pendente) saem por
+    # exceção no st.rerun() e não entram na conta
+    step_timer = metrics.timed("wizard_step_seconds", step=st.session_state.step).start()
 
     # Step 1: Dados Básicos (Obrigatórios)
     if st.session_state.step == 1:
@@ -301,55 +515,91 @@ if mode.startswith('Fã'):
                         missing.append(label)
                 if missing:
                     st.error(f"Preencha: {', '.join(missing)} 🚨")
+                elif fan_dedup.normalize_cpf(cpf) is None:
+                    st.error("CPF inválido 🚨")
+                elif get_duplicate_checker().cpf_fan_id(cpf) is not None:
+                    st.error("🚫 Já existe um cadastro com este CPF.")
                 else:
-                    next_step()
+                    resumed = st.session_state.pop('resumed_step', 1)
+                    if resumed > 2 and current_doc_check() is not None:
+                        # sessão retomada e o documento confere com os dados: volta para onde parou
+                        st.session_state.step = resumed
+                        checkpoint()
+                    else:
+                        next_step()
 
     # Step 2: Documento (Obrigatório)
     elif st.session_state.step == 2:
         st.subheader("📑 Upload de Documento *")
         uploaded = st.file_uploader("Envie RG/CNH:", type=['png','jpg','jpeg'], key='doc')
         ok = False
+        pending = False
+        doc_check = current_doc_check()
         if uploaded:
-            img = Image.open(uploaded)
-            st.image(img, use_column_width=True)
-            if validate_document(uploaded.read()):
-                st.success("✅ Documento validado!")
+            img_bytes = uploaded.getvalue()
+            st.image(img_bytes, use_column_width=True)
+            status, result = validate_document(img_bytes)
+            if status == 'done' and result:
+                st.success(f"✅ Documento validado! (confiança {result.confidence:.0%})")
                 ok = True
-            else:
+                digest = hashlib.sha256(img_bytes).hexdigest()
+                if not doc_check or doc_check['sha256'] != digest:
+                    # só o hash e o resultado vão para o servidor, não a imagem
+                    # o pHash fica para a checagem de documento reaproveitado no passo final
+                    st.session_state.doc_check = {'sha256': digest, 'confidence': result.confidence,
+                                                  'identity': identity_digest(st.session_state.name,
+                                                                              st.session_state.birthdate),
+                                                  'phash': fan_dedup.document_phash(img_bytes)}
+                    checkpoint()
+            elif status == 'done':
                 st.error("🚫 Falha na validação.")
+            elif status == 'busy':
+                st.warning("🚦 Muitos documentos em validação agora, tentando novamente...")
+                pending = True
+            elif status == 'error':
+                st.error(f"🚫 Erro ao processar o documento: {result}")
+            else:
+                st.info("⏳ Validando documento...")
+                pending = True
+        elif doc_check:
+            # sessão retomada: o documento já passou pelo OCR antes
+            st.success(f"✅ Documento já validado (confiança {doc_check['confidence']:.0%}).")
+            ok = True
         cols = st.columns(3)
         if cols[0].button("Voltar"): prev_step()
         if cols[2].button("Continuar"):
             if ok:
                 next_step()
+            elif pending:
+                st.info("Aguarde a validação do documento ⏳")
             else:
                 st.error("Documento **obrigatório**")
+        if pending:
+            # consulta o pool de novo em instantes, sem travar a sessão no OCR
+            time.sleep(0.5)
+            st.rerun()
 
     # Step 3: Redes Sociais (Opcional)
     elif st.session_state.step == 3:
         st.subheader("🔗 Redes Sociais (Opcional)")
 
-        twitter_handle = st.text_input("📱 Seu usuário no Twitter (sem @)", key='twitter_handle')
+        twitter_handle = st.text_input("📱 Seu usuário no Twitter (sem @)", key='twitter_handle',
+                                       on_change=prefetch_timeline)
         tweets = []
+        pending = False
 
         if twitter_handle:
-            # Tenta via API oficial
-            try:
-                tweets = fetch_user_furia_interactions(
-                    twitter_api_key=os.getenv("TW_API_KEY"),
-                    twitter_api_secret=os.getenv("TW_API_SECRET"),
-                    twitter_token=os.getenv("TW_TOKEN"),
-                    twitter_token_secret=os.getenv("TW_TOKEN_SECRET"),
-                    username=twitter_handle,
-                    max_tweets=50
-                )
-            except Exception as e:
-                msg = str(e)
-                if "403" in msg or "Forbidden" in msg:
-                    st.info("🔄 API bloqueada, fazendo fallback com snscrape...")
-                    tweets = fetch_latest_tweets_snscrape(twitter_handle, count=50)
-                else:
-                    st.warning(f"Não foi possível buscar tweets: {e}")
+            # a busca já começou no on_change; aqui só consulta o resultado
+            status, result = await_io('timeline_result', twitter_handle, start_timeline)
+            if status == 'pending':
+                st.info("⏳ Buscando seus tweets...")
+                pending = True
+            elif status == 'error':
+                st.warning(f"Não foi possível buscar tweets: {result}")
+            else:
+                tweets, source = result
+                if source == 'snscrape':
+                    st.info("🔄 API bloqueada, tweets buscados com snscrape.")
 
             # Exibe resultados (pode vir de Tweepy ou snscrape)
             if tweets:
@@ -364,35 +614,51 @@ if mode.startswith('Fã'):
             prev_step()
         if cols[2].button("Continuar"):
             next_step()
+        if pending:
+            time.sleep(0.5)
+            st.rerun()
 
     # Step 4: Links eSports (Obrigatório)
     elif st.session_state.step == 4:
         st.subheader("🌐 Links eSports *")
-        link = st.text_input("⛹️‍♂️ Liquipedia/HLTV/gosu.gg:", key='esports_link')
+        link = st.text_input("⛹️‍♂️ Liquipedia/HLTV/gosu.gg:", key='esports_link',
+                             on_change=prefetch_link_check)
         relevant = False
+        pending = False
         if link:
-            try:
-                # cria um resumo básico do perfil
-                summary = f"{st.session_state.name}, interesses: {', '.join(st.session_state.interests)}"
-                relevant = validate_esports_link(
-                    openai_api_key=os.getenv("OPENAI_KEY"),
-                    url=link,
-                    user_profile_summary=summary
-                )
-                if relevant:
-                    st.success("✅ Link relevante ao seu perfil!")
-                else:
-                    st.error("🚫 Este link não parece corresponder ao seu perfil.")
-            except Exception as e:
-                st.warning(f"Erro ao validar link: {e}")
+            # scrape + LLM já começaram no on_change; o veredito fica na sessão
+            # (sessão retomada: o link_check salvo vale se link e perfil não mudaram)
+            if current_link_check(link):
+                status, result = 'done', True
+            else:
+                status, result = await_io('link_result', (link, profile_summary()), start_link_check)
+            if status == 'pending':
+                st.info("⏳ Conferindo o link...")
+                pending = True
+            elif status == 'error':
+                st.warning(f"Erro ao validar link: {result!r}. Clique em Continuar para tentar de novo.")
+            elif result:
+                relevant = True
+                st.success("✅ Link relevante ao seu perfil!")
+                link_check = {'link': link, 'summary': identity_digest(profile_summary()), 'relevant': True}
+                if st.session_state.get('link_check') != link_check:
+                    st.session_state.link_check = link_check
+                    checkpoint()
+            else:
+                st.error("🚫 Este link não parece corresponder ao seu perfil.")
 
         cols = st.columns(3)
         if cols[0].button("Voltar"): prev_step()
         if cols[2].button("Continuar"):
             if relevant:
                 next_step()
+            elif pending:
+                st.info("Aguarde a validação do link ⏳")
             else:
                 st.error("Link **obrigatório** e relevante 🚨")
+        if pending:
+            time.sleep(0.5)
+            st.rerun()
 
     # Step 5: Extras (Opcional)
     elif st.session_state.step == 5:
@@ -407,26 +673,58 @@ if mode.startswith('Fã'):
     else:
         st.subheader("🎉 Resumo do Seu Perfil")
         for k,v in st.session_state.items():
-            if k != 'step':
+            if k not in INTERNAL_KEYS:
                 st.write(f"**{k.replace('_',' ').title()}:** {v}")
         if st.button("✅ Salvar e Finalizar"):
-            c.execute(
-                "INSERT INTO fans (name, address, cpf, interests, activities, purchases, social_profiles, esports_profiles, created_at) VALUES (?,?,?,?,?,?,?,?,?)",
-                (
-                    st.session_state.name,
-                    st.session_state.address,
-                    st.session_state.cpf,
-                    ','.join(st.session_state.interests),
-                    st.session_state.activities,
-                    st.session_state.purchases,
-                    ';'.join([f"{p}:{st.session_state[p.lower()]}" for p in ['Twitter','Instagram','Facebook','TikTok'] if st.session_state.get(p.lower())]),
-                    st.session_state.esports_link,
-                    datetime.utcnow().isoformat()
-                )
-            )
-            conn.commit()
-            st.balloons()
-            st.success("🎊 Perfil salvo com sucesso! Obrigado por ser FURIA! 🐆")
+            doc_check = current_doc_check()
+            doc_phash = (doc_check or {}).get('phash')
+            dup = get_duplicate_checker().check(st.session_state.cpf, st.session_state.name,
+                                                st.session_state.address, doc_phash)
+            # nome/endereço parecidos (família, mesmo prédio) não bloqueiam: viram suspeita no admin
+            if doc_check is None:
+                st.error("🚫 O documento precisa ser validado de novo com os dados atuais (passo 2).")
+            elif dup.cpf_fan_id is not None:
+                st.error("🚫 Já existe um cadastro com este CPF.")
+            elif dup.doc_matches:
+                st.error("🚫 Este documento já foi usado em outro cadastro.")
+            else:
+                try:
+                    st.session_state.signup_ticket = get_fan_writer().submit((
+                        st.session_state.name,
+                        st.session_state.address,
+                        st.session_state.cpf,
+                        ','.join(st.session_state.interests),
+                        st.session_state.activities,
+                        st.session_state.purchases,
+                        ';'.join([f"{p}:{st.session_state[p.lower()]}" for p in ['Twitter','Instagram','Facebook','TikTok'] if st.session_state.get(p.lower())]),
+                        st.session_state.esports_link,
+                        st.session_state.get('fan_years'),
+                        st.session_state.get('fav_player'),
+                        datetime.utcnow().isoformat(),
+                        fan_dedup.cpf_hash(st.session_state.cpf),
+                        doc_phash
+                    ))
+                except WriterBusy:
+                    st.warning("🚦 Muitos cadastros chegando agora, tente novamente em instantes.")
+        ticket = st.session_state.get('signup_ticket')
+        if ticket is not None:
+            if ticket.wait(timeout=2):
+                if isinstance(ticket.error, sqlite3.IntegrityError):
+                    # outro cadastro com o mesmo CPF entrou entre a checagem e a gravação
+                    st.error("🚫 Já existe um cadastro com este CPF.")
+                elif ticket.error:
+                    st.error(f"🚫 Erro ao salvar o perfil: {ticket.error}")
+                else:
+                    st.balloons()
+                    st.success("🎊 Perfil salvo com sucesso! Obrigado por ser FURIA! 🐆")
+                    # cadastro concluído: o link de retomada deixa de valer
+                    get_session_store().finish(st.session_state.wizard_token)
+                del st.session_state.signup_ticket
+            else:
+                st.info("⏳ Salvando seu perfil...")
+                time.sleep(0.5)
+                st.rerun()
+    step_timer.stop()
 
 # --- Modo Admin ---
 elif mode.startswith('Admin'):
@@ -435,17 +733,131 @@ elif mode.startswith('Admin'):
         st.error("🔐 Senha incorreta")
     else:
         st.title("📊 Dashboard de Fãs FURIA")
-        df = pd.read_sql_query("SELECT * FROM fans", conn)
-        st.metric("Total de Fãs cadastrados", len(df))
+        with st.expander("⏱️ Performance"):
+            server = get_metrics_server()
+            if server:
+                host, port = server.server_address[:2]
+                st.caption(f"Prometheus: http://{host}:{port}/metrics (desde o início deste processo)")
+            timings, counters = metrics.summary()
+            st.table(timings)
+            for name, values in counters.items():
+                st.caption(name)
+                st.table([dict(labels, total=value) for labels, value in values])
+        with st.expander("⚙️ Fila de gravação de cadastros"):
+            st.json(get_fan_writer().metrics())
+        with st.expander("🐦 Cache de tweets"):
+            st.json(get_timeline_cache().stats())
+            st.json(get_card_renderer().stats())
+            if client:
+                st.json(get_tweet_prefetcher().stats())
+            st.caption("Cota e latência da API do Twitter por endpoint")
+            st.json(get_manager().metrics())
+        with st.expander("🌐 Cache de validação de links"):
+            st.json(get_wizard_io().link_cache.stats())
+            st.caption("Pré-classificador (regras locais antes do LLM)")
+            st.json(get_wizard_io().pre_classifier.stats())
+        with st.expander("🔁 Sessões do wizard"):
+            st.json(get_session_store().stats())
+        with st.expander("🕵️ Possíveis duplicados"):
+            st.json(get_duplicate_checker().stats())
+            flag_columns, flag_rows = fan_dedup.recent_flags(limit=50)
+            st.table([dict(zip(flag_columns, row)) for row in flag_rows])
+        import pandas as pd
+        import fan_export
+
+        # pega o que entrou por fora do FanWriter (seed, importações) e lê só os agregados
+        fan_stats.refresh_aggregates()
+        st.metric("Total de Fãs cadastrados", fan_stats.total_fans())
         st.subheader("🎮 Distribuição de Interesses")
-        ints = df['interests'].str.get_dummies(sep=',').sum().sort_values(ascending=False)
+        ints = pd.DataFrame(fan_stats.interest_counts(), columns=['interesse', 'fãs']).set_index('interesse')
         st.bar_chart(ints)
-        if 'fan_years' in df.columns:
+        years = pd.DataFrame(fan_stats.fan_years_histogram(), columns=['anos', 'fãs']).set_index('anos')
+        if not years.empty:
             st.subheader("⏳ Anos como Fã")
-            years = df['fan_years'].dropna().astype(int).value_counts().sort_index()
             st.bar_chart(years)
-        st.subheader("✨ Atividades/Eventos")
-        st.text_area("", '\n'.join(df['activities']), height=150)
+        st.subheader("📅 Cadastros por dia")
+        st.bar_chart(pd.DataFrame(fan_stats.daily_signups(), columns=['dia', 'fãs']).set_index('dia'))
+
+        st.subheader("🎯 Segmentos")
+        segment = st.multiselect("Interesses do segmento", list(ints.index), key='segment_interests')
+        combine = st.radio("Combinação", ['Todos (E)', 'Qualquer (OU)'], horizontal=True, key='segment_match')
+        if segment:
+            match = 'all' if combine.startswith('Todos') else 'any'
+            st.metric("Fãs no segmento", fan_stats.segment_count(segment, match))
+            seg_columns, seg_rows = fan_stats.segment_members(segment, match, limit=50)
+            st.dataframe(pd.DataFrame(seg_rows, columns=seg_columns))
+
+        # tabela paginada por keyset: guarda o id de corte de cada página visitada
+        if 'fans_pages' not in st.session_state:
+            st.session_state.fans_pages = [None]
+        columns, rows = fan_stats.fetch_fans_page(st.session_state.fans_pages[-1], limit=50)
+        df = pd.DataFrame(rows, columns=columns)
         st.subheader("📝 Dados Cadastrais")
         st.dataframe(df)
-        st.download_button("📥 Exportar CSV", df.to_csv(index=False), "fura_fans.csv")
+        cols = st.columns(3)
+        if cols[0].button("⬅️ Mais novos", disabled=len(st.session_state.fans_pages) == 1):
+            st.session_state.fans_pages.pop()
+            st.rerun()
+        cols[1].caption(f"Página {len(st.session_state.fans_pages)}")
+        if cols[2].button("Mais antigos ➡️", disabled=len(rows) < 50):
+            st.session_state.fans_pages.append(int(df['id'].iloc[-1]))
+            st.rerun()
+
+        # busca textual no índice FTS5 (fans_fts), ranqueada e paginada
+        st.subheader("🔎 Busca em Atividades e Compras")
+        search_text = st.text_input("Buscar (todas as palavras; termine com * para prefixo, ex.: camis*)",
+                                    key='fan_search')
+        if search_text:
+            # ranking completo pontua todas as ocorrências: com termos comuns, perto de 1 s por página
+            rank_window = None if st.checkbox("Ranquear todas as ocorrências (mais lento)",
+                                              key='fan_search_all') else fan_search.RANK_WINDOW
+            if st.session_state.get('fan_search_for') != (search_text, rank_window):
+                st.session_state.fan_search_for = (search_text, rank_window)
+                st.session_state.fan_search_page = 0
+            page = st.session_state.fan_search_page
+            started = time.perf_counter()
+            _, hits = fan_search.search(search_text, page=page, rank_window=rank_window)
+            elapsed = time.perf_counter() - started
+            count, limited = fan_search.ranked_count(search_text, rank_window=rank_window)
+            if limited:
+                st.caption(f"Ranking das {count} ocorrências mais recentes (há mais, mais antigas: refine a busca "
+                           f"ou marque o ranking completo) · página {page + 1} em {elapsed * 1000:.0f} ms")
+            else:
+                st.caption(f"{count} fãs encontrados · página {page + 1} em {elapsed * 1000:.0f} ms")
+            for fan_id, name, activities, purchases, interests, _ in hits:
+                st.markdown(f"**{name}** (#{fan_id}) · {interests}  \n✨ {activities}  \n🛍️ {purchases}")
+            cols = st.columns(3)
+            if cols[0].button("⬅️ Anteriores", disabled=page == 0, key='fan_search_prev'):
+                st.session_state.fan_search_page -= 1
+                st.rerun()
+            if cols[2].button("Próximos ➡️", disabled=len(hits) < fan_search.DEFAULT_PAGE_SIZE,
+                              key='fan_search_next'):
+                st.session_state.fan_search_page += 1
+                st.rerun()
+
+        # exportação só é gerada no clique, lendo o banco em blocos para um arquivo temporário
+        st.subheader("📥 Exportar")
+        with st.form("export"):
+            all_columns = fan_export.fan_columns()
+            exp_columns = st.multiselect("Colunas", all_columns, default=all_columns)
+            exp_format = st.selectbox("Formato", list(fan_export.FORMATS))
+            exp_segment = st.multiselect("Somente fãs com os interesses (opcional)", list(ints.index))
+            generate = st.form_submit_button("Gerar arquivo")
+        if generate:
+            try:
+                path, count = fan_export.export_to_file(
+                    exp_format, columns=exp_columns, interests=exp_segment or None
+                )
+            except Exception as e:
+                st.error(f"Erro ao exportar: {e}")
+            else:
+                # o arquivo vai para o navegador uma vez só, neste rerun: o botão guarda a
+                # cópia e o temporário já pode sumir; o clique não dispara outro rerun
+                mime, suffix = fan_export.FORMATS[exp_format]
+                try:
+                    with open(path, 'rb') as f:
+                        st.download_button(f"📥 Baixar {count} fãs ({exp_format})", f, "fura_fans" + suffix,
+                                           mime=mime, on_click="ignore")
+                finally:
+                    os.remove(path)
+                st.caption("O link vale até a próxima ação no painel; depois é só gerar de novo.")
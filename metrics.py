@@ -0,0 +1,338 @@
+"""
+Instrumentação leve do app: histogramas e contadores em memória (por processo),
+expostos no formato texto do Prometheus num endpoint HTTP local e no painel
+"Performance" do modo Admin.
+
+    with metrics.timed("db_seconds", op="query"): ...
+    @metrics.timed("operation_seconds", op="validate_document_ocr")
+    metrics.inc("cache_requests_total", cache="ocr", result="hit")
+
+Os stats()/metrics() que as classes já mantêm (caches, FanWriter, cota do Twitter)
+entram como gauges por add_collector, sem contar nada duas vezes.
+"""
+import bisect
+import os
+import threading
+import time
+from functools import wraps
+
+# Prefixo de todas as séries exportadas
+PREFIX = "knowyourfan_"
+# Limites dos buckets em segundos: de uma consulta SQLite (ms) a um OCR/LLM (s)
+DEFAULT_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# Endpoint /metrics: só na interface local; porta vazia ou 0 desliga
+# Tempo máximo de um scrape lento segurando a thread do endpoint
+SCRAPE_TIMEOUT = 5.0
+DEFAULT_HOST = os.getenv("KNOWYOURFAN_METRICS_HOST", "127.0.0.1")
+DEFAULT_PORT = int(os.getenv("KNOWYOURFAN_METRICS_PORT", "9464") or 0)
+
+# Descrição (# HELP) das métricas usadas pelo app
+HELP = {
+    "operation_seconds": "Duração das operações instrumentadas (OCR, Twitter, checagem de links)",
+    "http_request_seconds": "Latência das chamadas a serviços externos",
+    "db_seconds": "Tempo das chamadas ao SQLite via storage",
+    "wizard_step_seconds": "Tempo de execução do script por passo do wizard",
+    "errors_total": "Operações instrumentadas que terminaram em exceção",
+    "cache_requests_total": "Consultas aos caches por resultado (hit/miss)",
+    "batch_items_total": "Itens dos lotes de importação por status final (batch_service)",
+}
+
+
+def _label_key(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+class Histogram:
+    """Buckets fixos por combinação de labels; observe() é um bisect sob um lock."""
+
+    def __init__(self, name, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        self.observe_key(value, _label_key(labels))
+
+    def observe_key(self, value, key):
+        """observe() com os labels já normalizados por _label_key (caminho quente do timed)."""
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # contagem por bucket (+Inf no fim), soma, total, máximo
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0, 0.0]
+            series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+            if value > series[3]:
+                series[3] = value
+
+    def _items(self):
+        with self._lock:
+            return [(key, list(counts), total, n, top) for key, (counts, total, n, top) in self._series.items()]
+
+    def quantile(self, counts, n, q):
+        """Estimativa do quantil q interpolando dentro do bucket (como histogram_quantile)."""
+        if not n:
+            return 0.0
+        rank = q * n
+        seen = 0
+        for i, c in enumerate(counts):
+            if seen + c >= rank and c:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else self.buckets[-1]
+                return lower + (upper - lower) * (rank - seen) / c
+            seen += c
+        return self.buckets[-1]
+
+    def _quantile_ms(self, counts, n, q, top):
+        # a interpolação não passa do maior valor visto (bucket largo com poucas amostras)
+        return round(min(self.quantile(counts, n, q), top) * 1000, 3)
+
+    def render(self):
+        lines = []
+        for key, counts, total, n, _ in sorted(self._items()):
+            cumulative = 0
+            for bound, c in zip(self.buckets + (float("inf"),), counts):
+                cumulative += c
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{PREFIX}{self.name}_bucket{_format_labels(key, [('le', le)])} {cumulative}")
+            lines.append(f"{PREFIX}{self.name}_sum{_format_labels(key)} {total}")
+            lines.append(f"{PREFIX}{self.name}_count{_format_labels(key)} {n}")
+        return lines
+
+    def summary(self):
+        """:return: [{labels, n, médias e quantis em ms}] para o painel"""
+        rows = []
+        for key, counts, total, n, top in sorted(self._items()):
+            rows.append({
+                "métrica": self.name,
+                "labels": ", ".join(f"{k}={v}" for k, v in key),
+                "n": n,
+                "média ms": round(total / n * 1000, 3) if n else 0.0,
+                "p50 ms": self._quantile_ms(counts, n, 0.5, top),
+                "p95 ms": self._quantile_ms(counts, n, 0.95, top),
+                "máx ms": round(top * 1000, 3),
+            })
+        return rows
+
+
+class Counter:
+    def __init__(self, name):
+        self.name = name
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, n=1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + n
+
+    def items(self):
+        with self._lock:
+            return sorted(self._values.items())
+
+    def render(self):
+        return [f"{PREFIX}{self.name}{_format_labels(key)} {value}" for key, value in self.items()]
+
+
+class Registry:
+    """Métricas do processo; as séries são criadas no primeiro uso."""
+
+    def __init__(self):
+        self._histograms = {}
+        self._counters = {}
+        self._collectors = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, name, buckets=DEFAULT_BUCKETS):
+        metric = self._histograms.get(name)
+        if metric is None:
+            with self._lock:
+                metric = self._histograms.setdefault(name, Histogram(name, buckets))
+        return metric
+
+    def counter(self, name):
+        metric = self._counters.get(name)
+        if metric is None:
+            with self._lock:
+                metric = self._counters.setdefault(name, Counter(name))
+        return metric
+
+    def add_collector(self, name, fn):
+        """
+        Exporta como gauges os valores numéricos do dict devolvido por fn (um stats()).
+        Dicts aninhados (ex.: um por endpoint) viram o label `item`.
+        No endpoint de serve(), fn roda sempre na mesma thread: um stats() que consulta o
+        SQLite (conexão por thread no storage) reaproveita uma conexão só.
+        :param name: prefixo das séries (ex.: 'timeline_cache' -> knowyourfan_timeline_cache_hits)
+        """
+        with self._lock:
+            self._collectors[name] = fn
+
+    def _collected(self):
+        with self._lock:
+            collectors = list(self._collectors.items())
+        for name, fn in collectors:
+            try:
+                stats = fn()
+            except Exception:
+                # um coletor quebrado não derruba o /metrics inteiro
+                self.counter("errors_total").inc(op=f"collector:{name}")
+                continue
+            for key, value in stats.items():
+                if isinstance(value, dict):
+                    for sub, v in value.items():
+                        if isinstance(v, (int, float)):
+                            yield f"{name}_{sub}", (("item", str(key)),), v
+                elif isinstance(value, (int, float)):
+                    yield f"{name}_{key}", (), value
+
+    def render(self):
+        """Texto no formato de exposição do Prometheus (0.0.4)."""
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+            counters = sorted(self._counters.items())
+        lines = []
+        for name, metric in histograms:
+            lines.append(f"# HELP {PREFIX}{name} {HELP.get(name, name)}")
+            lines.append(f"# TYPE {PREFIX}{name} histogram")
+            lines.extend(metric.render())
+        for name, metric in counters:
+            lines.append(f"# HELP {PREFIX}{name} {HELP.get(name, name)}")
+            lines.append(f"# TYPE {PREFIX}{name} counter")
+            lines.extend(metric.render())
+        # cada família precisa sair contígua (um stats() por endpoint intercala as séries)
+        gauges = {}
+        for name, labels, value in self._collected():
+            gauges.setdefault(name, []).append(f"{PREFIX}{name}{_format_labels(labels)} {float(value)}")
+        for name, samples in gauges.items():
+            lines.append(f"# TYPE {PREFIX}{name} gauge")
+            lines.extend(samples)
+        return "\n".join(lines) + "\n"
+
+    def summary(self):
+        """:return: (linhas dos histogramas, {contador: [(labels, valor)]}) para o painel"""
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+            counters = sorted(self._counters.items())
+        rows = [row for _, metric in histograms for row in metric.summary()]
+        return rows, {name: metric.items() for name, metric in counters}
+
+
+REGISTRY = Registry()
+
+
+def observe(name, seconds, **labels):
+    REGISTRY.histogram(name).observe(seconds, **labels)
+
+
+def inc(name, n=1, **labels):
+    REGISTRY.counter(name).inc(n, **labels)
+
+
+def add_collector(name, fn):
+    REGISTRY.add_collector(name, fn)
+
+
+def render():
+    return REGISTRY.render()
+
+
+def summary():
+    return REGISTRY.summary()
+
+
+class timed:
+    """
+    Mede a duração de um bloco (with) ou de cada chamada de uma função (decorador)
+    no histograma `name`. Exceções também contam em errors_total{op=...}.
+    Fora do with/decorador: start() e stop() (ex.: o script do Streamlit, que
+    termina por exceção no st.rerun).
+    """
+
+    def __init__(self, name, **labels):
+        self.histogram = REGISTRY.histogram(name)
+        self.labels = labels
+        self._key = _label_key(labels)
+        self._start = None
+
+    def start(self):
+        self._start = time.perf_counter()
+        return self
+
+    def stop(self):
+        elapsed = time.perf_counter() - self._start
+        self.histogram.observe_key(elapsed, self._key)
+        return elapsed
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        if exc_type is not None:
+            inc("errors_total", op=self.labels.get("op", self.histogram.name))
+        return False
+
+    def __call__(self, fn):
+        observe, key, op = self.histogram.observe_key, self._key, self.labels.get("op", fn.__name__)
+        clock = time.perf_counter
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = clock()
+            try:
+                return fn(*args, **kwargs)
+            except Exception:
+                inc("errors_total", op=op)
+                raise
+            finally:
+                observe(clock() - start, key)
+        return wrapper
+
+
+def serve(host=DEFAULT_HOST, port=DEFAULT_PORT):
+    """
+    Sobe o endpoint GET /metrics numa thread daemon, que atende os scrapes um por vez:
+    com uma thread por requisição, cada scrape abriria (e largaria) uma conexão SQLite
+    nos coletores que consultam o banco.
+    :return: o HTTPServer (server.server_address tem a porta real se port=0)
+    :raises OSError: se a porta já está em uso (ex.: outro processo do app)
+    """
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        # um cliente parado não prende o endpoint (os scrapes são sequenciais)
+        timeout = SCRAPE_TIMEOUT
+
+        def do_GET(self):
+            if self.path.split("?", 1)[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            # o scrape a cada poucos segundos não deve poluir o log do app
+            pass
+
+    server = HTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
@@ -0,0 +1,72 @@
+import hashlib
+import time
+
+import storage
+from enhancements import OCR_LANG, PREPROCESS_VERSION
+
+# Limites padrão do cache
+DEFAULT_MAX_ENTRIES = 5000
+DEFAULT_MAX_BYTES = 50 * 1024 * 1024
+DEFAULT_TTL = 30 * 24 * 60 * 60
+# Só regrava last_access se o acesso anterior for mais velho que isso,
+# evitando uma escrita no banco a cada rerun
+TOUCH_INTERVAL = 60
+
+
+def ocr_cache_key(img_bytes, lang=OCR_LANG, version=PREPROCESS_VERSION):
+    """Chave do cache: SHA-256 da imagem + idioma do Tesseract + versão do pré-processamento."""
+    digest = hashlib.sha256(img_bytes).hexdigest()
+    return f"{digest}:{lang}:v{version}"
+
+
+class OCRCache:
+    """
+    Cache persistente (SQLite) do texto normalizado extraído dos documentos.
+    Despejo por TTL e, depois, por LRU quando passa do número de entradas ou de bytes.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, max_bytes=DEFAULT_MAX_BYTES, ttl=DEFAULT_TTL):
+        # a tabela ocr_cache é criada pelas migrações do storage
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+
+    def get(self, key):
+        """:return: texto normalizado ou None se não estiver no cache (ou expirado)"""
+        now = int(time.time())
+        row = storage.query_one(
+            "SELECT text, last_access FROM ocr_cache WHERE cache_key = ? AND created_at > ?",
+            (key, now - self.ttl)
+        )
+        if row is None:
+            return None
+        text, last_access = row
+        if now - last_access > TOUCH_INTERVAL:
+            storage.execute("UPDATE ocr_cache SET last_access = ? WHERE cache_key = ?", (now, key))
+        return text
+
+    def put(self, key, text):
+        now = int(time.time())
+        with storage.transaction() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO ocr_cache (cache_key, text, size, created_at, last_access) "
+                "VALUES (?,?,?,?,?)",
+                (key, text, len(text.encode()), now, now)
+            )
+            self._evict(conn, now)
+
+    def _evict(self, conn, now):
+        conn.execute("DELETE FROM ocr_cache WHERE created_at <= ?", (now - self.ttl,))
+        count, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM ocr_cache").fetchone()
+        if count <= self.max_entries and total <= self.max_bytes:
+            return
+        # remove os menos usados recentemente até voltar para dentro dos limites
+        rows = conn.execute("SELECT cache_key, size FROM ocr_cache ORDER BY last_access").fetchall()
+        victims = []
+        for key, size in rows:
+            if count <= self.max_entries and total <= self.max_bytes:
+                break
+            victims.append((key,))
+            count -= 1
+            total -= size
+        conn.executemany("DELETE FROM ocr_cache WHERE cache_key = ?", victims)
@@ -0,0 +1,143 @@
+import importlib.machinery
+import multiprocessing
+import os
+import sys
+import threading
+import time
+import types
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+
+import metrics
+from enhancements import extract_document_text
+
+# Número padrão de workers: um por núcleo, limitado para não saturar a máquina
+DEFAULT_WORKERS = min(4, os.cpu_count() or 1)
+# Quantos jobs (rodando + aguardando) aceitamos por worker antes de recusar
+DEFAULT_QUEUE_PER_WORKER = 4
+# Quantos resultados já concluídos mantemos para consulta por rerun
+MAX_FINISHED_JOBS = 256
+# Workers nascem de um processo servidor limpo, não de um fork do app: o Streamlit roda
+# várias threads (tornado, FanWriter, WizardIO, métricas) e um lock preso por uma delas
+# no momento do fork travaria o worker. O custo de import fica no _warm_worker.
+START_METHOD = "forkserver"
+
+# __main__ que os workers (e o forkserver) herdam. Sem isso o multiprocessing reexecuta
+# o script do app (main.py no Streamlit, que não tem __spec__) como __mp_main__ em cada
+# worker: set_page_config, migrações, WizardIO, prefetcher... Um módulo vazio com
+# __spec__.name == "__main__" faz o filho não importar nada no lugar do __main__.
+_WORKER_MAIN = types.ModuleType("__main__")
+_WORKER_MAIN.__spec__ = importlib.machinery.ModuleSpec("__main__", None)
+_main_lock = threading.Lock()
+
+
+class OCRQueueFull(Exception):
+    """Levantada quando a fila de OCR atingiu o limite (backpressure)."""
+
+
+def _warm_worker():
+    # Importa as dependências pesadas uma única vez por processo,
+    # assim o primeiro job não paga o custo de import do Tesseract/PIL.
+    import pytesseract
+    from PIL import Image  # noqa: F401
+    try:
+        pytesseract.get_tesseract_version()
+    except Exception:
+        pass
+
+
+@contextmanager
+def _clean_main():
+    """
+    Troca o __main__ pelo _WORKER_MAIN enquanto processos do pool são criados.
+    O ProcessPoolExecutor só cria workers dentro do submit (forkserver), então a troca dura
+    o tempo de um start de processo.
+    """
+    with _main_lock:
+        app_main = sys.modules.get("__main__")
+        sys.modules["__main__"] = _WORKER_MAIN
+        try:
+            yield
+        finally:
+            if app_main is None:
+                sys.modules.pop("__main__", None)
+            else:
+                sys.modules["__main__"] = app_main
+
+
+class OCRExecutor:
+    """
+    Pool de processos para rodar o OCR fora da thread do Streamlit.
+    Os jobs são identificados por uma chave (ex.: hash do documento), o que
+    permite consultar o resultado a cada rerun sem reenviar o trabalho.
+    """
+
+    def __init__(self, max_workers=DEFAULT_WORKERS, max_pending=None, fn=extract_document_text):
+        self.max_workers = max_workers
+        self.max_pending = max_pending or max_workers * DEFAULT_QUEUE_PER_WORKER
+        self._fn = fn
+        self._pool = ProcessPoolExecutor(max_workers=max_workers, initializer=_warm_worker,
+                                         mp_context=multiprocessing.get_context(START_METHOD))
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def pending(self):
+        """Quantidade de jobs ainda não concluídos."""
+        with self._lock:
+            return sum(1 for f in self._jobs.values() if not f.done())
+
+    def submit(self, key, *args):
+        """
+        Enfileira um job de OCR. Se já existe um job com a mesma chave, reaproveita.
+        :param key: identificador do job (ex.: sha256 da imagem + dados esperados)
+        :return: Future do job
+        :raises OCRQueueFull: se a fila estiver cheia
+        """
+        with self._lock:
+            fut = self._jobs.get(key)
+            if fut is not None:
+                return fut
+            pending = sum(1 for f in self._jobs.values() if not f.done())
+            if pending >= self.max_pending:
+                raise OCRQueueFull(f"{pending} documentos aguardando validação")
+            with _clean_main():
+                fut = self._pool.submit(self._fn, *args)
+            # o OCR roda em outro processo: a duração (fila + OCR) é medida aqui
+            submitted = time.perf_counter()
+            fut.add_done_callback(lambda f: metrics.observe(
+                "operation_seconds", time.perf_counter() - submitted, op="ocr_job"))
+            self._jobs[key] = fut
+            self._prune()
+            return fut
+
+    def _prune(self):
+        # descarta os resultados concluídos mais antigos (dict mantém ordem de inserção)
+        finished = [k for k, f in self._jobs.items() if f.done()]
+        for k in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self._jobs[k]
+
+    def poll(self, key):
+        """
+        Consulta o estado de um job sem bloquear.
+        :return: ('missing', None), ('pending', None), ('done', resultado) ou ('error', exceção)
+        """
+        with self._lock:
+            fut = self._jobs.get(key)
+        if fut is None:
+            return 'missing', None
+        if not fut.done():
+            return 'pending', None
+        exc = fut.exception()
+        if exc is not None:
+            return 'error', exc
+        return 'done', fut.result()
+
+    def forget(self, key):
+        """Remove o job do registro (o resultado já foi consumido pela sessão)."""
+        with self._lock:
+            fut = self._jobs.pop(key, None)
+        if fut is not None:
+            fut.cancel()
+
+    def shutdown(self, wait=True):
+        self._pool.shutdown(wait=wait, cancel_futures=True)
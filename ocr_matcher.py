@@ -0,0 +1,174 @@
+import re
+from collections import deque
+from dataclasses import dataclass
+
+# Tabela única para maiúsculas sem acentos (substitui os vários re.sub em cadeia)
+FOLD_TABLE = str.maketrans(
+    "ÃÁÀÂÄÉÈÊËÍÌÎÏÓÒÔÖÕÚÙÛÜÇ",
+    "AAAAAEEEEIIIIOOOOOUUUUC"
+)
+# Letras que o Tesseract costuma confundir com dígitos dentro de datas
+DIGIT_TABLE = str.maketrans("OQDILJSZBG", "0001115282")
+# ... e o inverso dentro de nomes (nomes não têm dígitos)
+LETTER_TABLE = str.maketrans("0158", "OISB")
+_NON_WORD = re.compile(r"[^A-Z0-9]+")
+_NON_DATE = re.compile(r"[/.\-]")
+# Palavras e quebras de linha (as linhas do OCR delimitam onde o nome pode estar)
+_TOKEN = re.compile(r"[^\S\n]*(\S+|\n)")
+
+# Palavras do nome menores que isso precisam bater exatamente
+MIN_FUZZY_LEN = 4
+# Nota mínima de cada palavra do nome para considerá-la encontrada
+NAME_THRESHOLD = 0.75
+
+
+def fold(s):
+    """Maiúsculas sem acentos."""
+    return s.upper().translate(FOLD_TABLE)
+
+
+def _edit_distance(a, b, limit):
+    """Distância de Levenshtein, abandonando assim que passa de limit."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    prev = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        cur = [i]
+        for j, cb in enumerate(b, 1):
+            cur.append(min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != cb)))
+        if min(cur) > limit:
+            return limit + 1
+        prev = cur
+    return prev[-1]
+
+
+@dataclass
+class MatchResult:
+    matched: bool
+    confidence: float
+    name_score: float
+    birth_found: bool
+    tokens_seen: int
+
+    def __bool__(self):
+        return self.matched
+
+
+def _word_score(word, expected):
+    """1.0 se a palavra do OCR é a esperada; 1 - distância/tamanho se estiver dentro da tolerância; senão 0."""
+    if word == expected:
+        return 1.0
+    if len(expected) < MIN_FUZZY_LEN:
+        return 0.0
+    limit = max(1, len(expected) // 5)
+    dist = _edit_distance(word, expected, limit)
+    return 1 - dist / len(expected) if dist <= limit else 0.0
+
+
+class DocumentMatcher:
+    """
+    Confere nome e data de nascimento consumindo as palavras do OCR uma a uma
+    e para assim que os dois são encontrados.
+    O nome precisa aparecer inteiro numa mesma linha do OCR: as palavras na ordem,
+    lado a lado e como palavras inteiras (nomes soltos pela página, como os da
+    filiação, não contam). Cada palavra tolera erros do OCR (Levenshtein); palavras
+    grudadas ("JOAOSILVA") só valem se baterem exatamente.
+    """
+
+    def __init__(self, expected_name, expected_birth):
+        self.name_tokens = [t for t in _NON_WORD.split(fold(expected_name)) if t]
+        self._joined = "".join(self.name_tokens)
+        self.birth = _NON_DATE.sub("", expected_birth.strip())
+        # notas da melhor janela de palavras vista até agora, uma por palavra do nome
+        self.scores = [0.0] * len(self.name_tokens)
+        self.birth_found = False
+        self.tokens_seen = 0
+        # últimas palavras da linha atual (o tamanho de uma janela do nome)
+        self._line = deque(maxlen=max(1, len(self.name_tokens)))
+        # últimos pedaços numéricos, para datas quebradas em "24 09 1975"
+        self._digits = deque(maxlen=3)
+
+    @property
+    def name_found(self):
+        return bool(self.scores) and min(self.scores) >= 1.0
+
+    @property
+    def done(self):
+        return self.birth_found and self.name_found
+
+    def _feed_name(self, word):
+        self._line.append(word)
+        words = list(self._line)
+        k = len(self.name_tokens)
+        # palavras grudadas pelo OCR: as últimas m palavras formam o nome inteiro
+        for m in range(1, min(k - 1, len(words)) + 1):
+            if "".join(words[-m:]) == self._joined:
+                self.scores = [1.0] * k
+                return
+        if len(words) < k:
+            return
+        scores = []
+        for word, expected in zip(words, self.name_tokens):
+            score = _word_score(word, expected)
+            if not score:
+                return
+            scores.append(score)
+        if min(scores) > min(self.scores):
+            self.scores = scores
+
+    def _feed_birth(self, token):
+        digits = _NON_DATE.sub("", token).translate(DIGIT_TABLE)
+        if not digits.isdigit():
+            self._digits.clear()
+            return
+        self._digits.append(digits)
+        if digits == self.birth or "".join(self._digits) == self.birth:
+            self.birth_found = True
+
+    def end_line(self):
+        """Fim de uma linha do OCR: o nome não continua na próxima."""
+        self._line.clear()
+        self._digits.clear()
+
+    def feed(self, token):
+        """
+        Consome uma palavra do OCR ("\n" marca o fim da linha, ver iter_tokens).
+        :return: True quando nome e data já foram encontrados (pode parar)
+        """
+        if token == "\n":
+            self.end_line()
+            return self.done
+        self.tokens_seen += 1
+        token = fold(token)
+        if not self.birth_found and any(ch.isdigit() for ch in token):
+            self._feed_birth(token)
+        word = _NON_WORD.sub("", token).translate(LETTER_TABLE)
+        if not word:
+            # pontuação solta no meio da linha não separa as palavras do nome
+            return self.done
+        if not self.name_found:
+            self._feed_name(word)
+        return self.done
+
+    def result(self):
+        name_score = min(self.scores) if self.scores else 0.0
+        matched = self.birth_found and name_score >= NAME_THRESHOLD
+        confidence = (sum(self.scores) / len(self.scores) if self.scores else 0.0) * (1.0 if self.birth_found else 0.5)
+        return MatchResult(matched, round(confidence, 3), round(name_score, 3), self.birth_found, self.tokens_seen)
+
+
+def iter_tokens(text):
+    """Gera as palavras do texto sob demanda (sem dividir a página inteira), com "\\n" no fim de cada linha."""
+    return (m.group(1) for m in _TOKEN.finditer(text))
+
+
+def match_tokens(tokens, expected_name, expected_birth):
+    """
+    Roda o DocumentMatcher sobre um iterável de palavras, parando cedo.
+    :return: MatchResult
+    """
+    matcher = DocumentMatcher(expected_name, expected_birth)
+    for token in tokens:
+        if matcher.feed(token):
+            break
+    return matcher.result()
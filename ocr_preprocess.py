@@ -0,0 +1,166 @@
+import time
+from dataclasses import dataclass, field
+from io import BytesIO
+
+import numpy as np
+from PIL import Image, ImageOps
+
+
+@dataclass
+class PreprocessConfig:
+    """Parâmetros do pré-processamento antes do Tesseract."""
+    # Lado maior da imagem decodificada antes de procurar o documento
+    max_side: int = 2000
+    # Resolução alvo do documento recortado (Tesseract rende melhor perto de 300 DPI)
+    target_dpi: int = 300
+    # Largura física do documento em polegadas (RG ~ 10,2 cm, CNH ~ 8,5 cm)
+    doc_width_in: float = 4.0
+    detect_document: bool = True
+    binarize: bool = True
+    detect_fields: bool = True
+    # Fração mínima de pixels de tinta numa linha para ela contar como texto
+    ink_row_ratio: float = 0.01
+    # Altura mínima (px) de uma faixa de texto; menores são ruído
+    min_band_height: int = 8
+    # Faixas mais altas que essa fração do documento não são uma linha de texto só
+    # (ex.: foto 3x4 ao lado dos campos); nelas removemos as colunas sólidas
+    max_line_ratio: float = 0.12
+    # Colunas com mais tinta que isso dentro dessas faixas são foto/borda, não texto
+    solid_col_ratio: float = 0.9
+    # Margem (px) mantida em volta de cada faixa de texto
+    band_margin: int = 6
+
+    @property
+    def target_width(self):
+        return int(self.target_dpi * self.doc_width_in)
+
+
+@dataclass
+class PreprocessResult:
+    image: Image.Image
+    bands: list = field(default_factory=list)
+    timings: dict = field(default_factory=dict)
+
+
+DEFAULT_CONFIG = PreprocessConfig()
+
+
+def otsu_threshold(gray):
+    """Limiar de Otsu calculado sobre o histograma (vetorizado)."""
+    hist = np.bincount(gray.ravel(), minlength=256).astype(np.float64)
+    levels = np.arange(256)
+    w0 = np.cumsum(hist)
+    w1 = w0[-1] - w0
+    m0 = np.cumsum(hist * levels)
+    mean0 = np.divide(m0, w0, out=np.zeros(256), where=w0 > 0)
+    mean1 = np.divide(m0[-1] - m0, w1, out=np.zeros(256), where=w1 > 0)
+    between = w0 * w1 * (mean0 - mean1) ** 2
+    return int(np.argmax(between))
+
+
+def _runs(mask):
+    """Converte um vetor booleano em lista de intervalos [início, fim) contínuos."""
+    padded = np.concatenate(([False], mask, [False]))
+    edges = np.flatnonzero(padded[1:] != padded[:-1])
+    return list(zip(edges[::2], edges[1::2]))
+
+
+def load_image(img_bytes, config=DEFAULT_CONFIG):
+    """Decodifica já reduzido (draft do JPEG), corrige rotação EXIF e converte para cinza."""
+    img = Image.open(BytesIO(img_bytes))
+    img.draft("L", (config.max_side, config.max_side))
+    img = ImageOps.exif_transpose(img).convert("L")
+    if max(img.size) > config.max_side:
+        img.thumbnail((config.max_side, config.max_side), Image.Resampling.BILINEAR)
+    return img
+
+
+def detect_document(gray):
+    """
+    Encontra a região do documento: a área clara que ocupa a maior parte
+    das linhas/colunas (o fundo da foto costuma ser mais escuro).
+    :return: (top, bottom, left, right)
+    """
+    mask = gray > otsu_threshold(gray)
+    rows = np.flatnonzero(mask.mean(axis=1) > 0.5)
+    cols = np.flatnonzero(mask.mean(axis=0) > 0.5)
+    if rows.size == 0 or cols.size == 0:
+        return 0, gray.shape[0], 0, gray.shape[1]
+    return rows[0], rows[-1] + 1, cols[0], cols[-1] + 1
+
+
+def detect_text_bands(ink, config=DEFAULT_CONFIG):
+    """
+    Localiza as faixas horizontais com texto (campos do documento).
+    :param ink: matriz booleana, True onde há tinta
+    :return: (lista de (top, bottom, left, right), máscara de tinta sem foto/bordas)
+    """
+    h, w = ink.shape
+    # apaga foto 3x4 e bordas: colunas quase todas pretas dentro de uma faixa alta
+    ink = ink.copy()
+    for top, bottom in _runs(ink.mean(axis=1) > config.ink_row_ratio):
+        if bottom - top <= h * config.max_line_ratio:
+            continue
+        solid = ink[top:bottom].mean(axis=0) > config.solid_col_ratio
+        ink[top:bottom, solid] = False
+    bands = []
+    for top, bottom in _runs(ink.mean(axis=1) > config.ink_row_ratio):
+        if bottom - top < config.min_band_height:
+            continue
+        cols = np.flatnonzero(ink[top:bottom].any(axis=0))
+        m = config.band_margin
+        bands.append((max(0, top - m), min(h, bottom + m), max(0, cols[0] - m), min(w, cols[-1] + 1 + m)))
+    return bands, ink
+
+
+def preprocess(img_bytes, config=DEFAULT_CONFIG):
+    """
+    Prepara o documento para o OCR: rotação EXIF, redução, recorte do documento,
+    binarização e recorte das faixas de texto, montadas numa única imagem.
+    :return: PreprocessResult com a imagem final, as faixas e o tempo de cada etapa
+    """
+    timings = {}
+    t0 = time.perf_counter()
+    img = load_image(img_bytes, config)
+    t1 = time.perf_counter()
+    timings["load"] = t1 - t0
+
+    gray = np.asarray(img)
+    if config.detect_document:
+        top, bottom, left, right = detect_document(gray)
+        gray = gray[top:bottom, left:right]
+    t2 = time.perf_counter()
+    timings["document"] = t2 - t1
+
+    if gray.shape[1] > config.target_width:
+        scale = config.target_width / gray.shape[1]
+        size = (config.target_width, max(1, int(gray.shape[0] * scale)))
+        gray = np.asarray(Image.fromarray(gray).resize(size, Image.Resampling.BILINEAR))
+    t3 = time.perf_counter()
+    timings["resize"] = t3 - t2
+
+    ink = gray <= otsu_threshold(gray)
+    out = np.where(ink, 0, 255).astype(np.uint8) if config.binarize else gray
+    t4 = time.perf_counter()
+    timings["binarize"] = t4 - t3
+
+    bands = []
+    if config.detect_fields:
+        bands, ink = detect_text_bands(ink, config)
+        if bands:
+            if config.binarize:
+                out = np.where(ink, 0, 255).astype(np.uint8)
+            # empilha só as faixas de texto, separadas por uma linha em branco
+            width = max(r - l for _, _, l, r in bands)
+            gap = np.full((config.band_margin * 2, width), 255, dtype=np.uint8)
+            parts = []
+            for top, bottom, left, right in bands:
+                crop = out[top:bottom, left:right]
+                if crop.shape[1] < width:
+                    pad = np.full((crop.shape[0], width - crop.shape[1]), 255, dtype=np.uint8)
+                    crop = np.hstack((crop, pad))
+                parts.extend((crop, gap))
+            out = np.vstack(parts[:-1])
+    timings["fields"] = time.perf_counter() - t4
+
+    return PreprocessResult(image=Image.fromarray(out), bands=bands, timings=timings)
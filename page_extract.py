@@ -0,0 +1,158 @@
+import codecs
+from html.parser import HTMLParser
+
+# Quanto da página lemos no máximo (páginas da Liquipedia passam de alguns MB)
+MAX_PAGE_BYTES = 512 * 1024
+# Tamanho dos blocos lidos da resposta
+CHUNK_BYTES = 16 * 1024
+
+_HEADINGS = ("h1", "h2", "title")
+_OG_FIELDS = ("og:title", "og:description", "og:site_name")
+
+
+class StopParsing(Exception):
+    """Tudo que interessa já foi encontrado."""
+
+
+class PageMetaParser(HTMLParser):
+    """
+    Parser por eventos (alimentado em blocos) que guarda só o que a checagem de links
+    usa: o primeiro h1/h2/title em ordem de documento, o <title> e as metas OpenGraph.
+    Levanta StopParsing assim que nada mais relevante pode aparecer.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.headline = None
+        self.title = None
+        self.og = {}
+        self.in_body = False
+        self._current = None
+        self._text = []
+
+    @property
+    def done(self):
+        # as metas ficam no <head>: depois do <body> basta ter o primeiro cabeçalho
+        return self.headline is not None and (self.in_body or len(self.og) == len(_OG_FIELDS))
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "body":
+            self.in_body = True
+        elif tag == "meta":
+            attrs = dict(attrs)
+            prop = attrs.get("property") or attrs.get("name")
+            if prop in _OG_FIELDS and attrs.get("content") and prop not in self.og:
+                self.og[prop] = attrs["content"].strip()
+        elif tag in _HEADINGS and self._current is None:
+            if tag == "title" and self.title is not None:
+                return
+            if tag != "title" and self.headline is not None:
+                return
+            self._current = tag
+            self._text = []
+        if tag in ("h1", "h2"):
+            self.in_body = True
+        if self.done:
+            raise StopParsing
+
+    def handle_data(self, data):
+        if self._current is not None:
+            self._text.append(data)
+
+    def handle_endtag(self, tag):
+        if tag != self._current:
+            if tag == "head":
+                self.in_body = True
+            return
+        text = " ".join("".join(self._text).split())
+        self._current = None
+        if tag == "title":
+            self.title = text
+        if self.headline is None and (text or tag != "title"):
+            self.headline = text
+        if self.done:
+            raise StopParsing
+
+    def content(self):
+        """Texto usado no prompt: primeiro cabeçalho, ou og:title se a página não tiver."""
+        return self.headline or self.og.get("og:title") or self.title or ""
+
+
+class PageExtractor:
+    """
+    Alimenta o PageMetaParser com os blocos de uma resposta HTTP, decodificando
+    incrementalmente, e diz quando parar (tudo encontrado ou limite de bytes).
+    """
+
+    def __init__(self, encoding=None, max_bytes=MAX_PAGE_BYTES):
+        self.max_bytes = max_bytes
+        self.bytes_read = 0
+        self.truncated = False
+        self.parser = PageMetaParser()
+        self._decoder = codecs.getincrementaldecoder(_codec(encoding))(errors="replace")
+
+    def feed(self, chunk):
+        """:return: True quando não precisa mais ler a resposta"""
+        room = self.max_bytes - self.bytes_read
+        if len(chunk) >= room:
+            chunk = chunk[:room]
+            self.truncated = True
+        self.bytes_read += len(chunk)
+        try:
+            self.parser.feed(self._decoder.decode(chunk, final=self.truncated))
+        except StopParsing:
+            return True
+        return self.truncated
+
+    def close(self):
+        """Fim da resposta: processa o que ficou no buffer do decoder/parser."""
+        try:
+            self.parser.feed(self._decoder.decode(b"", final=True))
+            self.parser.close()
+        except StopParsing:
+            pass
+
+    def content(self):
+        return self.parser.content()
+
+
+def charset(content_type):
+    """Charset declarado no Content-Type (sem o padrão ISO-8859-1 que o requests supõe)."""
+    for param in (content_type or "").split(";")[1:]:
+        name, _, value = param.partition("=")
+        if name.strip().lower() == "charset":
+            return value.strip().strip('"\'') or None
+    return None
+
+
+def _codec(encoding):
+    try:
+        return codecs.lookup(encoding or "utf-8").name
+    except LookupError:
+        return "utf-8"
+
+
+def extract_from_chunks(chunks, encoding=None, max_bytes=MAX_PAGE_BYTES):
+    """
+    :param chunks: iterável de bytes (ex.: resp.iter_content(CHUNK_BYTES))
+    :param encoding: charset da resposta (ver charset()); UTF-8 se não informado
+    :return: PageExtractor já alimentado (content(), parser.og, bytes_read, truncated)
+    """
+    extractor = PageExtractor(encoding, max_bytes)
+    for chunk in chunks:
+        if chunk and extractor.feed(chunk):
+            break
+    else:
+        extractor.close()
+    return extractor
+
+
+async def aextract_from_chunks(chunks, encoding=None, max_bytes=MAX_PAGE_BYTES):
+    """Igual a extract_from_chunks para um iterável assíncrono (ex.: httpx aiter_bytes)."""
+    extractor = PageExtractor(encoding, max_bytes)
+    async for chunk in chunks:
+        if chunk and extractor.feed(chunk):
+            break
+    else:
+        extractor.close()
+    return extractor
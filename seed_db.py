@@ -1,117 +1,373 @@
-import sqlite3
-from datetime import datetime, timezone
-
-# Conexão com o banco de dados
-conn = sqlite3.connect('knowyourfan.db')
-c = conn.cursor()
-
-# Cria a tabela caso não exista e garante estrutura básica
-c.execute('''
-CREATE TABLE IF NOT EXISTS fans (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    name TEXT,
-    address TEXT,
-    cpf TEXT,
-    interests TEXT,
-    activities TEXT,
-    purchases TEXT
-)
-''')
-conn.commit()
-
-# Garante que as colunas adicionais existem
-def ensure_columns_exist():
-    for column, col_type in [
-        ("social_profiles", "TEXT"),
-        ("esports_profiles", "TEXT"),
-        ("created_at", "TEXT")
-    ]:
-        try:
-            c.execute(f"ALTER TABLE fans ADD COLUMN {column} {col_type}")
-        except sqlite3.OperationalError:
-            pass  # já existe
-
-# Executa a verificação/adição das colunas
-ensure_columns_exist()
-conn.commit()
+"""
+Carga de fãs no banco, para desenvolvimento e testes de carga do dashboard:
+
+  python seed_db.py                         # os 5 fãs de exemplo abaixo
+  python seed_db.py synthetic 1000000       # N fãs sintéticos realistas (--seed para reproduzir)
+  python seed_db.py import fas.csv          # CSV ou JSONL (colunas de fans; "-" lê da entrada padrão)
+
+Tudo entra em lotes de executemany numa transação só, com os índices de fans e
+fan_interests (e a busca textual) montados só depois da carga; no fim mostra linhas/s de cada etapa.
+Com --dedup também indexa os fãs carregados para a detecção de duplicados (fan_dedup).
+"""
+import argparse
+import csv
+import io
+import json
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+import fan_dedup
+import fan_search
+import fan_stats
+import storage
 
 # Novos dados fictícios para inserir
 fans = [
     {
         "name": "Mariana Rocha",
         "address": "Rua das Lendas, 123, Recife, PE",
-        "cpf": "111.222.333-44",
+        "cpf": "111.222.333-96",
         "interests": "FURIA,VALORANT,LoL",
         "activities": "Organizou campeonato amador de VALORANT na sua cidade.",
         "purchases": "Camiseta autografada da FURIA, mouse gamer.",
         "social_profiles": "Twitter:https://twitter.com/mari_rocha;Instagram:https://instagram.com/mari_rocha",
         "esports_profiles": "https://liquipedia.net/valorant/Mariana_Rocha",
+        "fan_years": 3,
     },
     {
         "name": "Felipe Santos",
         "address": "Avenida Central, 500, Porto Alegre, RS",
-        "cpf": "555.666.777-88",
+        "cpf": "555.666.777-20",
         "interests": "CS:GO,FURIA,R6 Siege",
         "activities": "Participou de watch party da FURIA no último Major.",
         "purchases": "Boné oficial da FURIA, assinatura premium Discord.",
         "social_profiles": "Facebook:https://facebook.com/felipe.gg;TikTok:https://tiktok.com/@felipeplays",
         "esports_profiles": "https://www.hltv.org/player/54321/felipe_santos",
+        "fan_years": 5,
     },
     {
         "name": "Carla Menezes",
         "address": "Travessa Esportiva, 77, Salvador, BA",
-        "cpf": "999.000.111-22",
+        "cpf": "999.000.111-12",
         "interests": "FIFA,FURIA,F1",
         "activities": "Participou de torneio de FIFA organizado pela FURIA.",
         "purchases": "Controle customizado, camisa retrô.",
         "social_profiles": "YouTube:https://youtube.com/c/carlamenezes;Instagram:https://instagram.com/carla_menezes",
         "esports_profiles": "https://www.fifa.gg/player/112233/carla_menezes",
+        "fan_years": 2,
     },
     {
         "name": "Rafael Lima",
         "address": "Rua Pixel, 404, Brasília, DF",
-        "cpf": "444.333.222-11",
+        "cpf": "444.333.222-70",
         "interests": "LoL,VALORANT,CS:GO",
         "activities": "Stream semanal de CS:GO com análise de jogos da FURIA.",
         "purchases": "Microfone condensador, headset RGB.",
         "social_profiles": "Twitch:https://twitch.tv/rafaellima;Twitter:https://twitter.com/rlima",
         "esports_profiles": "https://www.vlr.gg/player/33445/rafael_lima",
+        "fan_years": 4,
     },
     {
         "name": "Sofia Almeida",
         "address": "Praça Gamer, 9, Fortaleza, CE",
-        "cpf": "777.888.999-00",
+        "cpf": "777.888.999-41",
         "interests": "R6 Siege,FURIA,Overwatch",
         "activities": "Líder de clã em Rainbow Six Siege e fã da FURIA.",
         "purchases": "Skin exclusiva no jogo, pôster de time.",
         "social_profiles": "Instagram:https://instagram.com/sofia.almeida;Discord:sofia#1234",
         "esports_profiles": "https://siege.gg/players/9988/sofia_almeida",
+        "fan_years": 1,
     }
 ]
 
-# Inserção no banco
-def seed_data():
-    for fan in fans:
-        c.execute(
-            '''
-            INSERT INTO fans (name, address, cpf, interests, activities, purchases, social_profiles, esports_profiles, created_at)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''',
-            (
-                fan["name"],
-                fan["address"],
-                fan["cpf"],
-                fan["interests"],
-                fan["activities"],
-                fan["purchases"],
-                fan["social_profiles"],
-                fan["esports_profiles"],
-                datetime.now(timezone.utc).isoformat()
-            )
+
+# Colunas de fans aceitas na importação, na ordem de storage.INSERT_FAN
+FAN_COLUMNS = ("name", "address", "cpf", "interests", "activities", "purchases", "social_profiles",
+               "esports_profiles", "fan_years", "fav_player", "created_at")
+# Linhas por executemany
+DEFAULT_CHUNK_SIZE = 50000
+# Tabelas cujos índices secundários só são criados depois da carga
+DEFERRED_INDEX_TABLES = ("fans", "fan_interests")
+# Trigger que indexa cada fã novo na busca (fans_fts); na carga, o índice é montado de uma vez no fim
+DEFERRED_TRIGGERS = ("fans_fts_ai",)
+
+# Vocabulário do gerador sintético
+FIRST_NAMES = ["Ana", "Bruno", "Carla", "Diego", "Eduarda", "Felipe", "Gabriela", "Henrique", "Isabela",
+               "João", "Larissa", "Lucas", "Mariana", "Matheus", "Natália", "Pedro", "Rafael", "Sofia",
+               "Thiago", "Vitória", "Gustavo", "Juliana", "Leonardo", "Camila", "Rodrigo", "Beatriz"]
+LAST_NAMES = ["Silva", "Santos", "Oliveira", "Souza", "Rodrigues", "Ferreira", "Alves", "Pereira", "Lima",
+              "Gomes", "Costa", "Ribeiro", "Martins", "Carvalho", "Almeida", "Lopes", "Rocha", "Menezes"]
+STREETS = ["Rua das Lendas", "Avenida Central", "Travessa Esportiva", "Rua Pixel", "Praça Gamer",
+           "Rua do Clutch", "Avenida Paulista", "Rua XV de Novembro", "Alameda dos Campeões"]
+CITIES = [("São Paulo", "SP"), ("Rio de Janeiro", "RJ"), ("Belo Horizonte", "MG"), ("Recife", "PE"),
+          ("Porto Alegre", "RS"), ("Salvador", "BA"), ("Brasília", "DF"), ("Fortaleza", "CE"),
+          ("Curitiba", "PR"), ("Manaus", "AM"), ("Goiânia", "GO"), ("Florianópolis", "SC")]
+# mesmas opções do multiselect do passo 1, com peso de popularidade
+INTERESTS = {"FURIA": 10, "CS:GO": 7, "VALORANT": 5, "LoL": 4, "R6 Siege": 3, "Outro": 1}
+ACTIVITIES = ["Participou de watch party da FURIA no último Major.", "Foi à FURIA Fan Fest em São Paulo.",
+              "Organizou campeonato amador na sua cidade.", "Assiste todos os jogos da FURIA na Twitch.",
+              "Joga ranqueada toda semana com amigos.", "Stream semanal com análise de jogos da FURIA."]
+PURCHASES = ["Camiseta oficial da FURIA", "Boné oficial da FURIA", "Jaqueta FURIA x Adidas", "Mouse gamer",
+             "Headset RGB", "Skin exclusiva no jogo", "Ingresso para o Major", "Moletom FURIA"]
+SOCIAL_PLATFORMS = {"Twitter": "https://twitter.com/{}", "Instagram": "https://instagram.com/{}",
+                    "Facebook": "https://facebook.com/{}", "TikTok": "https://tiktok.com/@{}"}
+ESPORTS_SITES = {
+    "CS:GO": ["https://www.hltv.org/player/{id}/{slug}", "https://liquipedia.net/counterstrike/{name}"],
+    "VALORANT": ["https://www.vlr.gg/player/{id}/{slug}", "https://liquipedia.net/valorant/{name}"],
+    "LoL": ["https://gosu.gg/lol/player/{slug}", "https://liquipedia.net/leagueoflegends/{name}"],
+    "R6 Siege": ["https://siege.gg/players/{id}/{slug}", "https://liquipedia.net/rainbowsix/{name}"],
+}
+FAV_PLAYERS = ["KSCERATO", "yuurih", "FalleN", "arT", "chelo", "molodoy", "skullz", "Mwzera", "Khalil", None]
+
+
+def cpf_with_check_digits(base):
+    """CPF formatado (###.###.###-##) com os dígitos verificadores válidos para os 9 dígitos da base."""
+    s = f"{base:09d}"
+    return f"{s[:3]}.{s[3:6]}.{s[6:9]}-{fan_dedup.cpf_check_digits(s)}"
+
+
+def synthetic_fans(n, seed=42, start=None, days=365):
+    """
+    Gera n linhas de fans (ordem de storage.INSERT_FAN) parecidas com cadastros reais.
+    :param start: data do primeiro cadastro (padrão: `days` dias atrás); os cadastros se espalham até hoje
+    """
+    rng = random.Random(seed)
+    rand = rng.random
+
+    def pick(seq):
+        # rng.choice/randint custam várias chamadas cada; aqui é uma só
+        return seq[int(rand() * len(seq))]
+
+    start = start or datetime.now(timezone.utc) - timedelta(days=days)
+    step = days * 86400 / max(n, 1)
+    # interesses sorteados com o peso de popularidade
+    interest_pool = [i for i, weight in INTERESTS.items() for _ in range(weight)]
+    platforms = list(SOCIAL_PLATFORMS)
+    counts = (0, 1, 1, 2, 2, 3)
+    for i in range(n):
+        first, last = pick(FIRST_NAMES), pick(LAST_NAMES)
+        name = f"{first} {pick(LAST_NAMES)} {last}" if rand() < 0.4 else f"{first} {last}"
+        handle = f"{first}_{last}{int(rand() * 9999)}".lower()
+        city, uf = pick(CITIES)
+        wanted = 1 + int(rand() * 4)
+        interests = []
+        while len(interests) < wanted:
+            choice = pick(interest_pool)
+            if choice not in interests:
+                interests.append(choice)
+        social = ";".join(f"{p}:{SOCIAL_PLATFORMS[p].format(handle)}"
+                          for p in dict.fromkeys(pick(platforms) for _ in range(pick(counts))))
+        game = next((g for g in interests if g in ESPORTS_SITES), "CS:GO")
+        link = pick(ESPORTS_SITES[game]).format(id=1000 + int(rand() * 99000), slug=handle,
+                                                name=name.replace(" ", "_"))
+        yield (
+            name,
+            f"{pick(STREETS)}, {1 + int(rand() * 3000)}, {city}, {uf}",
+            cpf_with_check_digits(int(rand() * 10 ** 9)),
+            ",".join(interests),
+            pick(ACTIVITIES),
+            ", ".join(dict.fromkeys(pick(PURCHASES) for _ in range(1 + int(rand() * 3)))),
+            social,
+            link,
+            int(rand() * 11),
+            pick(FAV_PLAYERS),
+            (start + timedelta(seconds=i * step)).isoformat(),
         )
-    conn.commit()
+
+
+def fan_row(record, now=None):
+    """
+    Dicionário (linha de CSV/JSONL) -> tupla de storage.INSERT_FAN, ou None se faltar o nome.
+    interests pode vir como lista (JSONL) ou já no formato 'A,B'.
+    """
+    if not (record.get("name") or "").strip():
+        return None
+    interests = record.get("interests") or ""
+    if isinstance(interests, (list, tuple)):
+        interests = ",".join(interests)
+    fan_years = record.get("fan_years")
+    return (
+        record["name"].strip(),
+        record.get("address"),
+        record.get("cpf"),
+        interests,
+        record.get("activities"),
+        record.get("purchases"),
+        record.get("social_profiles"),
+        record.get("esports_profiles"),
+        int(fan_years) if fan_years not in (None, "") else None,
+        record.get("fav_player") or None,
+        record.get("created_at") or now or datetime.now(timezone.utc).isoformat(),
+    )
+
+
+def read_records(path, fmt=None):
+    """
+    Lê um arquivo CSV (com cabeçalho) ou JSONL em streaming, um dicionário por fã.
+    :param fmt: 'csv' ou 'jsonl'; sem ele, decide pela extensão ("-" = entrada padrão, JSONL)
+    """
+    fmt = fmt or ("csv" if path.lower().endswith(".csv") else "jsonl")
+    f = io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8") if path == "-" else open(path, encoding="utf-8", newline="")
+    with f:
+        if fmt == "csv":
+            yield from csv.DictReader(f)
+        else:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def _drop_deferred_indexes(conn):
+    """
+    Remove os índices secundários das tabelas da carga e devolve o SQL para recriá-los.
+    Índices UNIQUE ficam (ex.: idx_fans_cpf_hash): sem eles os cadastros que chegam
+    durante a carga perderiam a unicidade do CPF e, com um duplicado, recriar o índice
+    falharia no fim. As linhas importadas não têm cpf_hash (NULL), então mantê-los custa pouco.
+    """
+    marks = ",".join("?" * len(DEFERRED_INDEX_TABLES))
+    indexes = [
+        (name, sql) for name, sql in conn.execute(
+            f"SELECT name, sql FROM sqlite_master WHERE type = 'index' AND sql IS NOT NULL AND tbl_name IN ({marks})",
+            DEFERRED_INDEX_TABLES
+        )
+        if not sql.lstrip().upper().startswith("CREATE UNIQUE")
+    ]
+    for name, _ in indexes:
+        conn.execute(f"DROP INDEX {name}")
+    return [sql for _, sql in indexes]
+
+
+def _drop_deferred_triggers(conn):
+    """Remove os triggers de DEFERRED_TRIGGERS e devolve o SQL para recriá-los."""
+    triggers = conn.execute(
+        f"SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND name IN ({','.join('?' * len(DEFERRED_TRIGGERS))})",
+        DEFERRED_TRIGGERS
+    ).fetchall()
+    for name, _ in triggers:
+        conn.execute(f"DROP TRIGGER {name}")
+    return [sql for _, sql in triggers]
+
+
+def bulk_load(rows, chunk_size=DEFAULT_CHUNK_SIZE, aggregates=True, progress=None):
+    """
+    Insere as linhas de fans em lotes de executemany numa única transação, que também
+    monta a busca textual, atualiza fan_interests e os agregados e recria os índices secundários no fim.
+    :param rows: iterável de tuplas de storage.INSERT_FAN (pode ser um gerador)
+    :param progress: função chamada com o total inserido depois de cada lote
+    :return: dict com linhas e segundos de cada etapa
+    """
+    report = {"rows": 0}
+    started = time.perf_counter()
+    with storage.transaction() as conn:
+        index_sql = _drop_deferred_indexes(conn)
+        trigger_sql = _drop_deferred_triggers(conn)
+        last_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM fans").fetchone()[0]
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= chunk_size:
+                conn.executemany(storage.INSERT_FAN, chunk)
+                report["rows"] += len(chunk)
+                chunk = []
+                if progress:
+                    progress(report["rows"])
+        if chunk:
+            conn.executemany(storage.INSERT_FAN, chunk)
+            report["rows"] += len(chunk)
+        report["insert_s"] = time.perf_counter() - started
+        started = time.perf_counter()
+        if trigger_sql:
+            fan_search.index_fans_after(conn, last_id)
+            for sql in trigger_sql:
+                conn.execute(sql)
+        report["search_index_s"] = time.perf_counter() - started
+        if aggregates:
+            # fan_interests ainda sem o índice secundário: cada inserção só toca a chave primária
+            started = time.perf_counter()
+            fan_stats.refresh_aggregates(conn)
+            report["aggregates_s"] = time.perf_counter() - started
+        # na mesma transação da carga: se o processo cair antes do COMMIT, o ROLLBACK
+        # devolve também os índices removidos (nenhuma migração os recriaria depois)
+        started = time.perf_counter()
+        for sql in index_sql:
+            conn.execute(sql)
+        report["index_s"] = time.perf_counter() - started
+    storage.execute("PRAGMA optimize")
+    return report
+
+
+# Fãs de exemplo (a estrutura das tabelas vem das migrações do storage)
+def seed_data():
+    now = datetime.now(timezone.utc).isoformat()
+    return bulk_load(fan_row(fan, now) for fan in fans)
+
+
+def _print_report(report, rejected=0):
+    rows = report["rows"]
+    line = f"✅ {rows} fãs inseridos em {report['insert_s']:.2f} s ({rows / max(report['insert_s'], 1e-9):,.0f} linhas/s)"
+    if "aggregates_s" in report:
+        line += f"; agregados {report['aggregates_s']:.2f} s ({rows / max(report['aggregates_s'], 1e-9):,.0f} linhas/s)"
+    line += f"; busca {report['search_index_s']:.2f} s; índices {report['index_s']:.2f} s"
+    if "dedup_s" in report:
+        line += f"; duplicados {report['dedup_s']:.2f} s ({rows / max(report['dedup_s'], 1e-9):,.0f} linhas/s)"
+    print(line)
+    if rejected:
+        print(f"⚠️ {rejected} linhas sem nome ignoradas")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", help="caminho do banco (padrão: KNOWYOURFAN_DB ou knowyourfan.db)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="linhas por executemany")
+    parser.add_argument("--no-aggregates", action="store_true",
+                        help="não atualiza fan_interests/agregados (o dashboard faz isso na próxima abertura)")
+    parser.add_argument("--dedup", action="store_true",
+                        help="indexa os fãs carregados para a detecção de duplicados (ou depois: python fan_dedup.py)")
+    sub = parser.add_subparsers(dest="command")
+    synthetic = sub.add_parser("synthetic", help="gera fãs sintéticos")
+    synthetic.add_argument("count", type=int)
+    synthetic.add_argument("--seed", type=int, default=42)
+    synthetic.add_argument("--days", type=int, default=365, help="cadastros espalhados pelos últimos N dias")
+    imp = sub.add_parser("import", help="importa CSV/JSONL")
+    imp.add_argument("path", help='arquivo .csv/.jsonl ou "-" para a entrada padrão')
+    imp.add_argument("--format", choices=("csv", "jsonl"))
+    args = parser.parse_args()
+
+    if args.db:
+        storage.DB_PATH = args.db
+    rejected = 0
+
+    def progress(total):
+        print(f"  {total} linhas...", end="\r", file=sys.stderr, flush=True)
+
+    if args.command == "synthetic":
+        rows = synthetic_fans(args.count, seed=args.seed, days=args.days)
+    elif args.command == "import":
+        now = datetime.now(timezone.utc).isoformat()
+
+        def parsed():
+            nonlocal rejected
+            for record in read_records(args.path, args.format):
+                row = fan_row(record, now)
+                if row is None:
+                    rejected += 1
+                else:
+                    yield row
+        rows = parsed()
+    else:
+        now = datetime.now(timezone.utc).isoformat()
+        rows = (fan_row(fan, now) for fan in fans)
+    report = bulk_load(rows, chunk_size=args.chunk_size, aggregates=not args.no_aggregates, progress=progress)
+    if args.dedup:
+        started = time.perf_counter()
+        fan_dedup.rescan(progress=lambda n: print(f"  {n} fãs indexados...", end="\r", file=sys.stderr, flush=True))
+        report["dedup_s"] = time.perf_counter() - started
+    storage.close_connection()
+    print(file=sys.stderr)
+    _print_report(report, rejected)
+
 
 if __name__ == '__main__':
-    seed_data()
-    conn.close()
-    print("✅ Dados inseridos com sucesso.")
+    main()
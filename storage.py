@@ -0,0 +1,433 @@
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+import metrics
+
+# Caminho do banco (pode ser trocado por variável de ambiente, ex.: testes de carga)
+DB_PATH = os.getenv('KNOWYOURFAN_DB', 'knowyourfan.db')
+
+# Pragmas aplicados em toda conexão nova
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA busy_timeout=5000",
+    "PRAGMA foreign_keys=ON",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA cache_size=-65536",
+)
+# Quantos statements compilados cada conexão mantém em cache
+STATEMENT_CACHE_SIZE = 256
+
+# Statements usados em mais de um lugar
+INSERT_FAN = (
+    "INSERT INTO fans (name, address, cpf, interests, activities, purchases, social_profiles, esports_profiles, "
+    "fan_years, fav_player, created_at) "
+    "VALUES (?,?,?,?,?,?,?,?,?,?,?)"
+)
+# Cadastro pelo wizard: também grava o hash do CPF (índice único) e o pHash do documento
+INSERT_SIGNUP = (
+    "INSERT INTO fans (name, address, cpf, interests, activities, purchases, social_profiles, esports_profiles, "
+    "fan_years, fav_player, created_at, cpf_hash, doc_phash) "
+    "VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?)"
+)
+INSERT_TWEET = (
+    "INSERT OR REPLACE INTO tweets_cache (tweet_id, author_id, text, created_at, fetched_at) "
+    "VALUES (?,?,?,?,?)"
+)
+
+
+def split_interests(interests):
+    """'FURIA,CS:GO' -> {'FURIA', 'CS:GO'} (formato de fans.interests)."""
+    return {i.strip() for i in (interests or '').split(',') if i.strip()}
+
+
+def _add_columns(conn, table, columns):
+    existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+    for column, col_type in columns:
+        if column not in existing:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {col_type}")
+
+
+def _migration_1(conn):
+    # estrutura que antes era criada à mão em main.py e seed_db.py
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS tweets_cache (
+        tweet_id TEXT PRIMARY KEY,
+        author_id TEXT,
+        text TEXT,
+        created_at TEXT,
+        fetched_at INTEGER
+    )
+    """)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS fans (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT,
+        address TEXT,
+        cpf TEXT,
+        interests TEXT,
+        activities TEXT,
+        purchases TEXT
+    )
+    """)
+    # bancos antigos podem já ter parte dessas colunas (ensure_columns_exist)
+    _add_columns(conn, "fans", [
+        ("social_profiles", "TEXT"),
+        ("esports_profiles", "TEXT"),
+        ("created_at", "TEXT"),
+    ])
+
+
+def _migration_2(conn):
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS ocr_cache (
+        cache_key TEXT PRIMARY KEY,
+        text TEXT,
+        size INTEGER,
+        created_at INTEGER,
+        last_access INTEGER
+    )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_ocr_cache_last_access ON ocr_cache (last_access)")
+
+
+def _migration_3(conn):
+    # extras do passo 5 passam a ser gravados
+    _add_columns(conn, "fans", [
+        ("fan_years", "INTEGER"),
+        ("fav_player", "TEXT"),
+    ])
+    # agregados do dashboard, atualizados incrementalmente (ver fan_stats)
+    conn.execute("CREATE TABLE IF NOT EXISTS agg_interest_counts (interest TEXT PRIMARY KEY, fans INTEGER NOT NULL)")
+    conn.execute("CREATE TABLE IF NOT EXISTS agg_fan_years (fan_years INTEGER PRIMARY KEY, fans INTEGER NOT NULL)")
+    conn.execute("CREATE TABLE IF NOT EXISTS agg_daily_signups (day TEXT PRIMARY KEY, fans INTEGER NOT NULL)")
+    conn.execute("CREATE TABLE IF NOT EXISTS agg_state (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+
+
+def _migration_4(conn):
+    # interesses normalizados (um por linha) para consultas de segmento por índice
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS fan_interests (
+        interest TEXT NOT NULL,
+        fan_id INTEGER NOT NULL REFERENCES fans(id) ON DELETE CASCADE,
+        PRIMARY KEY (interest, fan_id)
+    ) WITHOUT ROWID
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_fan_interests_fan ON fan_interests (fan_id)")
+    # backfill só até a marca d'água dos agregados; o resto entra por fan_stats.apply_new_fans
+    row = conn.execute("SELECT value FROM agg_state WHERE name = 'fans_id'").fetchone()
+    high_water = row[0] if row else 0
+    cur = conn.execute("SELECT id, interests FROM fans WHERE id <= ?", (high_water,))
+    while True:
+        rows = cur.fetchmany(10000)
+        if not rows:
+            break
+        conn.executemany(
+            "INSERT OR IGNORE INTO fan_interests (interest, fan_id) VALUES (?, ?)",
+            [(i, fan_id) for fan_id, interests in rows for i in split_interests(interests)]
+        )
+
+
+def _migration_5(conn):
+    # cache de timeline por conta: índice por autor e estado do último refresh
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_tweets_cache_author_created ON tweets_cache (author_id, created_at)")
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS twitter_users (
+        user_id TEXT PRIMARY KEY,
+        username TEXT NOT NULL,
+        name TEXT,
+        profile_image_url TEXT,
+        fetched_at INTEGER
+    )
+    """)
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_twitter_users_username ON twitter_users (username COLLATE NOCASE)")
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS tweet_timelines (
+        user_id TEXT PRIMARY KEY,
+        newest_id TEXT,
+        refreshed_at INTEGER
+    )
+    """)
+
+
+def _migration_6(conn):
+    # cache da validação de links: página (título + validadores HTTP) e veredito do LLM
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS link_pages (
+        url TEXT PRIMARY KEY,
+        title TEXT,
+        content_hash TEXT,
+        etag TEXT,
+        last_modified TEXT,
+        fetched_at INTEGER,
+        last_access INTEGER
+    )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_link_pages_last_access ON link_pages (last_access)")
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS link_verdicts (
+        cache_key TEXT PRIMARY KEY,
+        url TEXT,
+        relevant INTEGER NOT NULL,
+        created_at INTEGER,
+        last_access INTEGER
+    )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_link_verdicts_last_access ON link_verdicts (last_access)")
+
+
+def _migration_7(conn):
+    # HTML do card de cada tweet já renderizado (ver tweet_cards); NULL = renderizar de novo
+    _add_columns(conn, "tweets_cache", [
+        ("card_html", "TEXT"),
+        ("card_version", "INTEGER"),
+    ])
+
+
+def _migration_8(conn):
+    # progresso do wizard no servidor (ver wizard_sessions): retomável por token
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS wizard_sessions (
+        token TEXT PRIMARY KEY,
+        step INTEGER NOT NULL,
+        data TEXT NOT NULL,
+        created_at INTEGER,
+        updated_at INTEGER
+    )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_wizard_sessions_updated_at ON wizard_sessions (updated_at)")
+
+
+def _migration_9(conn):
+    # busca textual (FTS5) em atividades, compras e interesses; o conteúdo fica em fans
+    # (tabela externa) e os triggers mantêm o índice em dia (ver fan_search)
+    conn.execute("""
+    CREATE VIRTUAL TABLE IF NOT EXISTS fans_fts USING fts5(
+        activities, purchases, interests,
+        content='fans', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+    """)
+    conn.execute("""
+    CREATE TRIGGER IF NOT EXISTS fans_fts_ai AFTER INSERT ON fans BEGIN
+        INSERT INTO fans_fts (rowid, activities, purchases, interests)
+        VALUES (new.id, new.activities, new.purchases, new.interests);
+    END
+    """)
+    conn.execute("""
+    CREATE TRIGGER IF NOT EXISTS fans_fts_ad AFTER DELETE ON fans BEGIN
+        INSERT INTO fans_fts (fans_fts, rowid, activities, purchases, interests)
+        VALUES ('delete', old.id, old.activities, old.purchases, old.interests);
+    END
+    """)
+    conn.execute("""
+    CREATE TRIGGER IF NOT EXISTS fans_fts_au AFTER UPDATE OF activities, purchases, interests ON fans BEGIN
+        INSERT INTO fans_fts (fans_fts, rowid, activities, purchases, interests)
+        VALUES ('delete', old.id, old.activities, old.purchases, old.interests);
+        INSERT INTO fans_fts (rowid, activities, purchases, interests)
+        VALUES (new.id, new.activities, new.purchases, new.interests);
+    END
+    """)
+    # fãs que já estavam no banco
+    conn.execute("INSERT INTO fans_fts (fans_fts) VALUES ('rebuild')")
+
+
+def _migration_10(conn):
+    # detecção de duplicados/fraude no cadastro (ver fan_dedup)
+    _add_columns(conn, "fans", [
+        ("cpf_hash", "TEXT"),
+        ("doc_phash", "INTEGER"),
+    ])
+    # um CPF por cadastro; linhas antigas ficam NULL até o re-scan (fan_dedup.rescan)
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_fans_cpf_hash ON fans (cpf_hash)")
+    # pHash do documento dividido em faixas de 16 bits (busca por distância de Hamming)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS fan_doc_bands (
+        band INTEGER NOT NULL,
+        value INTEGER NOT NULL,
+        fan_id INTEGER NOT NULL REFERENCES fans(id) ON DELETE CASCADE,
+        PRIMARY KEY (band, value, fan_id)
+    ) WITHOUT ROWID
+    """)
+    # buckets LSH do MinHash de nome + endereço
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS fan_identity_buckets (
+        band INTEGER NOT NULL,
+        bucket INTEGER NOT NULL,
+        fan_id INTEGER NOT NULL REFERENCES fans(id) ON DELETE CASCADE,
+        PRIMARY KEY (band, bucket, fan_id)
+    ) WITHOUT ROWID
+    """)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS fan_flags (
+        fan_id INTEGER NOT NULL REFERENCES fans(id) ON DELETE CASCADE,
+        other_fan_id INTEGER NOT NULL,
+        kind TEXT NOT NULL,
+        score REAL,
+        created_at INTEGER,
+        PRIMARY KEY (fan_id, other_fan_id, kind)
+    ) WITHOUT ROWID
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_fan_flags_created ON fan_flags (created_at)")
+    # o que já está no banco só entra pelo re-scan em lote; a indexação contínua começa daqui
+    conn.execute(
+        "INSERT OR REPLACE INTO agg_state (name, value) SELECT 'dedup_fans_id', COALESCE(MAX(id), 0) FROM fans"
+    )
+
+
+def _migration_11(conn):
+    # checkpoint das importações em lote (ver batch_service): o resultado final de cada
+    # item, para retomar o lote pulando o que já foi decidido
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS batch_items (
+        batch_id TEXT NOT NULL,
+        item_key TEXT NOT NULL,
+        status TEXT NOT NULL,
+        reason TEXT,
+        fan_id INTEGER,
+        updated_at INTEGER,
+        PRIMARY KEY (batch_id, item_key)
+    ) WITHOUT ROWID
+    """)
+
+
+def _migration_12(conn):
+    # os checkpoints do wizard deixaram de guardar nome, nascimento, endereço e CPF
+    # (ficavam em texto puro sob o token da URL): descarta os que ainda têm esses dados
+    conn.execute("DELETE FROM wizard_sessions")
+
+
+def _migration_13(conn):
+    # uma carga do seed_db interrompida entre a transação dos dados e a dos índices
+    # deixava fan_interests sem este índice (hoje tudo vai numa transação só)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_fan_interests_fan ON fan_interests (fan_id)")
+
+
+def _migration_14(conn):
+    # total do dashboard contado à parte (ver fan_stats.TOTAL_KEY): a soma de
+    # agg_daily_signups deixava de fora os fãs sem data de cadastro válida
+    conn.execute(
+        "INSERT OR REPLACE INTO agg_state (name, value) SELECT 'fans_total', COUNT(*) FROM fans "
+        "WHERE id <= COALESCE((SELECT value FROM agg_state WHERE name = 'fans_id'), 0)"
+    )
+    # dias que eram só o começo de um texto que não é data
+    conn.execute("DELETE FROM agg_daily_signups WHERE date(day) IS NULL")
+
+
+# Migrações versionadas (PRAGMA user_version). Só acrescente no fim da lista.
+MIGRATIONS = [
+    (1, _migration_1),
+    (2, _migration_2),
+    (3, _migration_3),
+    (4, _migration_4),
+    (5, _migration_5),
+    (6, _migration_6),
+    (7, _migration_7),
+    (8, _migration_8),
+    (9, _migration_9),
+    (10, _migration_10),
+    (11, _migration_11),
+    (12, _migration_12),
+    (13, _migration_13),
+    (14, _migration_14),
+]
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def migrate(conn):
+    """Aplica as migrações pendentes, cada uma na sua transação."""
+    current = conn.execute("PRAGMA user_version").fetchone()[0]
+    for version, migration in MIGRATIONS:
+        if version <= current:
+            continue
+        with transaction(conn):
+            migration(conn)
+            conn.execute(f"PRAGMA user_version = {version}")
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def connect(path=None):
+    """Abre uma conexão nova já configurada (autocommit; escritas agrupadas com transaction())."""
+    conn = sqlite3.connect(
+        path or DB_PATH,
+        isolation_level=None,
+        cached_statements=STATEMENT_CACHE_SIZE,
+    )
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+
+_local = threading.local()
+_migrated = set()
+_migrate_lock = threading.Lock()
+
+
+def get_connection(path=None):
+    """
+    Conexão da thread atual (uma por thread e por arquivo), criada sob demanda.
+    A primeira conexão de cada arquivo no processo roda as migrações.
+    """
+    path = path or DB_PATH
+    conns = getattr(_local, 'conns', None)
+    if conns is None:
+        conns = _local.conns = {}
+    conn = conns.get(path)
+    if conn is None:
+        conn = conns[path] = connect(path)
+        if path not in _migrated:
+            with _migrate_lock:
+                if path not in _migrated:
+                    migrate(conn)
+                    _migrated.add(path)
+    return conn
+
+
+def close_connection(path=None):
+    """Fecha a conexão da thread atual, se houver."""
+    conns = getattr(_local, 'conns', {})
+    conn = conns.pop(path or DB_PATH, None)
+    if conn is not None:
+        conn.close()
+
+
+@contextmanager
+def transaction(conn=None):
+    """BEGIN IMMEDIATE ... COMMIT (ou ROLLBACK em caso de erro)."""
+    conn = conn or get_connection()
+    # espera pelo lock de escrita + corpo da transação + commit
+    timer = metrics.timed("db_seconds", op="transaction").start()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+    except BaseException:
+        conn.execute("ROLLBACK")
+        timer.stop()
+        raise
+    conn.execute("COMMIT")
+    timer.stop()
+
+
+@metrics.timed("db_seconds", op="execute")
+def execute(sql, params=()):
+    """Executa um statement (compilado uma vez e reaproveitado pela conexão da thread)."""
+    return get_connection().execute(sql, params)
+
+
+@metrics.timed("db_seconds", op="executemany")
+def executemany(sql, rows):
+    with transaction() as conn:
+        return conn.executemany(sql, rows)
+
+
+@metrics.timed("db_seconds", op="query")
+def query(sql, params=()):
+    return get_connection().execute(sql, params).fetchall()
+
+
+@metrics.timed("db_seconds", op="query_one")
+def query_one(sql, params=()):
+    return get_connection().execute(sql, params).fetchone()
@@ -0,0 +1,26 @@
+import os
+import sys
+
+import pytest
+
+# os módulos do app ficam na raiz do repositório (sem pacote)
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import storage  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def cpf_key(monkeypatch):
+    """O app exige KNOWYOURFAN_CPF_KEY; nos testes qualquer chave serve."""
+    monkeypatch.setenv("KNOWYOURFAN_CPF_KEY", "test-cpf-key")
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """Banco SQLite novo por teste (as migrações rodam na primeira conexão)."""
+    path = str(tmp_path / "test.db")
+    monkeypatch.setattr(storage, "DB_PATH", path)
+    yield path
+    storage.close_connection(path)
@@ -0,0 +1,152 @@
+import base64
+import io
+import json
+
+import pytest
+
+import batch_service
+import fan_dedup
+import storage
+from benchmarks.fixture_server import FixtureServer, player_page
+from seed_db import cpf_with_check_digits
+
+FANS = [("Ana Clara Souza", "01/02/1990"), ("Bruno Lima", "15/07/1985"), ("Carla Menezes", "30/11/2001")]
+
+
+def ocr_from_png_text(img_bytes):
+    """OCR falso do pool: o texto vem num chunk tEXt do PNG (o pHash é o de verdade)."""
+    from PIL import Image
+
+    return Image.open(io.BytesIO(img_bytes)).text["ocr"], fan_dedup.document_phash(img_bytes)
+
+
+def document(name, birth, seed):
+    import numpy as np
+    from PIL import Image
+    from PIL.PngImagePlugin import PngInfo
+
+    info = PngInfo()
+    info.add_text("ocr", f"REPUBLICA FEDERATIVA DO BRASIL\nNOME\n{name.upper()}\nNASCIMENTO\n{birth}")
+    pixels = np.random.default_rng(seed).integers(0, 255, (64, 96), dtype=np.uint8)
+    buf = io.BytesIO()
+    Image.fromarray(pixels).save(buf, "PNG", pnginfo=info)
+    return buf.getvalue()
+
+
+@pytest.fixture
+def pages(monkeypatch):
+    server = FixtureServer().start()
+    # os links mantêm os domínios reais e passam pelo servidor local como proxy
+    for var in ("HTTP_PROXY", "http_proxy"):
+        monkeypatch.setenv(var, server.url)
+    for var in ("NO_PROXY", "no_proxy"):
+        monkeypatch.setenv(var, "127.0.0.1,localhost")
+    monkeypatch.setenv("OPENAI_KEY", "unused")
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def submissions(tmp_path, pages):
+    """JSONL com um fã por linha; o título da página do link tem o nome do fã (as regras aceitam)."""
+    lines = []
+    for i, (name, birth) in enumerate(FANS):
+        slug = name.lower().replace(" ", "_")
+        link = f"http://www.hltv.org/player/{1000 + i}/{slug}"
+        pages.add(link, player_page("HLTV.org", name, filler_kb=1))
+        (tmp_path / f"doc{i}.png").write_bytes(document(name, birth, i))
+        lines.append({"id": f"p-{i}", "name": name, "birthdate": birth, "address": f"Rua Pixel, {i + 1}",
+                      "cpf": cpf_with_check_digits(123456780 + i), "interests": ["FURIA", "CS:GO"],
+                      "activities": "Watch party", "purchases": "Camiseta", "esports_link": link,
+                      "document": f"doc{i}.png"})
+    path = tmp_path / "parceiro.jsonl"
+    path.write_text("\n".join(json.dumps(line) for line in lines) + "\n")
+    return path
+
+
+@pytest.fixture
+def service(db, pages):
+    # depois de pages: o cliente httpx lê o proxy do ambiente ao ser criado
+    svc = batch_service.BatchService(ocr_workers=1, link_concurrency=4, ocr_fn=ocr_from_png_text)
+    yield svc
+    svc.close()
+
+
+def run(service, path, signup=True):
+    return service.run(batch_service.read_submissions(str(path)), "parceiro", signup=signup)
+
+
+def fans():
+    return storage.query_one("SELECT COUNT(*) FROM fans")[0]
+
+
+def test_signup_then_resume_skips_decided_items(service, submissions):
+    report = run(service, submissions)
+    assert report["status"] == {"saved": len(FANS)}
+    assert fans() == len(FANS)
+    again = run(service, submissions)
+    assert again["skipped"] == len(FANS)
+    assert again["items"] == 0
+    assert fans() == len(FANS)
+
+
+def test_dry_run_does_not_block_the_real_run(service, submissions):
+    dry = run(service, submissions, signup=False)
+    assert dry["status"] == {"valid": len(FANS)}
+    assert fans() == 0
+    real = run(service, submissions)
+    assert real["skipped"] == 0
+    assert real["status"] == {"saved": len(FANS)}
+    assert fans() == len(FANS)
+
+
+def test_resume_retries_only_errors(service, submissions, tmp_path):
+    missing = tmp_path / "doc1.png"
+    content = missing.read_bytes()
+    missing.unlink()
+    first = run(service, submissions)
+    assert first["status"] == {"saved": len(FANS) - 1, "error": 1}
+    missing.write_bytes(content)
+    second = run(service, submissions)
+    assert second["skipped"] == len(FANS) - 1
+    assert second["status"] == {"saved": 1}
+    assert batch_service.checkpoint_counts("parceiro") == {"saved": len(FANS)}
+
+
+def test_rejects_wrong_document_and_repeated_cpf(service, submissions, tmp_path):
+    records = [json.loads(line) for line in submissions.read_text().splitlines()]
+    # documento de outra pessoa e o mesmo CPF enviado duas vezes no lote
+    (tmp_path / "doc0.png").write_bytes(document("Outra Pessoa", records[0]["birthdate"], 99))
+    records.append(dict(records[2], id="p-repetido"))
+    submissions.write_text("\n".join(json.dumps(r) for r in records) + "\n")
+    report = run(service, submissions)
+    results = {r["key"]: r for r in report["results"]}
+    assert results["p-0"]["status"] == "rejected"
+    assert {results["p-2"]["status"], results["p-repetido"]["status"]} == {"saved", "duplicate"}
+    assert fans() == 2
+
+
+def test_inline_submissions_do_not_read_server_files(service, submissions, tmp_path):
+    # como chegam pela API: o caminho do documento não pode apontar para arquivos do servidor
+    records = [json.loads(line) for line in submissions.read_text().splitlines()]
+    records[0]["document"] = str(tmp_path / "doc0.png")
+    records[1]["document"] = "../" * 8 + "etc/passwd"
+    records[2] = dict(records[2], document=None,
+                      document_b64=base64.b64encode((tmp_path / "doc2.png").read_bytes()).decode())
+    report = service.run(batch_service.inline_submissions(records), "api")
+    results = {r["key"]: r for r in report["results"]}
+    assert results["p-0"]["status"] == results["p-1"]["status"] == "rejected"
+    assert "document_b64" in results["p-0"]["reason"]
+    assert results["p-2"]["status"] == "saved"
+
+
+def test_saved_items_survive_a_crash_before_the_checkpoint(service, submissions, monkeypatch):
+    # o processo cai antes de gravar o checkpoint acumulado (CHECKPOINT_EVERY)
+    with monkeypatch.context() as m:
+        m.setattr(batch_service.BatchRun, "checkpoint", lambda self: None)
+        first = run(service, submissions)
+    assert first["status"] == {"saved": len(FANS)}
+    assert batch_service.checkpoint_counts("parceiro") == {"saved": len(FANS)}
+    again = run(service, submissions)
+    assert again["skipped"] == len(FANS)
+    assert fans() == len(FANS)
@@ -0,0 +1,25 @@
+import pytest
+
+import fan_dedup
+from seed_db import cpf_with_check_digits
+
+
+def test_normalize_cpf_checks_the_verifier_digits():
+    assert fan_dedup.normalize_cpf("111.222.333-96") == "11122233396"
+    assert fan_dedup.normalize_cpf(cpf_with_check_digits(123456789)) == "12345678909"
+    assert fan_dedup.normalize_cpf("111.222.333-44") is None  # verificadores errados
+    assert fan_dedup.normalize_cpf("1234") is None
+    assert fan_dedup.normalize_cpf("123.456.789-091") is None
+    assert fan_dedup.normalize_cpf("000.000.000-00") is None
+    assert fan_dedup.normalize_cpf("") is None
+
+
+def test_cpf_hash_needs_the_key(monkeypatch):
+    digest = fan_dedup.cpf_hash("111.222.333-96")
+    assert digest == fan_dedup.cpf_hash("11122233396")
+    assert fan_dedup.cpf_hash("111.222.333-44") is None
+    monkeypatch.setenv(fan_dedup.CPF_KEY_ENV, "outra-chave")
+    assert fan_dedup.cpf_hash("111.222.333-96") != digest
+    monkeypatch.delenv(fan_dedup.CPF_KEY_ENV)
+    with pytest.raises(RuntimeError):
+        fan_dedup.cpf_hash("111.222.333-96")
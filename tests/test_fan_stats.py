@@ -0,0 +1,34 @@
+import fan_stats
+import storage
+
+
+def fan(name, created_at):
+    return (name, "Rua Pixel, 1", None, "FURIA", "", "", "", "", 1, None, created_at)
+
+
+def test_total_counts_fans_without_a_valid_signup_date(db):
+    storage.executemany(storage.INSERT_FAN, [
+        fan("Ana", "2025-01-01T10:00:00"),
+        fan("Bruno", "2025-01-01T11:00:00"),
+        fan("Carla", None),
+        fan("Diego", "ontem"),
+        fan("Eduarda", "2025-13-45"),
+    ])
+    fan_stats.refresh_aggregates()
+    assert fan_stats.total_fans() == storage.query_one("SELECT COUNT(*) FROM fans")[0] == 5
+    assert fan_stats.daily_signups() == [("2025-01-01", 2)]
+
+    storage.execute(storage.INSERT_FAN, fan("Felipe", ""))
+    fan_stats.refresh_aggregates()
+    assert fan_stats.total_fans() == 6
+
+
+def test_migration_backfills_the_total(db):
+    storage.executemany(storage.INSERT_FAN, [fan("Ana", "2025-01-01"), fan("Bruno", None)])
+    fan_stats.refresh_aggregates()
+    conn = storage.get_connection()
+    conn.execute("DELETE FROM agg_state WHERE name = ?", (fan_stats.TOTAL_KEY,))
+    conn.execute("INSERT INTO agg_daily_signups (day, fans) VALUES ('lixo', 1)")
+    storage._migration_14(conn)
+    assert fan_stats.total_fans() == 2
+    assert fan_stats.daily_signups() == [("2025-01-01", 1)]
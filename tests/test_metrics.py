@@ -0,0 +1,28 @@
+import threading
+import urllib.request
+
+import metrics
+import storage
+
+
+def test_collectors_run_on_one_thread_with_one_connection(db):
+    threads = set()
+
+    def collector():
+        threads.add(threading.current_thread())
+        return {"fans": storage.query_one("SELECT COUNT(*) FROM fans")[0]}
+
+    metrics.add_collector("test_fans", collector)
+    server = metrics.serve(port=0)
+    host, port = server.server_address[:2]
+    opener = urllib.request.build_opener(urllib.request.ProxyHandler({}))
+    try:
+        for _ in range(5):
+            body = opener.open(f"http://{host}:{port}/metrics", timeout=5).read().decode()
+            assert "knowyourfan_test_fans_fans 0.0" in body
+    finally:
+        server.shutdown()
+        server.server_close()
+        with metrics.REGISTRY._lock:
+            metrics.REGISTRY._collectors.pop("test_fans", None)
+    assert len(threads) == 1
@@ -0,0 +1,26 @@
+import os
+import sys
+import types
+
+from ocr_executor import OCRExecutor
+
+
+def test_workers_do_not_run_the_app_script(tmp_path, monkeypatch):
+    # como o Streamlit: o script vira __main__ com __file__ e sem __spec__
+    marker = tmp_path / "executado"
+    script = tmp_path / "app.py"
+    script.write_text(f"import os\nopen({str(marker)!r}, 'a').write(f'{{os.getpid()}}\\n')\n")
+    app_main = types.ModuleType("__main__")
+    app_main.__file__ = str(script)
+    app_main.__spec__ = None
+    monkeypatch.setitem(sys.modules, "__main__", app_main)
+
+    executor = OCRExecutor(max_workers=1, fn=os.getpid)
+    try:
+        worker_pid = executor.submit("pid").result(timeout=60)
+    finally:
+        executor.shutdown()
+
+    assert worker_pid != os.getpid()
+    assert not marker.exists()
+    assert sys.modules["__main__"] is app_main
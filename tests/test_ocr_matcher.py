@@ -0,0 +1,45 @@
+from ocr_matcher import iter_tokens, match_tokens
+
+PAGE = "REPUBLICA FEDERATIVA DO BRASIL\nNOME\n{name}\nFILIACAO\nCARLOS SOUZA\nMARIA SOUZA\nNASCIMENTO\n{birth}\nVALIDA EM TODO TERRITORIO NACIONAL"
+
+
+def match(text, name, birth):
+    return match_tokens(iter_tokens(text), name, birth)
+
+
+def test_accepts_name_and_birth():
+    result = match(PAGE.format(name="JOAO PEDRO SOUZA", birth="01/02/1990"), "João Pedro Souza", "01/02/1990")
+    assert result.matched
+    assert result.confidence == 1.0
+
+
+def test_tolerates_ocr_errors():
+    # O/0 trocados, uma letra errada, data com espaços
+    text = PAGE.format(name="J0AO PEDR0 SOUZE", birth="01 02 1990")
+    assert match(text, "João Pedro Souza", "01/02/1990").matched
+
+
+def test_accepts_words_glued_by_ocr():
+    assert match(PAGE.format(name="JOAOPEDRO SOUZA", birth="01/02/1990"), "João Pedro Souza", "01/02/1990").matched
+
+
+def test_rejects_name_built_from_parents():
+    # nomes dos pais (linhas da filiação) não podem passar pelo nome do titular
+    result = match(PAGE.format(name="JOAO PEDRO SOUZA", birth="01/02/1990"), "Carlos Maria", "01/02/1990")
+    assert not result.matched
+    assert result.name_score == 0.0
+
+
+def test_rejects_words_out_of_order_or_split_across_lines():
+    assert not match("NOME\nSOUZA JOAO\n01/02/1990", "João Souza", "01/02/1990").matched
+    assert not match("NOME\nJOAO\nSOUZA\n01/02/1990", "João Souza", "01/02/1990").matched
+
+
+def test_rejects_name_inside_longer_words():
+    assert not match("NOME\nANAMARIA SILVANA\n01/02/1990", "Ana Silva", "01/02/1990").matched
+
+
+def test_rejects_wrong_birth():
+    result = match(PAGE.format(name="JOAO PEDRO SOUZA", birth="02/01/1990"), "João Pedro Souza", "01/02/1990")
+    assert not result.matched
+    assert not result.birth_found
@@ -0,0 +1,32 @@
+import pytest
+
+import fan_stats
+import seed_db
+import storage
+
+
+def indexes():
+    return {name for name, in storage.query(
+        "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name IN ('fans', 'fan_interests')")}
+
+
+def test_bulk_load_keeps_indexes_and_aggregates(db):
+    before = indexes()
+    report = seed_db.bulk_load(seed_db.synthetic_fans(500, seed=1), chunk_size=100)
+    assert report["rows"] == 500
+    assert indexes() == before
+    assert "idx_fan_interests_fan" in before
+    assert fan_stats.total_fans() == 500
+
+
+def test_failed_load_rolls_back_with_indexes_in_place(db, monkeypatch):
+    before = indexes()
+
+    def crash(conn):
+        raise RuntimeError("processo morto nos agregados")
+
+    monkeypatch.setattr(fan_stats, "apply_new_fans", crash)
+    with pytest.raises(RuntimeError):
+        seed_db.bulk_load(seed_db.synthetic_fans(200, seed=2))
+    assert indexes() == before
+    assert storage.query_one("SELECT COUNT(*) FROM fans")[0] == 0
@@ -0,0 +1,82 @@
+import threading
+import time
+
+import pytest
+
+import storage
+from benchmarks.stubs import StubTooManyRequests, StubTwitterClient
+from tweet_cache import TimelineCache
+from tweet_prefetcher import TimelinePrefetcher
+
+
+@pytest.fixture
+def client():
+    return StubTwitterClient(latency=0.2)
+
+
+@pytest.fixture
+def prefetcher(db, client):
+    prefetcher = TimelinePrefetcher(TimelineCache(client), count=5)
+    yield prefetcher
+    prefetcher.stop()
+
+
+def expire():
+    """Faz o cache parecer velho, como se o TTL tivesse passado."""
+    storage.execute("UPDATE tweet_timelines SET refreshed_at = 0")
+
+
+def test_concurrent_sessions_share_one_refresh(prefetcher, client):
+    sessions = 20
+    barrier = threading.Barrier(sessions)
+    results = []
+
+    def session():
+        barrier.wait()
+        results.append(prefetcher.get("FURIA"))
+
+    threads = [threading.Thread(target=session) for _ in range(sessions)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    prefetcher.revalidate("FURIA").result()
+
+    # cache frio: ninguém espera a rede, e só um refresh vai para a API
+    assert results == [([], {})] * sessions
+    assert client.calls == {"get_user": 1, "get_users_tweets": 1}
+    assert prefetcher.stats()["refreshes"] == 1
+    assert prefetcher.stats()["deduplicated"] >= sessions - 1
+
+
+def test_stale_cache_is_served_while_revalidating(prefetcher, client):
+    prefetcher.revalidate("FURIA").result()
+    expire()
+
+    start = time.perf_counter()
+    tweets, users = prefetcher.get("FURIA")
+    elapsed = time.perf_counter() - start
+
+    assert len(tweets) == 5
+    assert {u.username for u in users.values()} == {"FURIA"}
+    assert elapsed < client.latency
+    assert prefetcher.stats()["stale_served"] == 1
+
+    prefetcher.revalidate("FURIA").result()
+    assert client.calls["get_users_tweets"] == 2
+    user_id = prefetcher.cache.cached_user_id("FURIA")
+    assert prefetcher.cache.is_fresh(user_id)
+
+
+def test_refresh_error_keeps_serving_stale_cache(prefetcher, client):
+    prefetcher.revalidate("FURIA").result()
+    expire()
+    client.fail_with = StubTooManyRequests()
+
+    tweets, _ = prefetcher.get("FURIA")
+    prefetcher.revalidate("FURIA").result()
+
+    assert len(tweets) == 5
+    assert isinstance(prefetcher.last_error, StubTooManyRequests)
+    assert prefetcher.stats()["errors"] == 1
+    assert len(prefetcher.get("FURIA")[0]) == 5
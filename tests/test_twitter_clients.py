@@ -0,0 +1,91 @@
+import time
+
+import pytest
+
+from benchmarks.fake_twitter import FakeTwitterServer, redirect_session
+from twitter_clients import RateLimited, TokenBucket, TwitterClientManager
+
+TIMELINE = "/2/users/:id/tweets"
+
+
+def headers(limit, remaining, reset_at):
+    return {"x-rate-limit-limit": str(limit), "x-rate-limit-remaining": str(remaining),
+            "x-rate-limit-reset": str(reset_at)}
+
+
+def test_bucket_passes_until_the_quota_is_known():
+    bucket = TokenBucket(reserve=1)
+    assert bucket.acquire() is None
+    bucket.update({"x-rate-limit-limit": "15"})  # cabeçalhos incompletos são ignorados
+    assert bucket.remaining is None
+    assert bucket.acquire() is None
+
+
+def test_bucket_rejects_at_the_reserve_until_the_window_resets():
+    now = time.time()
+    bucket = TokenBucket(reserve=1)
+    bucket.update(headers(15, 2, now + 60))
+
+    assert bucket.acquire(now) is None
+    assert bucket.remaining == 1
+    assert bucket.acquire(now) == now + 60
+    assert bucket.remaining == 1
+    assert bucket.acquire(now + 61) is None
+
+
+def test_bucket_exhaust_keeps_the_latest_reset():
+    now = time.time()
+    bucket = TokenBucket(reserve=0)
+    bucket.update(headers(15, 10, now + 60))
+    bucket.exhaust(now + 30)
+    assert bucket.acquire(now) == now + 60
+
+
+@pytest.fixture
+def server():
+    server = FakeTwitterServer(limit=3).start()
+    yield server
+    server.stop()
+
+
+def manager_for(server, reserve=1):
+    return TwitterClientManager(reserve=reserve, session_hook=redirect_session(server.url))
+
+
+def test_manager_rejects_locally_before_the_api_does(server):
+    manager = manager_for(server)
+    client = manager.client_v2("fake")
+
+    client.get_users_tweets(123, max_results=5)
+    client.get_users_tweets(123, max_results=5)
+    with pytest.raises(RateLimited) as exc:
+        client.get_users_tweets(123, max_results=5)
+
+    # a última chamada nem saiu: a cota restante (1) é a reserva
+    assert server.hits[TIMELINE] == 2
+    assert server.rejected[TIMELINE] == 0
+    assert exc.value.endpoint == TIMELINE
+    stats = manager.metrics()[TIMELINE]
+    assert (stats["calls"], stats["rejected"], stats["remaining"]) == (2, 1, 1)
+
+
+def test_manager_turns_429_into_rate_limited(server):
+    # outro processo gastou a cota da janela sem este manager saber
+    other = manager_for(server, reserve=0).client_v2("fake")
+    for _ in range(server.limit):
+        other.get_users_tweets(123, max_results=5)
+
+    manager = manager_for(server)
+    client = manager.client_v2("fake")
+    with pytest.raises(RateLimited) as exc:
+        client.get_users_tweets(123, max_results=5)
+    reset_at = server._windows[TIMELINE].reset_at
+    assert exc.value.reset_at == int(reset_at)
+    assert server.rejected[TIMELINE] == 1
+
+    # o 429 zerou a cota: a próxima chamada é recusada sem ir ao servidor
+    with pytest.raises(RateLimited):
+        client.get_users_tweets(123, max_results=5)
+    assert server.hits[TIMELINE] == server.limit + 1
+    stats = manager.metrics()[TIMELINE]
+    assert (stats["errors"], stats["rejected"], stats["remaining"]) == (1, 1, 0)
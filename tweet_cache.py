@@ -0,0 +1,161 @@
+import threading
+import time
+from datetime import datetime
+from types import SimpleNamespace
+
+import storage
+
+# Por quanto tempo (em segundos) a timeline em cache é considerada atual
+CACHE_TTL = 10 * 60
+# A resolução username -> id e os dados do autor mudam pouco
+USER_TTL = 24 * 60 * 60
+# Limites do endpoint get_users_tweets
+MIN_RESULTS, MAX_RESULTS = 5, 100
+
+USER_FIELDS = ["username", "name", "profile_image_url"]
+
+
+class TimelineCache:
+    """
+    Cache de timelines do Twitter no SQLite, por conta.
+    Num refresh busca só os tweets mais novos que o último em cache (since_id) e
+    guarda os autores (includes.users), então avatar e nome sobrevivem aos hits.
+    """
+
+    def __init__(self, client, ttl=CACHE_TTL, user_ttl=USER_TTL):
+        self.client = client
+        self.ttl = ttl
+        self.user_ttl = user_ttl
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "api_calls": 0, "user_hits": 0, "user_misses": 0, "new_tweets": 0}
+
+    def _count(self, key, n=1):
+        with self._lock:
+            self._stats[key] += n
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        total = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / total if total else 0.0
+        return stats
+
+    def _store_users(self, users, now):
+        rows = [(str(u.id), u.username, getattr(u, 'name', None), getattr(u, 'profile_image_url', None), now)
+                for u in users]
+        # se nome/avatar mudaram, os cards já renderizados desses autores ficam inválidos
+        storage.executemany(
+            "UPDATE tweets_cache SET card_html = NULL WHERE author_id = ? AND card_html IS NOT NULL "
+            "AND NOT EXISTS (SELECT 1 FROM twitter_users WHERE user_id = ? AND username IS ? "
+            "AND name IS ? AND profile_image_url IS ?)",
+            [(uid, uid, username, name, avatar) for uid, username, name, avatar, _ in rows]
+        )
+        storage.executemany(
+            "INSERT INTO twitter_users (user_id, username, name, profile_image_url, fetched_at) VALUES (?,?,?,?,?) "
+            "ON CONFLICT(user_id) DO UPDATE SET username = excluded.username, name = excluded.name, "
+            "profile_image_url = excluded.profile_image_url, fetched_at = excluded.fetched_at",
+            rows
+        )
+
+    def cached_user_id(self, username):
+        """:return: id da conta se já resolvido antes (sem chamar a API), senão None"""
+        row = storage.query_one("SELECT user_id FROM twitter_users WHERE username = ? COLLATE NOCASE", (username,))
+        return row[0] if row else None
+
+    def resolve_user(self, username):
+        """:return: id (texto) da conta, consultando a API só se não estiver em cache"""
+        now = int(time.time())
+        row = storage.query_one(
+            "SELECT user_id FROM twitter_users WHERE username = ? COLLATE NOCASE AND fetched_at > ?",
+            (username, now - self.user_ttl)
+        )
+        if row:
+            self._count("user_hits")
+            return row[0]
+        self._count("user_misses")
+        self._count("api_calls")
+        resp = self.client.get_user(username=username, user_fields=USER_FIELDS)
+        self._store_users([resp.data], now)
+        return str(resp.data.id)
+
+    def refresh(self, username, count=5):
+        """Força um refresh incremental da conta (usado pelo prefetcher em segundo plano)."""
+        now = int(time.time())
+        self._refresh(self.resolve_user(username), count, now)
+
+    def _refresh(self, user_id, count, now):
+        state = storage.query_one("SELECT newest_id FROM tweet_timelines WHERE user_id = ?", (user_id,))
+        cached = storage.query_one("SELECT COUNT(*) FROM tweets_cache WHERE author_id = ?", (user_id,))[0]
+        params = dict(
+            id=user_id,
+            max_results=min(MAX_RESULTS, max(MIN_RESULTS, count)),
+            tweet_fields=["created_at", "text", "author_id"],
+            expansions=["author_id"],
+            user_fields=USER_FIELDS,
+        )
+        # só pede o que é novo se o cache já tem tweets suficientes desta conta
+        if state and state[0] and cached >= count:
+            params["since_id"] = state[0]
+        self._count("api_calls")
+        resp = self.client.get_users_tweets(**params)
+        tweets = resp.data or []
+        if resp.includes and "users" in resp.includes:
+            self._store_users(resp.includes["users"], now)
+        storage.executemany(
+            storage.INSERT_TWEET,
+            [(str(t.id), str(t.author_id), t.text, t.created_at.isoformat(), now) for t in tweets]
+        )
+        self._count("new_tweets", len(tweets))
+        newest = str(max(tweets, key=lambda t: t.created_at).id) if tweets else (state[0] if state else None)
+        storage.execute(
+            "INSERT INTO tweet_timelines (user_id, newest_id, refreshed_at) VALUES (?,?,?) "
+            "ON CONFLICT(user_id) DO UPDATE SET newest_id = excluded.newest_id, refreshed_at = excluded.refreshed_at",
+            (user_id, newest, now)
+        )
+
+    def is_fresh(self, user_id, now=None):
+        now = now or int(time.time())
+        row = storage.query_one("SELECT refreshed_at FROM tweet_timelines WHERE user_id = ?", (user_id,))
+        return bool(row) and row[0] > now - self.ttl
+
+    def read(self, user_id, count):
+        """
+        Lê a timeline só do cache.
+        :return: (tweets, users) no formato que a sidebar usa
+        """
+        rows = storage.query(
+            "SELECT tweet_id, author_id, text, created_at, card_html, card_version FROM tweets_cache "
+            "WHERE author_id = ? ORDER BY created_at DESC LIMIT ?",
+            (user_id, count)
+        )
+        tweets = [
+            SimpleNamespace(id=tid, author_id=aid, text=txt, created_at=datetime.fromisoformat(c_at),
+                            card_html=html, card_version=version)
+            for tid, aid, txt, c_at, html, version in rows
+        ]
+        author_ids = {t.author_id for t in tweets}
+        users = {}
+        if author_ids:
+            for uid, username, name, avatar in storage.query(
+                f"SELECT user_id, username, name, profile_image_url FROM twitter_users "
+                f"WHERE user_id IN ({','.join('?' * len(author_ids))})",
+                tuple(author_ids)
+            ):
+                users[uid] = SimpleNamespace(id=uid, username=username, name=name, profile_image_url=avatar)
+        return tweets, users
+
+    def get_timeline(self, username, count=5):
+        """
+        Últimos tweets da conta, do cache se estiver atual ou após um refresh incremental.
+        :return: (tweets, users) com users = {author_id: autor}
+        """
+        now = int(time.time())
+        user_id = self.resolve_user(username)
+        if self.is_fresh(user_id, now):
+            tweets, users = self.read(user_id, count)
+            if len(tweets) >= count:
+                self._count("hits")
+                return tweets, users
+        self._count("misses")
+        self._refresh(user_id, count, now)
+        return self.read(user_id, count)
@@ -0,0 +1,114 @@
+import threading
+from collections import OrderedDict
+from html import escape
+
+import storage
+
+# Mudou o template? Incremente para invalidar os cards gravados no tweets_cache
+CARD_VERSION = 1
+# Cards mantidos em memória (por tweet e dados do autor)
+MAX_CARDS = 1024
+
+# Template único do card; os campos já chegam escapados
+CARD_TEMPLATE = (
+    '<div class="tweet-card"><div class="tweet-header">{avatar}'
+    '<span class="tweet-user">{name}</span>'
+    '<span class="tweet-handle">{handle}</span>'
+    '<span class="tweet-time">{time}</span></div>'
+    '<div class="tweet-text">{text}</div></div>'
+).format
+AVATAR_TEMPLATE = '<img src="{}" class="tweet-avatar"/>'.format
+
+
+def _author(tweet, users):
+    """(nome, @handle, avatar) do autor, vindo do mapa de users (API/cache) ou do próprio tweet (snscrape)."""
+    user = users.get(getattr(tweet, 'author_id', None)) if users else None
+    if user is not None:
+        return (getattr(user, 'name', None) or '', getattr(user, 'username', None) or '',
+                getattr(user, 'profile_image_url', None))
+    user = getattr(tweet, 'user', None)
+    if user is not None:
+        return (getattr(user, 'displayname', None) or '', getattr(user, 'username', None) or '',
+                getattr(user, 'profileImageUrl', None))
+    return '', '', None
+
+
+def render_card(tweet, author):
+    """HTML de um card, com todo texto vindo do Twitter escapado."""
+    name, username, avatar = author
+    created = getattr(tweet, 'created_at', None) or getattr(tweet, 'date', None)
+    text = getattr(tweet, 'text', None) or getattr(tweet, 'content', '') or ''
+    # só aceita avatar http(s); nada de javascript: ou data: no src
+    avatar_html = AVATAR_TEMPLATE(escape(avatar)) if avatar and avatar.startswith(('https://', 'http://')) else ''
+    return CARD_TEMPLATE(
+        avatar=avatar_html,
+        name=escape(name),
+        handle=escape('@' + username) if username else '',
+        time=created.strftime("%d/%m/%Y %H:%M") if created else '',
+        # sem linhas em branco: o markdown do Streamlit não quebra o bloco HTML
+        text=escape(text).replace("\n", "<br>"),
+    )
+
+
+class TweetCardRenderer:
+    """
+    Renderiza os cards da sidebar uma vez por tweet: memoiza em memória (LRU) e grava
+    o HTML no tweets_cache, então outras sessões e processos também reaproveitam.
+    """
+
+    def __init__(self, max_cards=MAX_CARDS):
+        self.max_cards = max_cards
+        self._cards = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"memory_hits": 0, "db_hits": 0, "rendered": 0}
+
+    def _remember(self, key, html):
+        with self._lock:
+            self._cards[key] = html
+            self._cards.move_to_end(key)
+            while len(self._cards) > self.max_cards:
+                self._cards.popitem(last=False)
+
+    def card(self, tweet, users=None):
+        """
+        :return: (html, persistir) — persistir=True se o card acabou de ser renderizado
+        """
+        author = _author(tweet, users)
+        key = (str(getattr(tweet, 'id', '')), author)
+        with self._lock:
+            html = self._cards.get(key)
+            if html is not None:
+                self._cards.move_to_end(key)
+                self._stats["memory_hits"] += 1
+                return html, False
+        html = getattr(tweet, 'card_html', None)
+        if html is not None and getattr(tweet, 'card_version', None) == CARD_VERSION:
+            with self._lock:
+                self._stats["db_hits"] += 1
+            self._remember(key, html)
+            return html, False
+        html = render_card(tweet, author)
+        with self._lock:
+            self._stats["rendered"] += 1
+        self._remember(key, html)
+        return html, True
+
+    def render(self, tweets, users=None):
+        """HTML da lista inteira (um único st.markdown) e grava os cards novos no tweets_cache."""
+        parts = []
+        fresh = []
+        for tweet in tweets:
+            html, new = self.card(tweet, users)
+            parts.append(html)
+            # só tweets que vieram do cache têm linha no tweets_cache (snscrape não)
+            if new and hasattr(tweet, 'card_html'):
+                fresh.append((html, CARD_VERSION, str(tweet.id)))
+        if fresh:
+            storage.executemany("UPDATE tweets_cache SET card_html = ?, card_version = ? WHERE tweet_id = ?", fresh)
+        return "".join(parts)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["cards_in_memory"] = len(self._cards)
+        return stats
@@ -0,0 +1,109 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from tweet_cache import CACHE_TTL
+
+# Intervalo entre refreshes agendados: antes do TTL vencer, para o cache nunca esfriar
+DEFAULT_INTERVAL = CACHE_TTL * 0.8
+# Variação aleatória do intervalo (±), para vários processos não baterem juntos na API
+DEFAULT_JITTER = 0.2
+# Espera extra depois de um erro (ex.: TooManyRequests), dobrando até o máximo
+ERROR_BACKOFF = 60
+MAX_BACKOFF = 15 * 60
+
+
+class TimelinePrefetcher:
+    """
+    Mantém as timelines quentes no tweets_cache a partir de uma thread de fundo,
+    compartilhada por todas as sessões. As páginas só leem o cache:
+    se estiver velho, devolvem o que há (stale-while-revalidate) e pedem um refresh,
+    que é deduplicado (single-flight) entre sessões concorrentes.
+    """
+
+    def __init__(self, cache, accounts=("FURIA",), count=5, interval=DEFAULT_INTERVAL, jitter=DEFAULT_JITTER):
+        self.cache = cache
+        self.accounts = list(accounts)
+        self.count = count
+        self.interval = interval
+        self.jitter = jitter
+        self.last_error = None
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="tweet-refresh")
+        self._stats = {"refreshes": 0, "deduplicated": 0, "stale_served": 0, "errors": 0}
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="tweet-prefetcher", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def _run(self):
+        backoff = 0
+        while not self._stop.is_set():
+            for username in self.accounts:
+                self.revalidate(username, self.count).result()
+            if self.last_error is not None:
+                backoff = min(MAX_BACKOFF, backoff * 2 or ERROR_BACKOFF)
+            else:
+                backoff = 0
+            delay = self.interval * random.uniform(1 - self.jitter, 1 + self.jitter) + backoff
+            self._stop.wait(delay)
+
+    def _do_refresh(self, username, count):
+        try:
+            self.cache.refresh(username, count)
+            self.last_error = None
+            with self._lock:
+                self._stats["refreshes"] += 1
+        except Exception as e:
+            self.last_error = e
+            with self._lock:
+                self._stats["errors"] += 1
+
+    def revalidate(self, username, count=None):
+        """
+        Pede um refresh da conta. Se já existe um em andamento, reaproveita (single-flight).
+        :return: Future do refresh
+        """
+        count = count or self.count
+        key = username.lower()
+        with self._lock:
+            fut = self._inflight.get(key)
+            if fut is not None and not fut.done():
+                self._stats["deduplicated"] += 1
+                return fut
+            fut = self._pool.submit(self._do_refresh, username, count)
+            self._inflight[key] = fut
+            return fut
+
+    def get(self, username, count=None):
+        """
+        Lê a timeline do cache sem esperar a rede.
+        :return: (tweets, users); vazio se a conta ainda não foi buscada
+        """
+        count = count or self.count
+        user_id = self.cache.cached_user_id(username)
+        if user_id is None:
+            self.revalidate(username, count)
+            return [], {}
+        if not self.cache.is_fresh(user_id):
+            with self._lock:
+                self._stats["stale_served"] += 1
+            self.revalidate(username, count)
+        return self.cache.read(user_id, count)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats["inflight"] = sum(1 for f in self._inflight.values() if not f.done())
+        stats["last_error"] = repr(self.last_error) if self.last_error else None
+        return stats
@@ -0,0 +1,228 @@
+import re
+import sys
+import threading
+import time
+from urllib.parse import urlparse
+
+import metrics
+
+# Quantas requisições deixamos de reserva por janela antes de recusar localmente
+DEFAULT_RESERVE = 1
+
+# Nome do endpoint (como aparece nas métricas) para cada método do tweepy usado no app
+METHOD_ENDPOINTS = {
+    "get_user": "/2/users/by/username/:username",
+    "get_users_tweets": "/2/users/:id/tweets",
+    "user_timeline": "/1.1/statuses/user_timeline.json",
+}
+_BY_USERNAME = re.compile(r"/by/username/[^/]+")
+
+
+class RateLimited(Exception):
+    """A cota do endpoint acabou (ou está na reserva); tente outro caminho até reset_at."""
+
+    def __init__(self, endpoint, reset_at):
+        self.endpoint = endpoint
+        self.reset_at = reset_at
+        wait = max(0, int(reset_at - time.time()))
+        super().__init__(f"cota de {endpoint} esgotada, libera em {wait}s")
+
+
+def endpoint_key(url):
+    """URL de resposta -> nome do endpoint, sem ids (ex.: /2/users/:id/tweets)."""
+    path = _BY_USERNAME.sub("/by/username/:username", urlparse(url).path)
+    # o primeiro segmento é a versão da API (/2, /1.1); ids numéricos vêm depois
+    version, _, rest = path.lstrip("/").partition("/")
+    rest = "/".join(":id" if part.isdigit() else part for part in rest.split("/"))
+    return f"/{version}/{rest}"
+
+
+class TokenBucket:
+    """
+    Cota de um endpoint numa janela da API do Twitter. O estado vem dos cabeçalhos
+    x-rate-limit-* de cada resposta; entre respostas, cada chamada consome um token.
+    """
+
+    def __init__(self, reserve=DEFAULT_RESERVE):
+        self.reserve = reserve
+        self.limit = None
+        self.remaining = None
+        self.reset_at = 0.0
+        self._lock = threading.Lock()
+
+    def update(self, headers):
+        try:
+            limit = int(headers["x-rate-limit-limit"])
+            remaining = int(headers["x-rate-limit-remaining"])
+            reset_at = float(headers["x-rate-limit-reset"])
+        except (KeyError, TypeError, ValueError):
+            return
+        with self._lock:
+            self.limit, self.remaining, self.reset_at = limit, remaining, reset_at
+
+    def exhaust(self, reset_at):
+        with self._lock:
+            self.remaining = 0
+            self.reset_at = max(self.reset_at, reset_at)
+
+    def acquire(self, now=None):
+        """
+        Reserva uma requisição.
+        :return: None se pode chamar, ou o instante em que a cota volta
+        """
+        now = now or time.time()
+        with self._lock:
+            if self.remaining is None or now >= self.reset_at:
+                # ainda não conhecemos a cota, ou a janela virou: deixa passar
+                return None
+            if self.remaining <= self.reserve:
+                return self.reset_at
+            self.remaining -= 1
+            return None
+
+    def snapshot(self, now=None):
+        now = now or time.time()
+        with self._lock:
+            return {"limit": self.limit, "remaining": self.remaining,
+                    "reset_in": max(0.0, self.reset_at - now) if self.reset_at else None}
+
+
+class _Guarded:
+    """Proxy de um cliente tweepy: cada método passa pelo controle de cota do manager."""
+
+    def __init__(self, manager, client):
+        self._manager = manager
+        self._client = client
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if not callable(attr) or name not in METHOD_ENDPOINTS:
+            return attr
+
+        def call(*args, **kwargs):
+            return self._manager.call(METHOD_ENDPOINTS[name], attr, *args, **kwargs)
+        return call
+
+
+class TwitterClientManager:
+    """
+    Guarda clientes autenticados (e suas sessões HTTP) por credencial, acompanha a
+    cota de cada endpoint pelos cabeçalhos das respostas e falha rápido com
+    RateLimited antes de a API bloquear, em vez de dormir a thread da sessão.
+    """
+
+    def __init__(self, reserve=DEFAULT_RESERVE, session_hook=None):
+        """
+        :param session_hook: função chamada com a requests.Session de cada cliente novo
+            (ex.: montar um adapter que aponta para um servidor falso nos benchmarks)
+        """
+        self.reserve = reserve
+        self.session_hook = session_hook
+        self._clients = {}
+        self._buckets = {}
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def _bucket(self, endpoint):
+        with self._lock:
+            bucket = self._buckets.get(endpoint)
+            if bucket is None:
+                bucket = self._buckets[endpoint] = TokenBucket(self.reserve)
+                self._stats[endpoint] = {"calls": 0, "errors": 0, "rejected": 0,
+                                         "latency_total": 0.0, "latency_max": 0.0}
+            return bucket
+
+    def _on_response(self, response, *args, **kwargs):
+        # hook do requests: roda para toda resposta, inclusive 429
+        bucket = self._bucket(endpoint_key(response.url))
+        bucket.update(response.headers)
+        if response.status_code == 429:
+            bucket.exhaust(float(response.headers.get("x-rate-limit-reset", time.time() + 60)))
+
+    def _track(self, client):
+        session = client.session
+        session.hooks.setdefault("response", []).append(self._on_response)
+        if self.session_hook:
+            self.session_hook(session)
+        return client
+
+    def client_v2(self, bearer_token):
+        """tweepy.Client (API v2, app-only) reaproveitado entre chamadas e sessões."""
+        key = ("v2", bearer_token)
+        with self._lock:
+            client = self._clients.get(key)
+        if client is None:
+            import tweepy
+            client = self._track(tweepy.Client(bearer_token=bearer_token, wait_on_rate_limit=False))
+            with self._lock:
+                client = self._clients.setdefault(key, client)
+        return _Guarded(self, client)
+
+    def api_v1(self, api_key, api_secret, token, token_secret):
+        """tweepy.API (v1.1, contexto do usuário) reaproveitado entre chamadas e sessões."""
+        key = ("v1", api_key, api_secret, token, token_secret)
+        with self._lock:
+            api = self._clients.get(key)
+        if api is None:
+            import tweepy
+            auth = tweepy.OAuth1UserHandler(api_key, api_secret, token, token_secret)
+            api = self._track(tweepy.API(auth, wait_on_rate_limit=False))
+            with self._lock:
+                api = self._clients.setdefault(key, api)
+        return _Guarded(self, api)
+
+    def call(self, endpoint, fn, *args, **kwargs):
+        """
+        Executa fn respeitando a cota do endpoint.
+        :raises RateLimited: se a cota conhecida já está na reserva ou a API respondeu 429
+        """
+        bucket = self._bucket(endpoint)
+        stats = self._stats[endpoint]
+        reset_at = bucket.acquire()
+        if reset_at is not None:
+            with self._lock:
+                stats["rejected"] += 1
+            raise RateLimited(endpoint, reset_at)
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        except Exception as e:
+            with self._lock:
+                stats["errors"] += 1
+            # a exceção veio de um cliente do tweepy, então o módulo já está carregado
+            tweepy = sys.modules.get("tweepy")
+            if tweepy is not None and isinstance(e, tweepy.TooManyRequests):
+                raise RateLimited(endpoint, bucket.reset_at or time.time() + 60) from e
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            metrics.observe("http_request_seconds", elapsed, service="twitter", endpoint=endpoint)
+            with self._lock:
+                stats["calls"] += 1
+                stats["latency_total"] += elapsed
+                stats["latency_max"] = max(stats["latency_max"], elapsed)
+
+    def metrics(self):
+        """Cota restante e latência por endpoint."""
+        now = time.time()
+        with self._lock:
+            items = [(e, dict(s), self._buckets[e]) for e, s in self._stats.items()]
+        out = {}
+        for endpoint, stats, bucket in items:
+            stats.update(bucket.snapshot(now))
+            stats["latency_avg"] = stats["latency_total"] / stats["calls"] if stats["calls"] else 0.0
+            out[endpoint] = stats
+        return out
+
+
+_default_manager = None
+_default_lock = threading.Lock()
+
+
+def get_manager():
+    """Manager compartilhado pelo processo."""
+    global _default_manager
+    with _default_lock:
+        if _default_manager is None:
+            _default_manager = TwitterClientManager()
+        return _default_manager
@@ -0,0 +1,230 @@
+import asyncio
+import threading
+import time
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+from enhancements import (
+    LINK_MODEL,
+    fetch_user_furia_interactions,
+    is_relevant_answer,
+    link_relevance_messages,
+)
+import metrics
+from link_cache import conditional_headers, content_hash, verdict_key
+from page_extract import CHUNK_BYTES, aextract_from_chunks, charset
+from twitter_clients import RateLimited
+
+# Tempo máximo de cada requisição HTTP (conexão + leitura)
+DEFAULT_TIMEOUT = 5.0
+# Prazo total de cada tipo de job, somando todas as chamadas que ele faz
+DEADLINES = {"logo": 3.0, "link": 20.0, "timeline": 15.0}
+# Pool de conexões compartilhado por todas as sessões
+MAX_CONNECTIONS = 20
+MAX_KEEPALIVE = 10
+# Quantos resultados já concluídos mantemos para consulta por rerun
+MAX_FINISHED_JOBS = 256
+
+
+class WizardIO:
+    """
+    Loop asyncio numa thread própria que faz o I/O de rede do wizard (logo, timeline,
+    scrape do link e checagem no LLM) em paralelo, com um único pool httpx.
+    Os jobs são identificados por chave, como no OCRExecutor: a sessão inicia o job
+    assim que conhece os dados (on_change) e consulta o resultado a cada rerun.
+    """
+
+    def __init__(self, timeout=DEFAULT_TIMEOUT, max_connections=MAX_CONNECTIONS, link_cache=None,
+                 pre_classifier=None):
+        """
+        :param link_cache: LinkCache opcional para páginas e vereditos da checagem de links
+        :param pre_classifier: LinkPreClassifier opcional, consultado antes do LLM
+        """
+        self.timeout = timeout
+        self.link_cache = link_cache
+        self.pre_classifier = pre_classifier
+        self.max_connections = max_connections
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="wizard-io", daemon=True)
+        self._thread.start()
+        # o cliente é criado dentro do loop que vai usá-lo
+        self._http = self._run(self._make_client()).result()
+        self._llm = {}
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    async def _make_client(self):
+        return httpx.AsyncClient(
+            timeout=self.timeout,
+            limits=httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=MAX_KEEPALIVE),
+            follow_redirects=True,
+            headers={"User-Agent": "KnowYourFan/1.0"},
+        )
+
+    def _run(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    def submit(self, key, fn, *args, deadline=None):
+        """
+        Inicia fn(*args) no loop, se ainda não existe um job com a mesma chave.
+        :param fn: função async
+        :param deadline: prazo total em segundos (asyncio.TimeoutError ao estourar)
+        :return: concurrent.futures.Future do job
+        """
+        with self._lock:
+            fut = self._jobs.get(key)
+            if fut is not None:
+                return fut
+            coro = fn(*args)
+            if deadline:
+                coro = asyncio.wait_for(coro, deadline)
+            fut = self._jobs[key] = self._run(coro)
+            # duração do job inteiro (ex.: link = título + LLM), por tipo ('logo', 'link', 'timeline')
+            submitted = time.perf_counter()
+            fut.add_done_callback(lambda f: metrics.observe(
+                "operation_seconds", time.perf_counter() - submitted, op=f"wizard_io_{key[0]}"))
+            self._prune()
+            return fut
+
+    def _prune(self):
+        # descarta os resultados concluídos mais antigos (dict mantém ordem de inserção)
+        finished = [k for k, f in self._jobs.items() if f.done()]
+        for k in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self._jobs[k]
+
+    def poll(self, key):
+        """
+        Consulta o estado de um job sem bloquear.
+        :return: ('missing', None), ('pending', None), ('done', resultado) ou ('error', exceção)
+        """
+        with self._lock:
+            fut = self._jobs.get(key)
+        if fut is None:
+            return 'missing', None
+        if not fut.done():
+            return 'pending', None
+        exc = fut.exception()
+        if exc is not None:
+            return 'error', exc
+        return 'done', fut.result()
+
+    def forget(self, key):
+        """Remove o job do registro (o resultado já foi consumido pela sessão)."""
+        with self._lock:
+            fut = self._jobs.pop(key, None)
+        if fut is not None:
+            fut.cancel()
+
+    def pending(self):
+        with self._lock:
+            return sum(1 for f in self._jobs.values() if not f.done())
+
+    def _llm_client(self, api_key):
+        # um AsyncOpenAI por chave, todos sobre o mesmo pool httpx
+        client = self._llm.get(api_key)
+        if client is None:
+            import openai  # pesado (~0,5 s): só quando algum link chega ao LLM
+            client = self._llm[api_key] = openai.AsyncOpenAI(api_key=api_key, http_client=self._http)
+        return client
+
+    # --- jobs ---
+
+    async def fetch_bytes(self, url):
+        resp = await self._http.get(url)
+        resp.raise_for_status()
+        return resp.content
+
+    async def page_title(self, url):
+        """Título da página, via cache (GET condicional quando vencido) ou download."""
+        cache = self.link_cache
+        # SQLite sai do loop (asyncio.to_thread) para não atrasar os outros jobs
+        page = await asyncio.to_thread(cache.get_page, url) if cache else None
+        if page is not None and page.fresh:
+            return page.title
+        # a resposta é lida em blocos e o download para assim que o título aparece
+        # (cada bloco é pequeno: o parse incremental roda no próprio loop)
+        with metrics.timed("http_request_seconds", service="link_page"):
+            async with self._http.stream("GET", url, headers=conditional_headers(page)) as resp:
+                if resp.status_code == 304 and page is not None:
+                    await asyncio.to_thread(cache.revalidated, page)
+                    return page.title
+                resp.raise_for_status()
+                extractor = await aextract_from_chunks(resp.aiter_bytes(CHUNK_BYTES),
+                                                       charset(resp.headers.get("content-type")))
+        content = extractor.content()
+        if cache:
+            await asyncio.to_thread(cache.put_page, url, content,
+                                    resp.headers.get("etag"), resp.headers.get("last-modified"))
+        return content
+
+    async def check_link(self, api_key, url, user_profile_summary):
+        """Scrape do título + pergunta ao LLM; mesmo resultado de enhancements.validate_esports_link."""
+        cache = self.link_cache
+        rules = self.pre_classifier
+        if rules:
+            url_decision = rules.by_url(url, user_profile_summary)
+            if url_decision.verdict is False:
+                return False
+        content = await self.page_title(url)
+        if rules:
+            decision = rules.by_title(content, user_profile_summary, url_decision)
+            if decision.verdict is not None:
+                return decision.verdict
+            rules.escalated()
+        if cache:
+            key = verdict_key(url, content_hash(content), user_profile_summary, LINK_MODEL)
+            relevant = await asyncio.to_thread(cache.get_verdict, key)
+            if relevant is not None:
+                return relevant
+        with metrics.timed("http_request_seconds", service="openai"):
+            completion = await self._llm_client(api_key).chat.completions.create(
+                model=LINK_MODEL,
+                messages=link_relevance_messages(content, user_profile_summary),
+                temperature=0,
+            )
+        relevant = is_relevant_answer(completion)
+        if cache:
+            await asyncio.to_thread(cache.put_verdict, key, url, relevant)
+        return relevant
+
+    async def user_timeline(self, credentials, username, max_tweets, fallback=None):
+        """
+        Menções à FURIA na timeline do usuário (tweepy é síncrono: roda numa thread).
+        :param credentials: (api_key, api_secret, token, token_secret)
+        :param fallback: função (username, count) usada se a API recusar (cota ou 403)
+        :return: (tweets, 'api' ou 'snscrape')
+        """
+        try:
+            tweets = await asyncio.to_thread(fetch_user_furia_interactions, *credentials, username, max_tweets)
+            return tweets, 'api'
+        except Exception as e:
+            blocked = isinstance(e, RateLimited) or "403" in str(e) or "Forbidden" in str(e)
+            if fallback is None or not blocked:
+                raise
+        return await asyncio.to_thread(fallback, username, max_tweets), 'snscrape'
+
+    # --- atalhos usados pelo wizard (devolvem a chave para poll/forget) ---
+
+    def start_logo(self, url):
+        key = ("logo", url)
+        self.submit(key, self.fetch_bytes, url, deadline=DEADLINES["logo"])
+        return key
+
+    def start_link_check(self, api_key, url, user_profile_summary):
+        key = ("link", url, user_profile_summary)
+        self.submit(key, self.check_link, api_key, url, user_profile_summary, deadline=DEADLINES["link"])
+        return key
+
+    def start_timeline(self, credentials, username, max_tweets=50, fallback=None):
+        key = ("timeline", username.lower(), max_tweets)
+        self.submit(key, self.user_timeline, credentials, username, max_tweets, fallback,
+                    deadline=DEADLINES["timeline"])
+        return key
+
+    def close(self):
+        self._run(self._http.aclose()).result(timeout=5)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
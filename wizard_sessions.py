@@ -0,0 +1,96 @@
+import json
+import secrets
+import threading
+import time
+
+import storage
+
+# Cadastro parado há mais tempo que isso não é mais retomado (o link ?s= vaza em
+# histórico e capturas de tela: quanto menos tempo vale, menos expõe)
+DEFAULT_SESSION_TTL = 24 * 60 * 60
+# Só apaga as sessões vencidas a cada tantos checkpoints
+PURGE_EVERY = 100
+
+
+def new_token():
+    """Token opaco e imprevisível (vai na URL: ?s=<token>)."""
+    return secrets.token_urlsafe(16)
+
+
+class WizardSessionStore:
+    """
+    Progresso do wizard guardado no servidor (SQLite): o passo atual, os campos que o
+    app escolhe salvar e os resultados do OCR e do link, sob um token. Quem tem o token
+    retoma a sessão, então dados pessoais (nome, CPF...) não devem ir no checkpoint.
+    Se o websocket cair ou o processo reiniciar, o fã volta pelo mesmo link e
+    continua do último passo sem refazer OCR/LLM; como nada fica na memória do
+    processo, qualquer réplica atrás do balanceador atende a sessão.
+    """
+
+    def __init__(self, ttl=DEFAULT_SESSION_TTL):
+        # a tabela wizard_sessions é criada pelas migrações do storage
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._checkpoints = 0
+        self._stats = {"created": 0, "resumed": 0, "expired": 0, "checkpoints": 0, "finished": 0}
+
+    def _count(self, key):
+        with self._lock:
+            self._stats[key] += 1
+
+    def create(self):
+        self._count("created")
+        return new_token()
+
+    def load(self, token):
+        """
+        :return: (passo, {campo: valor}) ou None se o token não existe ou venceu
+        """
+        if not token:
+            return None
+        row = storage.query_one(
+            "SELECT step, data, updated_at FROM wizard_sessions WHERE token = ?", (token,)
+        )
+        if row is None:
+            return None
+        step, data, updated_at = row
+        if updated_at <= time.time() - self.ttl:
+            self._count("expired")
+            storage.execute("DELETE FROM wizard_sessions WHERE token = ?", (token,))
+            return None
+        self._count("resumed")
+        return step, json.loads(data)
+
+    def checkpoint(self, token, step, fields):
+        """
+        Grava o passo e mescla os campos com os já salvos (campo ausente mantém o valor antigo).
+        :param fields: dict serializável em JSON
+        """
+        now = int(time.time())
+        with self._lock:
+            self._checkpoints += 1
+            purge = self._checkpoints % PURGE_EVERY == 0
+            self._stats["checkpoints"] += 1
+        with storage.transaction() as conn:
+            row = conn.execute("SELECT data FROM wizard_sessions WHERE token = ?", (token,)).fetchone()
+            data = json.loads(row[0]) if row else {}
+            data.update(fields)
+            conn.execute(
+                "INSERT INTO wizard_sessions (token, step, data, created_at, updated_at) VALUES (?,?,?,?,?) "
+                "ON CONFLICT(token) DO UPDATE SET step = excluded.step, data = excluded.data, "
+                "updated_at = excluded.updated_at",
+                (token, step, json.dumps(data, ensure_ascii=False), now, now)
+            )
+            if purge:
+                conn.execute("DELETE FROM wizard_sessions WHERE updated_at <= ?", (now - self.ttl,))
+
+    def finish(self, token):
+        """Cadastro gravado: a sessão não serve mais para retomar."""
+        self._count("finished")
+        storage.execute("DELETE FROM wizard_sessions WHERE token = ?", (token,))
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats["open_sessions"] = storage.query_one("SELECT COUNT(*) FROM wizard_sessions")[0]
+        return stats